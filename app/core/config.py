@@ -12,9 +12,25 @@ class Settings(BaseSettings):
     REDIS_DB: int = 0
     REDIS_CACHE_EXPIRY: int
 
+    # In-process L1 cache in front of Redis (TTL is capped at REDIS_CACHE_EXPIRY)
+    L1_CACHE_ENABLED: bool = False
+    L1_CACHE_MAX_ENTRIES: int = 1024
+    L1_CACHE_TTL: int = 10
+    # "hash" keeps one field per hotkey; "packed" stores each subnet map as one smaller binary blob that
+    # decodes at about the same cost. Compressing packed blobs saves ~20% more memory for ~3x the decode time
+    DIVIDEND_CACHE_FORMAT: str = "hash"
+    DIVIDEND_CACHE_COMPRESS: bool = False
+
     # MongoDB Settings
     MONGODB_URL: str = "mongodb://mongodb:27017"
     MONGODB_DB: str = "bittensor_api"
+    # Stake actions are written behind a buffer; durability is "buffered", "acknowledged" or "majority"
+    STAKE_ACTIONS_FLUSH_SIZE: int = 100
+    STAKE_ACTIONS_FLUSH_INTERVAL: float = 1
+    STAKE_ACTIONS_DURABILITY: str = "acknowledged"
+    STAKE_HISTORY_MAX_PAGE: int = 1000
+    # Stake rollup bucket updates kept for retry while MongoDB is unavailable; older ones are dropped
+    STAKE_ROLLUPS_MAX_PENDING: int = 10000
 
     # Bittensor Settings
     BITTENSOR_NETWORK: str
@@ -26,13 +42,94 @@ class Settings(BaseSettings):
     DEFAULT_HOTKEY: str
     DEFAULT_NETUID: int
 
+    # Chain RPC Pool Settings (read-only queries; staking stays on BITTENSOR_NETWORK)
+    # Comma-separated websocket endpoints; empty uses BITTENSOR_NETWORK only
+    SUBTENSOR_ENDPOINTS: str = ""
+    SUBTENSOR_CONNECTIONS_PER_ENDPOINT: int = 2
+    SUBTENSOR_CALL_TIMEOUT: float = 30
+    SUBTENSOR_FAILURE_COOLDOWN: float = 30
+    SUBTENSOR_LATENCY_EWMA_ALPHA: float = 0.2
+
+    # Dividend Query Settings
+    DIVIDENDS_FANOUT_CONCURRENCY: int = 16
+    DIVIDENDS_BATCH_MAX_PAIRS: int = 1000
+    # Subnets with at most this many missing hotkeys are read key by key instead of with query_map
+    DIVIDENDS_MULTI_QUERY_MAX_KEYS: int = 32
+    DIVIDENDS_MULTI_QUERY_RETRY_INTERVAL: int = 300
+
+    # Request Coalescing Settings
+    SINGLEFLIGHT_DISTRIBUTED: bool = False
+    # The leader renews its lock while it runs, so this only bounds how long waiters wait for a dead leader
+    SINGLEFLIGHT_LOCK_TIMEOUT: float = 30
+    SINGLEFLIGHT_RESULT_TTL: float = 5
+    SINGLEFLIGHT_POLL_INTERVAL: float = 0.05
+
+    # Cache Refresh Settings
+    # Seconds past REDIS_CACHE_EXPIRY that a subnet map is still served while it is revalidated
+    DIVIDENDS_STALE_TTL: int = 0
+    # Keep CACHE_WARMER_INTERVAL * (1 + 2 * CACHE_WARMER_JITTER) below REDIS_CACHE_EXPIRY
+    CACHE_WARMER_ENABLED: bool = False
+    CACHE_WARMER_INTERVAL: int = 60
+    CACHE_WARMER_CONCURRENCY: int = 4
+    CACHE_WARMER_JITTER: float = 0.1
+
+    # Block-aware cache invalidation (entries stay valid until their subnet's next epoch)
+    BLOCK_AWARE_CACHE: bool = False
+    BLOCK_POLL_INTERVAL: float = 6
+    BLOCK_TEMPO_REFRESH_INTERVAL: int = 600
+    BLOCK_CACHE_MAX_AGE: int = 3600
+
+    # Dividend history (changed values of every fetched subnet map, in a Mongo time-series collection)
+    DIVIDEND_SNAPSHOTS_ENABLED: bool = False
+    DIVIDEND_HISTORY_MAX_POINTS: int = 1000
+
     # External API Keys
     DATURA_API_KEY: str
     CHUTES_API_KEY: str
 
+    # Upstream HTTP Client Settings (HTTP/2 needs the httpx[http2] extra)
+    HTTP_MAX_CONNECTIONS: int = 100
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    HTTP_KEEPALIVE_EXPIRY: float = 30
+    HTTP2_ENABLED: bool = False
+    HTTP_MAX_RETRIES: int = 2
+    HTTP_BACKOFF_BASE: float = 0.5
+    HTTP_BACKOFF_MAX: float = 10
+    HTTP_CIRCUIT_FAILURE_THRESHOLD: int = 5
+    HTTP_CIRCUIT_RESET_TIMEOUT: float = 30
+    DATURA_READ_TIMEOUT: float = 20
+    # Seconds before a second, hedged Datura request is raced against a slow one (0 disables)
+    DATURA_HEDGE_DELAY: float = 3
+    CHUTES_READ_TIMEOUT: float = 60
+
+    # Sentiment Cache Settings
+    SENTIMENT_CACHE_TTL: int = 300
+    SENTIMENT_TWEETS_CACHE_TTL: int = 86400
+    SENTIMENT_FETCH_CONCURRENCY: int = 8
+    SENTIMENT_BATCH_SIZE: int = 10
+
+    # Trade Trigger Settings
+    # Repeated trade=true requests for a (netuid, hotkey) within this window share one task
+    TRADE_DEBOUNCE_WINDOW: int = 60
+    # Minimum seconds between stake actions for a (netuid, hotkey); 0 disables the limit
+    STAKE_MIN_INTERVAL: int = 300
+
+    # Stake Engine Settings (net and batch stake/unstake actions into one extrinsic)
+    STAKE_BATCHING_ENABLED: bool = False
+    STAKE_BATCH_WINDOW: float = 2
+    STAKE_BATCH_MAX_CALLS: int = 64
+    STAKE_NONCE_LOCK_TIMEOUT: float = 120
+
+    # Metrics Settings (set PROMETHEUS_MULTIPROC_DIR in the environment when running several workers)
+    METRICS_ENABLED: bool = True
+    # Port the Celery worker serves its own /metrics on; 0 disables it
+    CELERY_METRICS_PORT: int = 0
+
     # Celery Settings
     CELERY_BROKER_URL: str = "redis://redis:6379/0"
     CELERY_RESULT_BACKEND: str = "redis://redis:6379/0"
+    CELERY_WORKER_POOL: str = "threads"
+    CELERY_WORKER_CONCURRENCY: int = 32
 
     class Config:
         env_file = ".env"
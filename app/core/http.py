@@ -0,0 +1,217 @@
+import asyncio
+import bisect
+import logging
+import random
+import time
+from typing import Dict, Optional, Sequence
+import httpx
+from app.core.config import settings
+from app.core.metrics import UPSTREAM_REQUEST_DURATION
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+DEFAULT_LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an upstream whose circuit breaker is open."""
+
+class CircuitBreaker:
+    """
+    Opens after failure_threshold consecutive failures and rejects calls for reset_timeout
+    seconds. After that a single trial call is let through: success closes the circuit,
+    failure opens it again.
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return True
+        return False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self._trial_in_flight or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+        self._trial_in_flight = False
+
+    def release_trial(self):
+        """Let another trial call through after the current one was abandoned without an outcome."""
+        self._trial_in_flight = False
+
+class LatencyHistogram:
+    """Cumulative latency histogram (seconds) with fixed upper bounds, Prometheus style."""
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds: float):
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+
+    def snapshot(self) -> Dict:
+        cumulative, buckets = 0, {}
+        for bound, count in zip(list(self.buckets) + ["+Inf"], self.counts):
+            cumulative += count
+            buckets[str(bound)] = cumulative
+        return {"buckets": buckets, "count": self.count, "sum": round(self.sum, 6)}
+
+class ResilientClient:
+    """
+    HTTP client for one upstream service.
+
+    Wraps a dedicated httpx.AsyncClient with explicit pool sizing and keep-alive reuse, and adds
+    retries with jittered exponential backoff on 429/5xx and transport errors, a circuit breaker,
+    optional hedged requests for tail latency, and a latency histogram per upstream.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        timeout: httpx.Timeout,
+        max_retries: Optional[int] = None,
+        hedge_delay: float = 0
+    ):
+        self.name = name
+        self.max_retries = settings.HTTP_MAX_RETRIES if max_retries is None else max_retries
+        self.hedge_delay = hedge_delay
+        self.breaker = CircuitBreaker(settings.HTTP_CIRCUIT_FAILURE_THRESHOLD, settings.HTTP_CIRCUIT_RESET_TIMEOUT)
+        self.latency = LatencyHistogram()
+        self.retries = 0
+        self.hedges = 0
+        self._logger = logging.getLogger(__name__)
+        self._client = httpx.AsyncClient(
+            timeout=timeout,
+            http2=settings.HTTP2_ENABLED,
+            limits=httpx.Limits(
+                max_connections=settings.HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY
+            )
+        )
+
+    def stats(self) -> Dict:
+        return {
+            "circuit": self.breaker.state,
+            "retries": self.retries,
+            "hedges": self.hedges,
+            "latency_seconds": self.latency.snapshot()
+        }
+
+    async def post(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("POST", url, **kwargs)
+
+    async def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """
+        Send a request, retrying retryable failures. Returns the last response, which may still
+        carry an error status for the caller to raise; raises CircuitOpenError when the upstream
+        is considered down, or the last transport error once retries are exhausted.
+        """
+        for attempt in range(self.max_retries + 1):
+            if not self.breaker.allow():
+                raise CircuitOpenError(f"Circuit breaker for {self.name} is open")
+
+            retry_after = None
+            try:
+                response = await self._send(method, url, **kwargs)
+            except httpx.TransportError as e:
+                self.breaker.record_failure()
+                if attempt == self.max_retries:
+                    raise
+                self._logger.warning(f"{self.name} request failed ({str(e) or type(e).__name__}), retrying")
+            except asyncio.CancelledError:
+                # Cancelled by the caller: says nothing about the upstream, but must not hold the trial slot
+                self.breaker.release_trial()
+                raise
+            except Exception:
+                self.breaker.record_failure()
+                raise
+            else:
+                if response.status_code not in RETRYABLE_STATUS_CODES:
+                    self.breaker.record_success()
+                    return response
+                self.breaker.record_failure()
+                if attempt == self.max_retries:
+                    return response
+                self._logger.warning(f"{self.name} returned {response.status_code}, retrying")
+                retry_after = self._retry_after(response)
+
+            self.retries += 1
+            await asyncio.sleep(retry_after if retry_after is not None else self._backoff(attempt))
+
+    async def _send(self, method: str, url: str, **kwargs) -> httpx.Response:
+        if self.hedge_delay <= 0:
+            return await self._timed_send(method, url, **kwargs)
+
+        # Hedge: if the first attempt is slow, race a second one and keep whichever finishes first
+        first = asyncio.ensure_future(self._timed_send(method, url, **kwargs))
+        pending = {first}
+        try:
+            done, pending = await asyncio.wait(pending, timeout=self.hedge_delay)
+            if done:
+                return first.result()
+
+            self.hedges += 1
+            pending.add(asyncio.ensure_future(self._timed_send(method, url, **kwargs)))
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+            # Both attempts failed; surface the first one's error
+            return first.result()
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def _timed_send(self, method: str, url: str, **kwargs) -> httpx.Response:
+        start = time.perf_counter()
+        status = "error"
+        try:
+            response = await self._client.request(method, url, **kwargs)
+            status = str(response.status_code)
+        finally:
+            elapsed = time.perf_counter() - start
+            UPSTREAM_REQUEST_DURATION.labels(self.name, status).observe(elapsed)
+        self.latency.observe(elapsed)
+        return response
+
+    @staticmethod
+    def _backoff(attempt: int) -> float:
+        """Exponential backoff with full jitter."""
+        return random.uniform(0, min(settings.HTTP_BACKOFF_MAX, settings.HTTP_BACKOFF_BASE * 2 ** attempt))
+
+    @staticmethod
+    def _retry_after(response: httpx.Response) -> Optional[float]:
+        try:
+            return min(settings.HTTP_BACKOFF_MAX, float(response.headers["Retry-After"]))
+        except (KeyError, ValueError):
+            return None
+
+    async def aclose(self):
+        await self._client.aclose()
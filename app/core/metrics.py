@@ -0,0 +1,121 @@
+import os
+import time
+from typing import Tuple
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Histogram, REGISTRY, generate_latest
+from prometheus_client import multiprocess, start_http_server
+from pymongo import monitoring
+
+# Prometheus metrics for the hot paths. With PROMETHEUS_MULTIPROC_DIR set in the environment
+# (before the process starts), every worker process writes its samples to that directory and
+# /metrics aggregates them, so several uvicorn workers or prefork Celery children are reported
+# as one. The directory must be emptied before the server starts.
+
+FAST_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+SLOW_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "API request latency by route template",
+    ["method", "route", "status"], buckets=SLOW_BUCKETS
+)
+HTTP_EXCEPTIONS = Counter(
+    "http_unhandled_exceptions_total", "Requests that ended in an unhandled exception",
+    ["route", "exception"]
+)
+REDIS_COMMAND_DURATION = Histogram(
+    "redis_command_duration_seconds", "Redis command latency; pipelines are timed as one round trip",
+    ["command"], buckets=FAST_BUCKETS
+)
+CHAIN_CALL_DURATION = Histogram(
+    "chain_call_duration_seconds", "Latency of read-only chain RPC calls by operation",
+    ["operation", "outcome"], buckets=SLOW_BUCKETS
+)
+UPSTREAM_REQUEST_DURATION = Histogram(
+    "upstream_request_duration_seconds", "Datura/Chutes request latency per attempt",
+    ["upstream", "status"], buckets=SLOW_BUCKETS
+)
+MONGO_COMMAND_DURATION = Histogram(
+    "mongo_command_duration_seconds", "MongoDB command latency",
+    ["command", "outcome"], buckets=FAST_BUCKETS
+)
+CACHE_REQUESTS = Counter(
+    "cache_requests_total", "Cache lookups by cache layer and result",
+    ["cache", "result"]
+)
+SINGLEFLIGHT_CALLS = Counter(
+    "singleflight_calls_total", "Single-flight callers that ran the call or joined another flight",
+    ["namespace", "outcome"]
+)
+STAKE_ROLLUP_UPDATES_DROPPED = Counter(
+    "stake_rollup_updates_dropped_total", "Stake rollup bucket updates dropped because too many were pending retry"
+)
+CELERY_TASK_DURATION = Histogram(
+    "celery_task_duration_seconds", "Celery task run time",
+    ["task", "state"], buckets=SLOW_BUCKETS
+)
+
+def multiprocess_enabled() -> bool:
+    return "PROMETHEUS_MULTIPROC_DIR" in os.environ
+
+def _registry():
+    if not multiprocess_enabled():
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+def render_metrics() -> Tuple[bytes, str]:
+    """Metrics in the Prometheus text format, aggregated over all processes in multiprocess mode."""
+    return generate_latest(_registry()), CONTENT_TYPE_LATEST
+
+def start_metrics_server(port: int):
+    """Serve /metrics on a separate port, for processes without an HTTP server of their own."""
+    start_http_server(port, registry=_registry())
+
+def mark_process_dead(pid: int):
+    """Drop a finished worker's live gauges from the multiprocess directory."""
+    if multiprocess_enabled():
+        multiprocess.mark_process_dead(pid)
+
+class MetricsMiddleware:
+    """
+    ASGI middleware timing every request. Requests are labelled with the matched route template
+    rather than the raw path, so path parameters and unknown URLs do not create new series.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_REQUEST_DURATION.labels(scope["method"], route_label(scope), str(status)).observe(time.perf_counter() - start)
+
+def route_label(scope) -> str:
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """pymongo command listener timing every command the driver sends."""
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        MONGO_COMMAND_DURATION.labels(event.command_name, "ok").observe(event.duration_micros / 1e6)
+
+    def failed(self, event):
+        MONGO_COMMAND_DURATION.labels(event.command_name, "error").observe(event.duration_micros / 1e6)
@@ -0,0 +1,21 @@
+import base64
+import json
+from typing import Any, Optional, Type
+from fastapi import HTTPException
+
+def encode_cursor(value: Any) -> str:
+    """Encode a JSON-serializable position as an opaque, URL-safe cursor."""
+    return base64.urlsafe_b64encode(json.dumps(value, separators=(",", ":")).encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: Optional[str], expected_type: Type = object) -> Any:
+    """Decode a cursor produced by encode_cursor, or return None when no cursor was given."""
+    if cursor is None:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        value = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except ValueError:
+        value = None
+    if not isinstance(value, expected_type):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return value
@@ -0,0 +1,28 @@
+import threading
+from typing import Callable, Generic, TypeVar
+
+T = TypeVar("T")
+
+class Provider(Generic[T]):
+    """
+    Creates a value with factory on first use and returns the same instance afterwards.
+    Creation is guarded by a lock, so threads racing on first use still share one instance.
+    """
+
+    def __init__(self, factory: Callable[[], T]):
+        self._factory = factory
+        self._value = None
+        self._created = False
+        self._lock = threading.Lock()
+
+    @property
+    def initialized(self) -> bool:
+        return self._created
+
+    def get(self) -> T:
+        if not self._created:
+            with self._lock:
+                if not self._created:
+                    self._value = self._factory()
+                    self._created = True
+        return self._value
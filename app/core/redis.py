@@ -1,7 +1,34 @@
+import time
 import redis.asyncio as redis
+from redis.asyncio.client import Pipeline
 from app.core.config import settings
+from app.core.metrics import REDIS_COMMAND_DURATION
 
 _redis_pool = None
+_redis_binary_pool = None
+
+class InstrumentedPipeline(Pipeline):
+    """Pipeline that records its execution as one PIPELINE (or MULTI) round trip."""
+
+    async def execute(self, raise_on_error: bool = True):
+        start = time.perf_counter()
+        try:
+            return await super().execute(raise_on_error)
+        finally:
+            REDIS_COMMAND_DURATION.labels("MULTI" if self.is_transaction else "PIPELINE").observe(time.perf_counter() - start)
+
+class InstrumentedRedis(redis.Redis):
+    """Redis client recording the latency of every command it sends."""
+
+    async def execute_command(self, *args, **options):
+        start = time.perf_counter()
+        try:
+            return await super().execute_command(*args, **options)
+        finally:
+            REDIS_COMMAND_DURATION.labels(str(args[0]).upper()).observe(time.perf_counter() - start)
+
+    def pipeline(self, transaction: bool = True, shard_hint=None) -> InstrumentedPipeline:
+        return InstrumentedPipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
 
 def get_redis_pool():
     global _redis_pool
@@ -16,4 +43,20 @@ def get_redis_pool():
     return _redis_pool
 
 def get_redis_client():
-    return redis.Redis(connection_pool=get_redis_pool())
\ No newline at end of file
+    return InstrumentedRedis(connection_pool=get_redis_pool())
+
+def get_redis_binary_pool():
+    global _redis_binary_pool
+    if _redis_binary_pool is None:
+        _redis_binary_pool = redis.ConnectionPool(
+            host=settings.REDIS_HOST,
+            port=settings.REDIS_PORT,
+            db=settings.REDIS_DB,
+            decode_responses=False,
+            max_connections=100
+        )
+    return _redis_binary_pool
+
+def get_redis_binary_client():
+    """Client returning raw bytes, for keys holding binary values."""
+    return InstrumentedRedis(connection_pool=get_redis_binary_pool())
@@ -0,0 +1,123 @@
+import asyncio
+import functools
+import json
+import logging
+from typing import Any, Awaitable, Callable, Dict
+from redis.exceptions import LockError
+from app.core.metrics import SINGLEFLIGHT_CALLS
+from app.core.redis import get_redis_client
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls for the same key into a single execution.
+
+    Within a process, callers for a key share one task. The task is forgotten as soon as it
+    finishes, successfully or not, so later callers always start a fresh flight.
+
+    In distributed mode a Redis lock extends this across processes: the lock holder runs the
+    call and publishes its JSON-serialized result for a short time, while the other replicas
+    poll for that result instead of repeating the work. The holder renews the lock every third
+    of lock_timeout while the call runs, so a slow call keeps its waiters, and a holder that
+    died lets its lock lapse within lock_timeout, after which a waiter takes over the call.
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        distributed: bool = False,
+        lock_timeout: float = 30,
+        result_ttl: float = 5,
+        poll_interval: float = 0.05
+    ):
+        self.namespace = namespace
+        self.distributed = distributed
+        self.lock_timeout = lock_timeout
+        self.result_ttl = result_ttl
+        self.poll_interval = poll_interval
+        self._calls: Dict[str, asyncio.Task] = {}
+        self._logger = logging.getLogger(__name__)
+
+        # Metrics
+        self.executed = 0           # calls that actually ran
+        self.coalesced = 0          # callers that joined an in-process flight
+        self.remote_coalesced = 0   # flights served by another replica's result
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "in_flight": len(self._calls),
+            "executed": self.executed,
+            "coalesced": self.coalesced,
+            "remote_coalesced": self.remote_coalesced
+        }
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Run fn() for key, or wait for the flight already running for it."""
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.create_task(self._execute(key, fn))
+            self._calls[key] = task
+            task.add_done_callback(functools.partial(self._forget, key))
+        else:
+            self.coalesced += 1
+            SINGLEFLIGHT_CALLS.labels(self.namespace, "coalesced").inc()
+
+        # Shield so one cancelled caller does not cancel the flight for the others
+        return await asyncio.shield(task)
+
+    def _forget(self, key: str, task: asyncio.Task):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if not task.cancelled():
+            # Mark the exception retrieved; every waiting caller re-raises it
+            task.exception()
+
+    def _record_executed(self):
+        self.executed += 1
+        SINGLEFLIGHT_CALLS.labels(self.namespace, "executed").inc()
+
+    async def _execute(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        if not self.distributed:
+            self._record_executed()
+            return await fn()
+
+        redis = get_redis_client()
+        result_key = f"singleflight:{self.namespace}:{key}:result"
+        lock = redis.lock(
+            f"singleflight:{self.namespace}:{key}:lock",
+            timeout=self.lock_timeout,
+            blocking=False
+        )
+        while True:
+            cached = await redis.get(result_key)
+            if cached is not None:
+                self.remote_coalesced += 1
+                SINGLEFLIGHT_CALLS.labels(self.namespace, "remote_coalesced").inc()
+                return json.loads(cached)
+
+            if await lock.acquire():
+                renewal = asyncio.create_task(self._renew(key, lock))
+                try:
+                    self._record_executed()
+                    result = await fn()
+                    await redis.set(result_key, json.dumps(result), px=int(self.result_ttl * 1000))
+                    return result
+                finally:
+                    renewal.cancel()
+                    try:
+                        await lock.release()
+                    except LockError:
+                        self._logger.warning(f"Single-flight lock for {key} expired before release")
+
+            await asyncio.sleep(self.poll_interval)
+
+    async def _renew(self, key: str, lock):
+        """Keep the leader's lock alive while its call runs."""
+        while True:
+            await asyncio.sleep(self.lock_timeout / 3)
+            try:
+                await lock.extend(self.lock_timeout, replace_ttl=True)
+            except LockError:
+                self._logger.warning(f"Single-flight lock for {key} was lost while its call was running")
+                return
+            except Exception as e:
+                self._logger.warning(f"Error renewing single-flight lock for {key}: {str(e)}")
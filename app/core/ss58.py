@@ -0,0 +1,44 @@
+import hashlib
+from functools import lru_cache
+
+# Bittensor addresses use the generic Substrate format
+SS58_FORMAT = 42
+ALPHABET = "123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz"
+INDEX = {c: i for i, c in enumerate(ALPHABET)}
+
+def _checksum(payload: bytes) -> bytes:
+    return hashlib.blake2b(b"SS58PRE" + payload, digest_size=64).digest()[:2]
+
+def _b58encode(data: bytes) -> str:
+    n = int.from_bytes(data, "big")
+    digits = []
+    while n:
+        n, remainder = divmod(n, 58)
+        digits.append(ALPHABET[remainder])
+    return "1" * (len(data) - len(data.lstrip(b"\0"))) + "".join(reversed(digits))
+
+def _b58decode(text: str) -> bytes:
+    n = 0
+    for c in text:
+        n = n * 58 + INDEX[c]
+    zeros = len(text) - len(text.lstrip("1"))
+    return b"\0" * zeros + n.to_bytes((n.bit_length() + 7) // 8, "big")
+
+def ss58_decode(address: str, ss58_format: int = SS58_FORMAT) -> bytes:
+    """32-byte account id of an SS58 address. Raises ValueError for malformed addresses or another format."""
+    try:
+        raw = _b58decode(address)
+    except KeyError:
+        raise ValueError(f"Invalid SS58 address: {address}")
+    if len(raw) != 35 or raw[0] != ss58_format or _checksum(raw[:33]) != raw[33:]:
+        raise ValueError(f"Invalid SS58 address: {address}")
+    return raw[1:33]
+
+@lru_cache(maxsize=65536)
+def ss58_encode(account_id: bytes, ss58_format: int = SS58_FORMAT) -> str:
+    """
+    SS58 address of a 32-byte account id. Memoized: hotkey sets are stable, so re-encoding the
+    same subnet map mostly hits the cache instead of redoing the base58 conversion.
+    """
+    payload = bytes([ss58_format]) + account_id
+    return _b58encode(payload + _checksum(payload))
@@ -0,0 +1,160 @@
+import logging
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, List, Optional
+from pymongo import ASCENDING, IndexModel
+from redis.exceptions import LockError
+from app.core.redis import get_redis_client
+from app.db.mongodb import mongodb
+
+COLLECTION = "dividend_snapshots"
+
+# interval -> $dateTrunc unit; "raw" returns every stored change
+INTERVALS = {"minute": "minute", "hour": "hour", "day": "day"}
+
+class DividendSnapshots:
+    """
+    History of TaoDividendsPerSubnet in a Mongo time-series collection.
+
+    Each fetched subnet map is compared with the previous snapshot of that subnet, and only the
+    hotkeys whose value changed are stored, one measurement per (netuid, hotkey) tagged with the
+    block it was read at and timestamped with that block's on-chain time (write time if the
+    block's time cannot be read). A value therefore holds until the next measurement for the
+    same hotkey.
+    The previous snapshot lives in Redis (`dividend_snapshots:{netuid}:values` plus a `:block`
+    key) so all workers diff against the same state, and a per-subnet lock keeps two workers
+    from recording the same change.
+    """
+
+    def __init__(self):
+        self._logger = logging.getLogger(__name__)
+
+    async def ensure_collection(self):
+        """Create the time-series collection and its index if they do not exist yet."""
+        db = mongodb.get_db()
+        if COLLECTION not in await db.list_collection_names(filter={"name": COLLECTION}):
+            await db.create_collection(
+                COLLECTION,
+                timeseries={"timeField": "timestamp", "metaField": "meta", "granularity": "minutes"}
+            )
+        await db[COLLECTION].create_indexes([
+            IndexModel([("meta.netuid", ASCENDING), ("meta.hotkey", ASCENDING), ("timestamp", ASCENDING)], name="netuid_hotkey_timestamp")
+        ])
+
+    @staticmethod
+    def diff(previous: Dict[str, int], current: Dict[str, int]) -> Dict[str, int]:
+        """Values that changed between two maps. Hotkeys missing from a map hold the storage default of 0."""
+        return {
+            hotkey: current.get(hotkey, 0)
+            for hotkey in previous.keys() | current.keys()
+            if current.get(hotkey, 0) != previous.get(hotkey, 0)
+        }
+
+    async def record(
+        self,
+        netuid: int,
+        dividends: Dict[str, int],
+        block: int,
+        block_time: Optional[Callable[[int], Awaitable[datetime]]] = None
+    ) -> int:
+        """
+        Store the changes in a subnet map read at block. Returns the number of measurements written.
+        block_time(block) resolves the block's timestamp; it is only called when something changed.
+        """
+        redis = get_redis_client()
+        values_key = f"dividend_snapshots:{netuid}:values"
+        block_key = f"dividend_snapshots:{netuid}:block"
+        lock = redis.lock(f"dividend_snapshots:{netuid}:lock", timeout=30)
+        if not await lock.acquire(blocking=False):
+            # Another worker is recording this subnet right now
+            return 0
+        try:
+            last_block = await redis.get(block_key)
+            if last_block is not None and int(last_block) >= block:
+                return 0
+
+            previous = {k: int(v) for k, v in (await redis.hgetall(values_key)).items()}
+            changed = self.diff(previous, dividends)
+            if changed:
+                timestamp = await self._timestamp(block, block_time)
+                await mongodb.get_db()[COLLECTION].insert_many([
+                    {"timestamp": timestamp, "meta": {"netuid": netuid, "hotkey": hotkey}, "block": block, "dividend": value}
+                    for hotkey, value in changed.items()
+                ], ordered=False)
+
+            async with redis.pipeline(transaction=True) as pipe:
+                removed = [hotkey for hotkey, value in changed.items() if value == 0]
+                kept = {hotkey: value for hotkey, value in changed.items() if value != 0}
+                if removed:
+                    pipe.hdel(values_key, *removed)
+                if kept:
+                    pipe.hset(values_key, mapping=kept)
+                pipe.set(block_key, block)
+                await pipe.execute()
+            return len(changed)
+        except Exception as e:
+            raise Exception(f"Error recording dividend snapshot: {str(e)}")
+        finally:
+            try:
+                await lock.release()
+            except LockError:
+                self._logger.warning(f"Dividend snapshot lock of subnet {netuid} expired before release")
+
+    async def _timestamp(self, block: int, block_time: Optional[Callable[[int], Awaitable[datetime]]]) -> datetime:
+        if block_time is not None:
+            try:
+                return await block_time(block)
+            except Exception as e:
+                self._logger.warning(f"Could not read the time of block {block}, using write time: {str(e)}")
+        return datetime.now(timezone.utc)
+
+    async def get_history(
+        self,
+        netuid: int,
+        hotkey: str,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        interval: str = "raw",
+        limit: int = 1000
+    ) -> List[Dict]:
+        """
+        Dividend points for a hotkey, oldest first. The value in effect at start (if any) is the
+        first point; with an interval, each bucket is reduced to the last value recorded in it.
+        """
+        collection = mongodb.get_db()[COLLECTION]
+        match = {"meta.netuid": netuid, "meta.hotkey": hotkey}
+        if start or end:
+            match["timestamp"] = {}
+            if start:
+                match["timestamp"]["$gte"] = start
+            if end:
+                match["timestamp"]["$lt"] = end
+
+        pipeline = [{"$match": match}, {"$sort": {"timestamp": 1}}]
+        if interval != "raw":
+            pipeline += [
+                {"$group": {
+                    "_id": {"$dateTrunc": {"date": "$timestamp", "unit": INTERVALS[interval]}},
+                    "block": {"$last": "$block"},
+                    "dividend": {"$last": "$dividend"}
+                }},
+                {"$sort": {"_id": 1}},
+                {"$project": {"_id": 0, "timestamp": "$_id", "block": 1, "dividend": 1}}
+            ]
+        else:
+            pipeline.append({"$project": {"_id": 0, "timestamp": 1, "block": 1, "dividend": 1}})
+        pipeline.append({"$limit": limit})
+
+        try:
+            points = await collection.aggregate(pipeline).to_list(length=limit)
+            if start:
+                before = await collection.find(
+                    {"meta.netuid": netuid, "meta.hotkey": hotkey, "timestamp": {"$lt": start}},
+                    {"_id": 0, "timestamp": 1, "block": 1, "dividend": 1}
+                ).sort("timestamp", -1).limit(1).to_list(length=1)
+                if before:
+                    points = (before + points)[:limit]
+        except Exception as e:
+            raise Exception(f"Error reading dividend history: {str(e)}")
+        return points
+
+dividend_snapshots = DividendSnapshots()
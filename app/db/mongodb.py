@@ -1,12 +1,35 @@
+import logging
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING, DESCENDING, IndexModel
 from app.core.config import settings
+from app.core.metrics import MongoCommandMetrics
+
+logger = logging.getLogger(__name__)
+
+# Every index ends in (timestamp, _id) descending so keyset pages are served straight off the index
+STAKE_ACTIONS_INDEXES = [
+    IndexModel(
+        [("netuid", ASCENDING), ("hotkey", ASCENDING), ("timestamp", DESCENDING), ("_id", DESCENDING)],
+        name="netuid_hotkey_timestamp"
+    ),
+    IndexModel([("timestamp", DESCENDING), ("_id", DESCENDING)], name="timestamp")
+]
+
+STAKE_ROLLUPS_INDEXES = [
+    IndexModel(
+        [("granularity", ASCENDING), ("netuid", ASCENDING), ("hotkey", ASCENDING), ("bucket", DESCENDING)],
+        name="granularity_netuid_hotkey_bucket",
+        unique=True
+    ),
+    IndexModel([("granularity", ASCENDING), ("bucket", DESCENDING)], name="granularity_bucket")
+]
 
 class MongoDB:
     client: AsyncIOMotorClient = None
     db = None
 
     def connect(self):
-        self.client = AsyncIOMotorClient(settings.MONGODB_URL)
+        self.client = AsyncIOMotorClient(settings.MONGODB_URL, event_listeners=[MongoCommandMetrics()])
         self.db = self.client[settings.MONGODB_DB]
 
     def close(self):
@@ -18,4 +41,16 @@ class MongoDB:
             self.connect()
         return self.db
 
-mongodb = MongoDB() 
\ No newline at end of file
+    async def ensure_indexes(self):
+        """Create missing indexes. Existing indexes with the same definition are left untouched."""
+        try:
+            await self.get_db().stake_actions.create_indexes(STAKE_ACTIONS_INDEXES)
+            await self.get_db().stake_rollups.create_indexes(STAKE_ROLLUPS_INDEXES)
+        except Exception as e:
+            logger.error(f"Error creating MongoDB indexes: {str(e)}")
+
+mongodb = MongoDB()
+
+def get_db():
+    """FastAPI dependency for the application database."""
+    return mongodb.get_db()
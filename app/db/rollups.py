@@ -0,0 +1,143 @@
+import logging
+import uuid
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from pymongo import UpdateOne
+from app.core.config import settings
+from app.core.metrics import STAKE_ROLLUP_UPDATES_DROPPED
+from app.db.mongodb import mongodb
+
+GRANULARITIES = ("hour", "day")
+# Recent flush ids remembered per rollup document; a retry always follows within a few flushes
+FLUSH_IDS_KEPT = 100
+
+RollupKey = Tuple[str, int, str, datetime]
+
+class StakeRollups:
+    """
+    Incrementally maintained stake_actions aggregates, one `stake_rollups` document per
+    (granularity, netuid, hotkey, bucket) for hourly and daily buckets.
+
+    Each flush of stake actions is folded into a single ordered bulk_write: an upsert making sure
+    each touched bucket exists, then one $inc per bucket. Derived values (net staked TAO, average
+    sentiment) are computed when reading.
+
+    Every flush gets an id that its $inc pushes onto the document's `flushes` list, and the $inc
+    only matches documents that do not list it yet. A flush whose write failed is therefore
+    resent as-is with the next one: if the failure was ambiguous (a timeout after the server had
+    applied it) the retry is a no-op instead of counting the actions twice. At most
+    STAKE_ROLLUPS_MAX_PENDING bucket updates are kept for retry; beyond that the oldest flushes
+    are dropped and counted in stake_rollup_updates_dropped_total.
+    """
+
+    def __init__(self):
+        self._logger = logging.getLogger(__name__)
+        # flush id -> per-bucket increments not yet known to be written, oldest first
+        self._pending: Dict[str, Dict[RollupKey, Dict[str, float]]] = {}
+
+    def _trim_pending(self):
+        pending = sum(len(increments) for increments in self._pending.values())
+        while pending > settings.STAKE_ROLLUPS_MAX_PENDING:
+            flush_id = next(iter(self._pending))
+            dropped = len(self._pending.pop(flush_id))
+            pending -= dropped
+            STAKE_ROLLUP_UPDATES_DROPPED.inc(dropped)
+            self._logger.error(f"Dropping {dropped} unwritten stake rollup updates, too many are pending retry")
+
+    @staticmethod
+    def bucket(timestamp: datetime, granularity: str) -> datetime:
+        if granularity == "hour":
+            return timestamp.replace(minute=0, second=0, microsecond=0)
+        return timestamp.replace(hour=0, minute=0, second=0, microsecond=0)
+
+    def increments(self, actions: List[Dict]) -> Dict[RollupKey, Dict[str, float]]:
+        """Merge actions into per-bucket $inc documents."""
+        merged: Dict[RollupKey, Dict[str, float]] = {}
+        for action in actions:
+            inc = {
+                "actions": 1,
+                "stakes": int(action["action"] == "stake"),
+                "unstakes": int(action["action"] == "unstake"),
+                "failed": int(not action["result"]),
+                "staked": action["amount"] if action["result"] and action["action"] == "stake" else 0.0,
+                "unstaked": action["amount"] if action["result"] and action["action"] == "unstake" else 0.0,
+                "sentiment_sum": action["sentiment_score"]
+            }
+            for granularity in GRANULARITIES:
+                key = (granularity, action["netuid"], action["hotkey"], self.bucket(action["timestamp"], granularity))
+                totals = merged.setdefault(key, dict.fromkeys(inc, 0))
+                for field, value in inc.items():
+                    totals[field] += value
+        return merged
+
+    async def record(self, actions: List[Dict]):
+        """Fold freshly written stake actions, and flushes left over from failed writes, into their rollups."""
+        increments = self.increments(actions)
+        if increments:
+            self._pending[uuid.uuid4().hex] = increments
+            self._trim_pending()
+        if not self._pending:
+            return
+
+        sent = dict(self._pending)
+        keys = dict.fromkeys(key for increments in sent.values() for key in increments)
+        ensure = [
+            UpdateOne(
+                {"granularity": granularity, "netuid": netuid, "hotkey": hotkey, "bucket": bucket},
+                {"$setOnInsert": {"flushes": []}},
+                upsert=True
+            )
+            for granularity, netuid, hotkey, bucket in keys
+        ]
+        updates = [
+            UpdateOne(
+                {"granularity": granularity, "netuid": netuid, "hotkey": hotkey, "bucket": bucket, "flushes": {"$ne": flush_id}},
+                {"$inc": inc, "$push": {"flushes": {"$each": [flush_id], "$slice": -FLUSH_IDS_KEPT}}}
+            )
+            for flush_id, increments in sent.items()
+            for (granularity, netuid, hotkey, bucket), inc in increments.items()
+        ]
+        try:
+            # Ordered, so every bucket exists before its guarded $inc runs
+            await mongodb.get_db().stake_rollups.bulk_write(ensure + updates, ordered=True)
+        except Exception as e:
+            # Resending is safe whether or not any of it was applied
+            self._logger.error(f"Error updating stake rollups for {len(sent)} flushes, retrying with the next flush: {str(e)}")
+            return
+        for flush_id in sent:
+            self._pending.pop(flush_id, None)
+
+    async def get_stats(
+        self,
+        granularity: str,
+        netuid: Optional[int] = None,
+        hotkey: Optional[str] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        limit: int = 100
+    ) -> List[Dict]:
+        """Rollups newest bucket first, with net_staked and avg_sentiment filled in."""
+        query = {"granularity": granularity}
+        if netuid is not None:
+            query["netuid"] = netuid
+        if hotkey:
+            query["hotkey"] = hotkey
+        if start or end:
+            query["bucket"] = {}
+            if start:
+                query["bucket"]["$gte"] = self.bucket(start, granularity)
+            if end:
+                query["bucket"]["$lt"] = end
+
+        try:
+            cursor = mongodb.get_db().stake_rollups.find(query, {"_id": 0, "flushes": 0}).sort("bucket", -1).limit(limit)
+            rollups = await cursor.to_list(length=limit)
+        except Exception as e:
+            raise Exception(f"Error reading stake rollups: {str(e)}")
+
+        for rollup in rollups:
+            rollup["net_staked"] = rollup["staked"] - rollup["unstaked"]
+            rollup["avg_sentiment"] = rollup.pop("sentiment_sum") / rollup["actions"] if rollup["actions"] else 0.0
+        return rollups
+
+stake_rollups = StakeRollups()
@@ -0,0 +1,166 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+from pymongo import WriteConcern
+from pymongo.errors import BulkWriteError
+from app.core.config import settings
+from app.db.mongodb import mongodb
+from app.db.rollups import stake_rollups
+
+DURABILITY_MODES = ("buffered", "acknowledged", "majority")
+
+class WriteBuffer:
+    """
+    Write-behind buffer for one Mongo collection.
+
+    Documents are collected in memory and written with a single insert_many(ordered=False) once
+    max_size documents are pending or flush_interval seconds after the first one arrived, and on
+    stop(). The durability mode decides what add() waits for:
+
+    - "buffered": nothing; the document is written with the next flush (w=1). Documents still in
+      the buffer are lost if the process dies, and documents from a flush that failed with a
+      transient error are retried with the next one.
+    - "acknowledged": the flush carrying the document, acknowledged by the primary (w=1).
+    - "majority": the flush carrying the document, journaled on a majority of the replica set.
+
+    on_flush, if given, is awaited with the documents each flush wrote, e.g. to maintain aggregates.
+    """
+
+    def __init__(
+        self,
+        collection_name: str,
+        max_size: int,
+        flush_interval: float,
+        durability: str,
+        db_provider: Callable = mongodb.get_db,
+        on_flush: Optional[Callable[[List[Dict]], Awaitable]] = None
+    ):
+        if durability not in DURABILITY_MODES:
+            raise ValueError(f"Unknown durability mode: {durability}")
+        self.collection_name = collection_name
+        self.max_size = max_size
+        self.flush_interval = flush_interval
+        self.durability = durability
+        self._db_provider = db_provider
+        self._on_flush = on_flush
+        self._collection = None
+        self._pending: List[Tuple[Dict, Optional[asyncio.Future]]] = []
+        self._queued: Optional[asyncio.Event] = None
+        self._full: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self.flushes = 0
+        self.written = 0
+        self.failed = 0
+        self._logger = logging.getLogger(__name__)
+
+    def collection(self):
+        if self._collection is None:
+            if self.durability == "majority":
+                write_concern = WriteConcern(w="majority", j=True)
+            else:
+                write_concern = WriteConcern(w=1)
+            self._collection = self._db_provider()[self.collection_name].with_options(write_concern=write_concern)
+        return self._collection
+
+    async def add(self, document: Dict):
+        """Queue a document for the next flush; waits for that flush unless durability is "buffered"."""
+        self._ensure_started()
+        future = None
+        if self.durability != "buffered":
+            future = asyncio.get_running_loop().create_future()
+        self._pending.append((document, future))
+        self._queued.set()
+        if len(self._pending) >= self.max_size:
+            self._full.set()
+        if future is not None:
+            await future
+
+    def _ensure_started(self):
+        if self._task is None or self._task.done():
+            self._queued = asyncio.Event()
+            self._full = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Flush everything still buffered and stop the background flusher."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        while self._pending:
+            remaining = len(self._pending)
+            await self.flush()
+            if len(self._pending) >= remaining:
+                # The flush failed and re-queued its batch; give up rather than spin
+                self._logger.error(f"Dropping {remaining} unwritten {self.collection_name} documents")
+                self._pending = []
+                break
+
+    async def _run(self):
+        while True:
+            await self._queued.wait()
+            # asyncio.wait rather than wait_for: on 3.9-3.11 wait_for can swallow stop()'s cancellation
+            full = asyncio.ensure_future(self._full.wait())
+            try:
+                await asyncio.wait({full}, timeout=self.flush_interval)
+            finally:
+                full.cancel()
+            self._queued.clear()
+            self._full.clear()
+            flushed = await self.flush()
+            if self._pending:
+                self._queued.set()
+            # After a failed flush, wait a full interval before retrying
+            if flushed and len(self._pending) >= self.max_size:
+                self._full.set()
+
+    async def flush(self) -> bool:
+        """Write up to max_size buffered documents in one round trip. Returns False if the flush failed."""
+        batch, self._pending = self._pending[:self.max_size], self._pending[self.max_size:]
+        if not batch:
+            return True
+
+        documents = [document for document, _ in batch]
+        errors: Dict[int, Exception] = {}
+        try:
+            await self.collection().insert_many(documents, ordered=False)
+        except BulkWriteError as e:
+            # Unordered: everything except the reported documents (e.g. duplicate keys) was written
+            for write_error in e.details.get("writeErrors", []):
+                errors[write_error["index"]] = Exception(f"Error writing {self.collection_name}: {write_error['errmsg']}")
+        except asyncio.CancelledError:
+            self._pending[:0] = batch
+            raise
+        except Exception as e:
+            if self.durability == "buffered":
+                self._pending[:0] = batch
+                self._logger.error(f"Error flushing {self.collection_name}, will retry {len(batch)} documents: {str(e)}")
+                return False
+            error = Exception(f"Error writing {self.collection_name}: {str(e)}")
+            errors = {index: error for index in range(len(batch))}
+
+        self.flushes += 1
+        self.written += len(batch) - len(errors)
+        self.failed += len(errors)
+        if errors:
+            self._logger.error(f"{len(errors)} of {len(batch)} {self.collection_name} documents were not written: {next(iter(errors.values()))}")
+        for index, (_, future) in enumerate(batch):
+            if future is not None and not future.done():
+                if index in errors:
+                    future.set_exception(errors[index])
+                else:
+                    future.set_result(None)
+        if self._on_flush is not None and len(errors) < len(batch):
+            await self._on_flush([document for index, document in enumerate(documents) if index not in errors])
+        return not errors
+
+stake_actions_buffer = WriteBuffer(
+    "stake_actions",
+    max_size=settings.STAKE_ACTIONS_FLUSH_SIZE,
+    flush_interval=settings.STAKE_ACTIONS_FLUSH_INTERVAL,
+    durability=settings.STAKE_ACTIONS_DURABILITY,
+    on_flush=stake_rollups.record
+)
@@ -1,17 +1,30 @@
-from fastapi import FastAPI, Depends, HTTPException, Query, Request
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from typing import List, Optional
-from app.models.stake import StakeAction
-from app.models.responses import TaoDividendsResponse, SentimentResponse
+from typing import Dict, List, Literal, Optional
+from app.models.stake import StakeAction, StakeStats
+from app.models.requests import TaoDividendsBatchRequest
+from app.models.responses import TaoDividendsResponse, TaoDividendsBatchResponse, TaoDividendsHistoryResponse, SentimentResponse, SubnetSentimentItem
 
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, ORJSONResponse, StreamingResponse
 from app.core.config import settings
+from app.core.metrics import HTTP_EXCEPTIONS, MetricsMiddleware, render_metrics, route_label
+from app.core.pagination import decode_cursor, encode_cursor
 from app.core.security import get_api_key
-from app.services.bittensor import bittensor_service
-from app.services.sentiment import sentiment_service
+from app.core.ss58 import ss58_decode
+from app.services.bittensor import BittensorService, bittensor_service, get_bittensor_service
+from app.services.dividend_cache import dividend_cache
+from app.services.cache_warmer import cache_warmer
+from app.services.sentiment import SentimentService, sentiment_service, get_sentiment_service
+from app.services.trade_trigger import trade_trigger
 from app.tasks.celery import process_sentiment_and_stake
-from app.db.mongodb import mongodb
+from app.db.mongodb import get_db, mongodb
+from app.db.rollups import stake_rollups
+from app.db.dividend_snapshots import dividend_snapshots
 from contextlib import asynccontextmanager
+from bson import ObjectId
+from datetime import datetime
+import asyncio
+import orjson
 import logging
 import traceback
 
@@ -21,15 +34,34 @@ logging.basicConfig(
 )
 
 logger = logging.getLogger(__name__)
-mongodb_client = None
+
+async def prepare_database():
+    await mongodb.ensure_indexes()
+    if settings.DIVIDEND_SNAPSHOTS_ENABLED:
+        try:
+            await dividend_snapshots.ensure_collection()
+        except Exception as e:
+            logger.error(f"Error creating dividend snapshots collection: {str(e)}")
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Startup
-    global mongodb_client
-    mongodb_client = mongodb.get_db()
+    # Startup: nothing here waits on Mongo, the chain or the wallet. Index creation and the chain
+    # connection are prepared in the background, and the coldkey is unlocked on the first stake.
+    startup_tasks = [
+        asyncio.create_task(prepare_database()),
+        asyncio.create_task(bittensor_service.warm_up())
+    ]
+    await dividend_cache.start()
+    if settings.BLOCK_AWARE_CACHE:
+        await bittensor_service.block_tracker.start()
+    await cache_warmer.start()
     yield
     # Shutdown
+    for task in startup_tasks:
+        task.cancel()
+    await cache_warmer.stop()
+    await bittensor_service.stop()
+    await dividend_cache.stop()
     mongodb.close()
     await sentiment_service.close()
 
@@ -49,17 +81,49 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-@app.get("/api/v1/tao_dividends", response_model=TaoDividendsResponse, response_model_exclude_none=True)
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
+    @app.get("/metrics", include_in_schema=False)
+    async def get_metrics():
+        """
+        Prometheus metrics for this API, aggregated over all workers in multiprocess mode
+        """
+        content, content_type = render_metrics()
+        return Response(content=content, media_type=content_type)
+
+def fast_response(content: dict) -> ORJSONResponse:
+    """
+    Serialize a response dict straight to JSON with orjson. Returning a Response skips FastAPI's
+    response_model validation, which is costly for large nested dividend maps; the route's
+    response_model still documents the schema in OpenAPI.
+    """
+    return ORJSONResponse({k: v for k, v in content.items() if v is not None})
+
+def validate_hotkey(hotkey: Optional[str]):
+    """Reject malformed hotkeys before they reach the chain, where they would fail storage key encoding."""
+    if hotkey is None:
+        return
+    try:
+        ss58_decode(hotkey)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid hotkey: {hotkey}")
+
+@app.get("/api/v1/tao_dividends", response_model=TaoDividendsResponse, response_model_exclude_none=True, response_class=ORJSONResponse)
 async def get_tao_dividends(
     netuid: Optional[int] = Query(None, description="Subnet ID"),
     hotkey: Optional[str] = Query(None, description="Hotkey address"),
     trade: bool = Query(False, description="Whether to trigger sentiment-based trading"),
+    cursor: Optional[str] = Query(None, description="Pagination cursor from a previous response's next_cursor"),
+    limit: Optional[int] = Query(None, ge=1, description="Maximum number of subnets (or hotkeys of a single subnet) to return"),
+    service: BittensorService = Depends(get_bittensor_service),
     api_key: str = Depends(get_api_key)
 ):
     """
     Get Tao dividends for a specific netuid and hotkey, or all netuids if netuid is None.
     Optionally trigger sentiment-based trading.
     """
+    validate_hotkey(hotkey)
     if trade:
         if (netuid is None) != (hotkey is None):  # XOR - one is None but not both
             raise HTTPException(
@@ -69,18 +133,23 @@ async def get_tao_dividends(
         elif netuid is None:  # Both are None
             netuid, hotkey = settings.DEFAULT_NETUID, settings.DEFAULT_HOTKEY
         
-        process_sentiment_and_stake.delay(netuid, hotkey)
+        trade_result = await trade_trigger.trigger(process_sentiment_and_stake, netuid, hotkey)
 
-
-    result = await bittensor_service.get_tao_dividends(netuid, hotkey)
+    result = await service.get_tao_dividends(netuid, hotkey, cursor, limit)
     dividends = result["dividends"]
     response = {
         "netuid": netuid,
         "hotkey": hotkey,
-        "cache_status": result["cache_status"]
+        "cache_status": result["cache_status"],
+        "block": result["block"],
+        "next_cursor": result["next_cursor"]
     }
+    if trade:
+        response["trade_status"] = trade_result["status"]
+        response["trade_task_id"] = trade_result["task_id"]
 
     if netuid is None:
+        response["subnet_cache_status"] = result["subnet_cache_status"]
         if hotkey is None:
             response["data"] = dividends
         else:
@@ -91,43 +160,209 @@ async def get_tao_dividends(
         else:
             response["dividend"] = dividends[str(netuid)][hotkey]
     
-    return response
+    return fast_response(response)
+
+@app.post("/api/v1/tao_dividends/batch", response_model=TaoDividendsBatchResponse, response_class=ORJSONResponse)
+async def get_tao_dividends_batch(
+    request: TaoDividendsBatchRequest,
+    service: BittensorService = Depends(get_bittensor_service),
+    api_key: str = Depends(get_api_key)
+):
+    """
+    Get Tao dividends for many (netuid, hotkey) pairs in one call.
+    """
+    if len(request.pairs) > settings.DIVIDENDS_BATCH_MAX_PAIRS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {settings.DIVIDENDS_BATCH_MAX_PAIRS} pairs can be requested at once"
+        )
+    for pair in request.pairs:
+        validate_hotkey(pair.hotkey)
+
+    result = await service.get_tao_dividends_batch([(pair.netuid, pair.hotkey) for pair in request.pairs])
+    return fast_response(result)
+
+@app.get("/api/v1/tao_dividends/history", response_model=TaoDividendsHistoryResponse)
+async def get_tao_dividends_history(
+    netuid: int = Query(..., description="Subnet ID"),
+    hotkey: str = Query(..., description="Hotkey address"),
+    start: Optional[datetime] = Query(None, description="Start of the range (inclusive)"),
+    end: Optional[datetime] = Query(None, description="End of the range (exclusive)"),
+    interval: Literal["raw", "minute", "hour", "day"] = Query("raw", description="Downsample to the last value per interval"),
+    limit: int = Query(settings.DIVIDEND_HISTORY_MAX_POINTS, ge=1, le=settings.DIVIDEND_HISTORY_MAX_POINTS, description="Maximum number of points"),
+    api_key: str = Depends(get_api_key)
+):
+    """
+    Get the recorded history of a hotkey's Tao dividends on a subnet, oldest first.
+    Only changes are stored, so each point's dividend holds until the next point; the first point
+    is the value in effect at start when one was recorded before it.
+    """
+    points = await dividend_snapshots.get_history(netuid, hotkey, start, end, interval, limit)
+    return {"netuid": netuid, "hotkey": hotkey, "interval": interval, "points": points}
+
+@app.get("/api/v1/tao_dividends/stream", response_class=StreamingResponse)
+async def stream_tao_dividends(
+    hotkey: Optional[str] = Query(None, description="Hotkey address"),
+    cursor: Optional[str] = Query(None, description="Pagination cursor from a previous response's X-Next-Cursor header"),
+    limit: Optional[int] = Query(None, ge=1, description="Maximum number of subnets to return"),
+    service: BittensorService = Depends(get_bittensor_service),
+    api_key: str = Depends(get_api_key)
+):
+    """
+    Stream Tao dividends for all netuids as NDJSON, one TaoDividendsResponse per subnet and line,
+    each emitted as soon as that subnet's data is available.
+    """
+    validate_hotkey(hotkey)
+    netuids, next_cursor = await service.paginate_subnets(cursor, limit)
+
+    async def lines():
+        try:
+            async for n, dividends, cache_status, block in service.iter_tao_dividends(netuids, hotkey):
+                line = {"netuid": n, "hotkey": hotkey, "cache_status": cache_status, "block": block}
+                if hotkey is None:
+                    line["data"] = dividends
+                else:
+                    line["dividend"] = dividends[hotkey]
+                yield orjson.dumps({k: v for k, v in line.items() if v is not None}) + b"\n"
+        except Exception as e:
+            # Headers are already sent, so report the failure in-band
+            logger.error(f"Error streaming Tao dividends: {str(e)}")
+            logger.error(traceback.format_exc())
+            yield orjson.dumps({"detail": "Internal server error"}) + b"\n"
+
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor else None
+    return StreamingResponse(lines(), media_type="application/x-ndjson", headers=headers)
+
+@app.get("/api/v1/sentiment", response_model=List[SubnetSentimentItem], response_model_exclude_none=True)
+async def get_subnets_sentiment(
+    netuids: Optional[List[int]] = Query(None, description="Subnet IDs, all subnets if omitted"),
+    service: BittensorService = Depends(get_bittensor_service),
+    sentiment: SentimentService = Depends(get_sentiment_service),
+    api_key: str = Depends(get_api_key)
+):
+    """
+    Get sentiment analysis for many subnets at once. Subnets that could not be analyzed are
+    returned with an error instead of failing the whole request
+    """
+    if not netuids:
+        netuids, _ = await service.paginate_subnets()
+    return await sentiment.get_subnets_sentiment(netuids)
 
 @app.get("/api/v1/sentiment/{netuid}", response_model=SentimentResponse)
 async def get_subnet_sentiment(
     netuid: int,
+    sentiment: SentimentService = Depends(get_sentiment_service),
     api_key: str = Depends(get_api_key)
 ):
     """
     Get sentiment analysis for a specific subnet
     """
-    sentiment_data = await sentiment_service.get_subnet_sentiment(netuid)
+    sentiment_data = await sentiment.get_subnet_sentiment(netuid)
     return sentiment_data
 
 
-@app.get("/api/v1/stake_history", response_model=List[StakeAction])
-async def get_stake_history(
-    netuid: Optional[int] = Query(None, description="Subnet ID"),
-    hotkey: Optional[str] = Query(None, description="Hotkey address"), 
-    limit: int = Query(100, description="Number of records to return"),
+@app.get("/api/v1/upstream_stats")
+async def get_upstream_stats(
+    sentiment: SentimentService = Depends(get_sentiment_service),
+    api_key: str = Depends(get_api_key)
+):
+    """
+    Get latency histograms, retry counts and circuit breaker state for the Datura and Chutes upstreams
+    """
+    return sentiment.upstream_stats()
+
+@app.get("/api/v1/chain_stats")
+async def get_chain_stats(
+    service: BittensorService = Depends(get_bittensor_service),
     api_key: str = Depends(get_api_key)
 ):
     """
-    Get historical stake actions
+    Get latency, load and health of each pooled chain RPC connection
+    """
+    return service.pool.stats()
+
+
+def stake_history_query(
+    netuid: Optional[int],
+    hotkey: Optional[str],
+    start: Optional[datetime],
+    end: Optional[datetime],
+    cursor: Optional[str]
+) -> Dict:
+    """
+    Build the stake_actions filter for one page. The cursor is the (timestamp, _id) of the last
+    record of the previous page; the next page starts strictly after it in (timestamp, _id)
+    descending order.
     """
     query = {}
-    if netuid:
+    if netuid is not None:
         query["netuid"] = netuid
     if hotkey:
         query["hotkey"] = hotkey
-        
-    cursor = mongodb_client.stake_actions.find(query).sort("timestamp", -1).limit(limit)
-    history = await cursor.to_list(length=limit)
+    if start or end:
+        query["timestamp"] = {}
+        if start:
+            query["timestamp"]["$gte"] = start
+        if end:
+            query["timestamp"]["$lt"] = end
+
+    position = decode_cursor(cursor, list)
+    if position is not None:
+        try:
+            timestamp, last_id = datetime.fromisoformat(position[0]), ObjectId(position[1])
+        except (IndexError, TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        query = {"$and": [query, {"$or": [
+            {"timestamp": {"$lt": timestamp}},
+            {"timestamp": timestamp, "_id": {"$lt": last_id}}
+        ]}]}
+    return query
+
+@app.get("/api/v1/stake_history", response_model=List[StakeAction])
+async def get_stake_history(
+    response: Response,
+    netuid: Optional[int] = Query(None, description="Subnet ID"),
+    hotkey: Optional[str] = Query(None, description="Hotkey address"), 
+    start: Optional[datetime] = Query(None, description="Only actions at or after this time"),
+    end: Optional[datetime] = Query(None, description="Only actions before this time"),
+    cursor: Optional[str] = Query(None, description="Pagination cursor from a previous response's X-Next-Cursor header"),
+    limit: int = Query(100, ge=1, le=settings.STAKE_HISTORY_MAX_PAGE, description="Number of records to return"),
+    db = Depends(get_db),
+    api_key: str = Depends(get_api_key)
+):
+    """
+    Get historical stake actions, newest first.
+    Pages are keyset-paginated on (timestamp, _id); the next page's cursor is returned in the X-Next-Cursor header.
+    """
+    query = stake_history_query(netuid, hotkey, start, end, cursor)
+    records = db.stake_actions.find(query).sort([("timestamp", -1), ("_id", -1)]).limit(limit + 1)
+    history = await records.to_list(length=limit + 1)
+    if len(history) > limit:
+        history = history[:limit]
+        last = history[-1]
+        response.headers["X-Next-Cursor"] = encode_cursor([last["timestamp"].isoformat(), str(last["_id"])])
     return [StakeAction(**record) for record in history]
 
 
+@app.get("/api/v1/stake_stats", response_model=List[StakeStats])
+async def get_stake_stats(
+    granularity: Literal["hour", "day"] = Query("day", description="Rollup bucket size"),
+    netuid: Optional[int] = Query(None, description="Subnet ID"),
+    hotkey: Optional[str] = Query(None, description="Hotkey address"),
+    start: Optional[datetime] = Query(None, description="Only buckets containing or after this time"),
+    end: Optional[datetime] = Query(None, description="Only buckets starting before this time"),
+    limit: int = Query(100, ge=1, le=settings.STAKE_HISTORY_MAX_PAGE, description="Number of buckets to return"),
+    api_key: str = Depends(get_api_key)
+):
+    """
+    Get pre-aggregated stake statistics per netuid/hotkey and hour or day, newest bucket first
+    """
+    return await stake_rollups.get_stats(granularity, netuid, hotkey, start, end, limit)
+
+
 @app.exception_handler(Exception)
 async def generic_exception_handler(request: Request, exc: Exception):
+    HTTP_EXCEPTIONS.labels(route_label(request.scope), type(exc).__name__).inc()
     logger.error(f"Unhandled error: {str(exc)}")
     logger.error(traceback.format_exc())
     return JSONResponse(
@@ -0,0 +1,9 @@
+from typing import List
+from pydantic import BaseModel
+
+class DividendPair(BaseModel):
+    netuid: int
+    hotkey: str
+
+class TaoDividendsBatchRequest(BaseModel):
+    pairs: List[DividendPair]
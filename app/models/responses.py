@@ -1,4 +1,5 @@
-from typing import Dict, Union, Optional
+from datetime import datetime
+from typing import Dict, List, Union, Optional
 from pydantic import BaseModel
 
 class TaoDividendsResponse(BaseModel):
@@ -7,10 +8,43 @@ class TaoDividendsResponse(BaseModel):
     cache_status: str
     data: Union[Dict[str, Union[Dict[str, int], int]], int] = None
     dividend: Optional[int] = None 
+    subnet_cache_status: Optional[Dict[str, str]] = None
+    block: Optional[int] = None
+    next_cursor: Optional[str] = None
+    trade_status: Optional[str] = None
+    trade_task_id: Optional[str] = None
+
+class TaoDividendsBatchItem(BaseModel):
+    netuid: int
+    hotkey: str
+    dividend: int
+    cache_status: str
+    block: Optional[int] = None
+
+class TaoDividendsBatchResponse(BaseModel):
+    cache_status: str
+    results: List[TaoDividendsBatchItem]
+
+class TaoDividendsHistoryPoint(BaseModel):
+    timestamp: datetime
+    block: int
+    dividend: int
+
+class TaoDividendsHistoryResponse(BaseModel):
+    netuid: int
+    hotkey: str
+    interval: str
+    points: List[TaoDividendsHistoryPoint]
 
 class SentimentResponse(BaseModel):
     netuid: int
     tweet_count: int
     sentiment_score: float
 
+class SubnetSentimentItem(BaseModel):
+    netuid: int
+    tweet_count: Optional[int] = None
+    sentiment_score: Optional[float] = None
+    error: Optional[str] = None
+
     
\ No newline at end of file
@@ -40,4 +40,21 @@ class StakeAction(BaseModel):
     action: str
     amount: float
     result: bool
-    timestamp: datetime
\ No newline at end of file
+    timestamp: datetime
+    # Set when the stake engine absorbed the action into an opposing one instead of submitting it
+    netted: bool = False
+    extrinsic_hash: Optional[str] = None
+
+class StakeStats(BaseModel):
+    granularity: str
+    netuid: int
+    hotkey: str
+    bucket: datetime
+    actions: int
+    stakes: int
+    unstakes: int
+    failed: int
+    staked: float
+    unstaked: float
+    net_staked: float
+    avg_sentiment: float
@@ -1,13 +1,28 @@
 import json
 import base64
-from typing import Dict, List, Optional
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple, TypeVar
 import bittensor as bt
 from bittensor.core.chain_data import decode_account_id
 from bittensor.utils.balance import tao
 from app.core.config import settings
+from app.core.pagination import decode_cursor, encode_cursor
 from app.core.redis import get_redis_client
+from app.core.providers import Provider
+from app.core.singleflight import SingleFlight
+from app.services.block_tracker import BlockTracker
+from app.db.dividend_snapshots import dividend_snapshots
+from app.services.dividend_cache import dividend_cache
+from app.services.stake_engine import StakeEngine
+from app.services.subtensor_pool import TRANSPORT_ERRORS, SubtensorPool
 import os
 import asyncio
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
 
 def encrypt_password_base64(key: str, value: str) -> str:
     """
@@ -17,107 +32,491 @@ def encrypt_password_base64(key: str, value: str) -> str:
     return base64.b64encode(encrypted_bytes).decode()
 
 class BittensorService:
+    QUERY_MULTI_CHUNK_SIZE = 256
+
     def __init__(self):
-        self.subtensor = bt.AsyncSubtensor(network=settings.BITTENSOR_NETWORK)
-        self.wallet = bt.wallet(
+        # Nothing here touches the network or the wallet: the chain connection and the wallet are
+        # created on first use, and the coldkey is only decrypted when a stake action needs it
+        self._subtensor = Provider(lambda: bt.AsyncSubtensor(network=settings.BITTENSOR_NETWORK))
+        # Read-only queries go through the pool; staking and the block tracker use the primary connection
+        self._pool = Provider(self._create_pool)
+        self._wallet = Provider(self._load_wallet)
+        self._coldkey_lock = threading.Lock()
+        self._coldkey_unlocked = False
+        self._block_tracker = Provider(lambda: BlockTracker(self.subtensor))
+        self._stake_engine = Provider(lambda: StakeEngine(self.subtensor, self.wallet))
+        self._single_flight = SingleFlight(
+            "tao_dividends",
+            distributed=settings.SINGLEFLIGHT_DISTRIBUTED,
+            lock_timeout=settings.SINGLEFLIGHT_LOCK_TIMEOUT,
+            result_ttl=settings.SINGLEFLIGHT_RESULT_TTL,
+            poll_interval=settings.SINGLEFLIGHT_POLL_INTERVAL
+        )
+        self._refresh_tasks: Dict[int, asyncio.Task] = {}
+        self._snapshot_tasks: Set[asyncio.Task] = set()
+        self._query_multi_disabled_until = 0.0
+
+    @property
+    def subtensor(self) -> bt.AsyncSubtensor:
+        return self._subtensor.get()
+
+    @property
+    def pool(self) -> SubtensorPool:
+        return self._pool.get()
+
+    @property
+    def wallet(self):
+        return self._wallet.get()
+
+    @property
+    def block_tracker(self) -> BlockTracker:
+        return self._block_tracker.get()
+
+    @property
+    def stake_engine(self) -> StakeEngine:
+        return self._stake_engine.get()
+
+    def _create_pool(self) -> SubtensorPool:
+        endpoints = [e.strip() for e in settings.SUBTENSOR_ENDPOINTS.split(",") if e.strip()]
+        return SubtensorPool(endpoints or [settings.BITTENSOR_NETWORK], settings.SUBTENSOR_CONNECTIONS_PER_ENDPOINT)
+
+    def _load_wallet(self):
+        wallet = bt.wallet(
             name=settings.WALLET_NAME, 
             hotkey=settings.WALLET_HOTKEY,
             path=settings.WALLET_PATH
         )
 
-        pw_env_var_name = self.wallet.coldkey_file.env_var_name()
+        pw_env_var_name = wallet.coldkey_file.env_var_name()
         enc_pw = encrypt_password_base64(pw_env_var_name, settings.WALLET_COLDKEY_PASSWORD)
         os.environ[pw_env_var_name] = enc_pw
-        self.wallet.unlock_coldkey()
-        self._request_futures: Dict[str, asyncio.Task] = {}
+        return wallet
+
+    def _unlock_coldkey(self):
+        with self._coldkey_lock:
+            if not self._coldkey_unlocked:
+                self.wallet.unlock_coldkey()
+                self._coldkey_unlocked = True
 
+    async def unlock_coldkey(self):
+        """Decrypt the coldkey once, off the event loop; the key derivation takes a noticeable amount of CPU."""
+        if not self._coldkey_unlocked:
+            await asyncio.to_thread(self._unlock_coldkey)
 
-    async def _get_all_subnets(self):
+    async def warm_up(self):
+        """Open the chain connections in the background so the first request does not pay for them."""
+        try:
+            await asyncio.gather(self.subtensor.initialize(), self.pool.warm_up())
+        except Exception as e:
+            logger.error(f"Failed to warm up chain connection: {str(e)}")
+
+    async def stop(self):
+        """Stop the background components that were started, without creating the ones that were not."""
+        if self._stake_engine.initialized:
+            await self.stake_engine.stop()
+        if self._block_tracker.initialized:
+            await self.block_tracker.stop()
+        if self._pool.initialized:
+            await self.pool.close()
+
+    async def _get_all_subnets(self, refresh: bool = False):
         redis = get_redis_client()
-        cached_subnets = await redis.get("subnets")
+        cached_subnets = None if refresh else await redis.get("subnets")
         netuids = []
         if cached_subnets:
             netuids = json.loads(cached_subnets)
         else:
-            netuids = await self.subtensor.get_subnets()
+            netuids = await self.pool.call(lambda s: s.get_subnets(), "get_subnets")
             await redis.set("subnets", json.dumps(netuids), ex=settings.REDIS_CACHE_EXPIRY)
         return netuids
 
-    async def get_tao_dividends(self, netuid: Optional[int] = None, hotkey: Optional[str] = None) -> Dict:
+    async def paginate_subnets(self, cursor: Optional[str] = None, limit: Optional[int] = None):
+        """Page through subnet ids in ascending order. Returns (netuids, next_cursor)."""
+        after = decode_cursor(cursor, int)
+        netuids = sorted(await self._get_all_subnets())
+        if after is not None:
+            netuids = [n for n in netuids if n > after]
+        if limit is None or len(netuids) <= limit:
+            return netuids, None
+        netuids = netuids[:limit]
+        return netuids, encode_cursor(netuids[-1])
+
+    async def get_tao_dividends(
+        self,
+        netuid: Optional[int] = None,
+        hotkey: Optional[str] = None,
+        cursor: Optional[str] = None,
+        limit: Optional[int] = None
+    ) -> Dict:
         """
             Get Tao dividends for a specific netuid and/or hotkey, or all netuids if netuid is None.
+            Cache reads and writes are pipelined; misses are fetched concurrently, bounded by DIVIDENDS_FANOUT_CONCURRENCY.
+            Stale subnets are served from cache and refreshed in the background.
+            With BLOCK_AWARE_CACHE, entries stay valid until their subnet's next epoch and misses are read at the tracked head.
+            cursor/limit page through netuids when netuid is None, or through hotkeys of a single subnet.
         """
         
-        redis = get_redis_client()
+        next_cursor = None
+        if netuid is None:
+            netuids, next_cursor = await self.paginate_subnets(cursor, limit)
+        else:
+            netuids = [netuid]
+            after_hotkey = decode_cursor(cursor, str)
+
         try:
-            netuids = [netuid] if netuid else await self._get_all_subnets()
-            dividends = {}
-            cache_hit = False
-            cache_miss = False
+            cached = await dividend_cache.read(netuids, hotkey, is_current=self._is_current)
+
+            misses = [n for n in netuids if cached[n][0] is None]
+            semaphore = asyncio.Semaphore(max(1, settings.DIVIDENDS_FANOUT_CONCURRENCY))
+            block, block_hash = self._pinned_head()
+
+            async def fetch(n: int):
+                async with semaphore:
+                    return await self._get_subnet_dividends(n, hotkey, block, block_hash)
+
+            if hotkey and len(misses) > 1:
+                # One batched storage query instead of one RPC per subnet
+                values = await self._get_hotkey_dividends(misses, hotkey, block, block_hash)
+                fetched = {n: {hotkey: values[n]} for n in misses}
+            else:
+                fetched = dict(zip(misses, await asyncio.gather(*(fetch(n) for n in misses))))
+            await dividend_cache.write(fetched, hotkey, block=block)
 
+            dividends = {}
+            subnet_cache_status = {}
+            blocks = []
             for n in netuids:
-                cache_key = f"tao_dividends:{n}"
-                if hotkey:
-                    cached_dividend = await redis.hget(cache_key, hotkey)
-                    if cached_dividend:
-                        cache_hit = True
-                        dividends[str(n)] = {hotkey: int(cached_dividend)}
-                    else:
-                        cache_miss = True
-                        dividends[str(n)] = await self._get_subnet_dividends(n, hotkey)
-                        await redis.hset(cache_key, hotkey, dividends[str(n)][hotkey])
-                        await redis.hexpire(cache_key, settings.REDIS_CACHE_EXPIRY, hotkey)
-                        self._request_futures.pop(f"{netuid}:{hotkey}", None)
-                else:
-                    cached_dividends = await redis.hgetall(cache_key)
-                    if cached_dividends:
-                        cache_hit = True
-                        dividends[str(n)] = {k: int(v) for k, v in cached_dividends.items()}
-                    else:
-                        cache_miss = True
-                        dividends[str(n)] = await self._get_subnet_dividends(n)
-                        await redis.hset(cache_key, mapping=dividends[str(n)])
-                        await redis.expire(cache_key, settings.REDIS_CACHE_EXPIRY)
-                        self._request_futures.pop(f"{netuid}:{hotkey}", None)
-                        
-
-            cache_status = "hit" if (cache_hit and not cache_miss) else \
-                          "partial" if (cache_hit and cache_miss) else \
-                          "miss"
-
-            return {"dividends": dividends, "cache_status": cache_status}
+                dividends[str(n)], subnet_cache_status[str(n)], subnet_block = cached[n]
+                if n in fetched:
+                    dividends[str(n)], subnet_block = fetched[n], block
+                elif subnet_cache_status[str(n)] == "stale":
+                    self._schedule_refresh(n)
+                if subnet_block is not None:
+                    blocks.append(subnet_block)
+
+            if netuid is not None and hotkey is None and (after_hotkey is not None or limit is not None):
+                hotkeys = sorted(k for k in dividends[str(netuid)] if after_hotkey is None or k > after_hotkey)
+                if limit is not None and len(hotkeys) > limit:
+                    hotkeys = hotkeys[:limit]
+                    next_cursor = encode_cursor(hotkeys[-1])
+                dividends[str(netuid)] = {k: dividends[str(netuid)][k] for k in hotkeys}
+
+            cache_status = self._aggregate_cache_status(subnet_cache_status.values())
+
+            return {
+                "dividends": dividends,
+                "cache_status": cache_status,
+                "subnet_cache_status": subnet_cache_status,
+                # Oldest block any returned subnet was read at
+                "block": min(blocks) if blocks else None,
+                "next_cursor": next_cursor
+            }
         except Exception as e:
             raise Exception(f"Error getting Tao dividends: {str(e)}")
 
-    async def _get_subnet_dividends(self, netuid: Optional[int] = None, hotkey: Optional[str] = None) -> Dict:
-        """Get dividends for a specific subnet and optional hotkey."""
-        
-        request_key = f"{netuid}:{hotkey}"
-        if request_key in self._request_futures:
-            task = self._request_futures[request_key]
-        else:
-            if hotkey is None:
-                task = asyncio.create_task(self._query_map(netuid))
-            else:
-                task = asyncio.create_task(self.subtensor.substrate.query("SubtensorModule", "TaoDividendsPerSubnet", [netuid, hotkey]))
-            self._request_futures[request_key] = task
-            
+    async def get_tao_dividends_batch(self, pairs: List[Tuple[int, str]]) -> Dict:
+        """
+            Get Tao dividends for many (netuid, hotkey) pairs at once. All cached pairs are read in one
+            pipelined round trip; misses are grouped by netuid so each subnet costs a single chain query.
+        """
+
+        try:
+            pairs = list(dict.fromkeys(pairs))
+            cached = await dividend_cache.read_pairs(pairs, is_current=self._is_current)
+
+            missing: Dict[int, List[str]] = {}
+            for (n, hotkey), (dividend, status, _) in cached.items():
+                if dividend is None:
+                    missing.setdefault(n, []).append(hotkey)
+                elif status == "stale":
+                    self._schedule_refresh(n)
+
+            # Subnets with only a few missing hotkeys are read key by key in one batched
+            # storage query; the rest are read as full maps, which also warms the cache
+            map_netuids = [n for n, hotkeys in missing.items() if len(hotkeys) > settings.DIVIDENDS_MULTI_QUERY_MAX_KEYS]
+            keys = [(n, hotkey) for n, hotkeys in missing.items() if n not in map_netuids for hotkey in hotkeys]
+
+            semaphore = asyncio.Semaphore(max(1, settings.DIVIDENDS_FANOUT_CONCURRENCY))
+            block, block_hash = self._pinned_head()
+
+            async def fetch(n: int):
+                async with semaphore:
+                    return await self._get_subnet_dividends(n, None, block, block_hash)
+
+            maps, key_values = await asyncio.gather(
+                asyncio.gather(*(fetch(n) for n in map_netuids)),
+                self._query_hotkeys(keys, block_hash)
+            )
+            fetched = dict(zip(map_netuids, maps))
+            fetched_hotkeys: Dict[int, Dict[str, int]] = {}
+            for (n, hotkey), value in key_values.items():
+                fetched_hotkeys.setdefault(n, {})[hotkey] = value
+            await dividend_cache.write_batch(maps=fetched, hotkeys=fetched_hotkeys, block=block)
+
+            results = []
+            for n, hotkey in pairs:
+                dividend, status, pair_block = cached[(n, hotkey)]
+                if dividend is None:
+                    # Hotkeys absent from the subnet map hold the storage default of 0
+                    source = fetched[n] if n in fetched else fetched_hotkeys[n]
+                    dividend, pair_block = source.get(hotkey, 0), block
+                results.append({
+                    "netuid": n,
+                    "hotkey": hotkey,
+                    "dividend": dividend,
+                    "cache_status": status,
+                    "block": pair_block
+                })
+
+            return {
+                "results": results,
+                "cache_status": self._aggregate_cache_status(item["cache_status"] for item in results)
+            }
+        except Exception as e:
+            raise Exception(f"Error getting Tao dividends batch: {str(e)}")
+
+    @staticmethod
+    def _aggregate_cache_status(statuses) -> str:
+        """Summarize per-subnet (or per-pair) cache statuses into one response-level status."""
+        statuses = set(statuses)
+        return "l1" if statuses == {"l1"} else \
+               "miss" if statuses == {"miss"} else \
+               "partial" if "miss" in statuses else \
+               "stale" if "stale" in statuses else \
+               "hit"
+
+    async def iter_tao_dividends(self, netuids: List[int], hotkey: Optional[str] = None):
+        """
+            Yield (netuid, dividends, cache_status, block) for each subnet as soon as it is available:
+            cached subnets first, then chain misses in completion order, each cached as it arrives.
+        """
+
+        cached = await dividend_cache.read(netuids, hotkey, is_current=self._is_current)
+        misses = []
+        for n in netuids:
+            dividends, status, block = cached[n]
+            if dividends is None:
+                misses.append(n)
+                continue
+            if status == "stale":
+                self._schedule_refresh(n)
+            yield n, dividends, status, block
+
+        semaphore = asyncio.Semaphore(max(1, settings.DIVIDENDS_FANOUT_CONCURRENCY))
+        block, block_hash = self._pinned_head()
+
+        async def fetch(n: int):
+            async with semaphore:
+                dividends = await self._get_subnet_dividends(n, hotkey, block, block_hash)
+            await dividend_cache.write({n: dividends}, hotkey, block=block)
+            return n, dividends
+
+        tasks = [asyncio.ensure_future(fetch(n)) for n in misses]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                n, dividends = await next_done
+                yield n, dividends, "miss", block
+        finally:
+            # The client may disconnect mid-stream
+            for task in tasks:
+                task.cancel()
+
+    async def refresh_subnet_dividends(self, netuid: int) -> Dict:
+        """Re-fetch a subnet's full dividend map from the chain and write it to the cache."""
+        block, block_hash = self._pinned_head()
+        dividends = await self._get_subnet_dividends(netuid, None, block, block_hash)
+        await dividend_cache.write({netuid: dividends}, block=block)
+        return dividends
+
+    def _pinned_head(self):
+        """(block_number, block_hash) that chain reads should be pinned to, or (None, None) to read the latest state."""
+        if settings.BLOCK_AWARE_CACHE and self.block_tracker.head is not None:
+            return self.block_tracker.head
+        return None, None
+
+    def _is_current(self, netuid: int, block: int) -> Optional[bool]:
+        if not settings.BLOCK_AWARE_CACHE:
+            return None
+        return self.block_tracker.is_current(netuid, block)
+
+    def _schedule_refresh(self, netuid: int):
+        """Revalidate a stale subnet in the background, at most once at a time per subnet."""
+        if netuid in self._refresh_tasks:
+            return
+        task = asyncio.create_task(self.refresh_subnet_dividends(netuid))
+        self._refresh_tasks[netuid] = task
+        task.add_done_callback(lambda t: self._on_refresh_done(netuid, t))
+
+    def _on_refresh_done(self, netuid: int, task: asyncio.Task):
+        self._refresh_tasks.pop(netuid, None)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Background refresh of subnet {netuid} failed: {str(task.exception())}")
+
+    def _schedule_snapshot(self, netuid: int, dividends: Dict[str, int], block: Optional[int]):
+        """Record a freshly read subnet map in the dividend history without delaying the response."""
+        task = asyncio.create_task(self._snapshot(netuid, dividends, block))
+        self._snapshot_tasks.add(task)
+        task.add_done_callback(self._snapshot_tasks.discard)
+
+    async def _snapshot(self, netuid: int, dividends: Dict[str, int], block: Optional[int]):
+        try:
+            if block is None:
+                # Unpinned reads return the latest state; tag them with the current head
+                block = await self.pool.call(lambda s: s.get_current_block(), "get_current_block")
+            await dividend_snapshots.record(netuid, dividends, block, block_time=self._block_time)
+        except Exception as e:
+            logger.error(f"Failed to snapshot dividends of subnet {netuid}: {str(e)}")
+
+    async def _block_time(self, block: int) -> datetime:
+        """On-chain time of a block, from its Timestamp.Now."""
+        async def query(subtensor):
+            block_hash = await subtensor.substrate.get_block_hash(block)
+            result = await subtensor.substrate.query("Timestamp", "Now", block_hash=block_hash)
+            return result.value
+
+        milliseconds = await self.pool.call(query, "block_time")
+        return datetime.fromtimestamp(milliseconds / 1000, tz=timezone.utc)
+
+    async def _get_subnet_dividends(
+        self,
+        netuid: int,
+        hotkey: Optional[str] = None,
+        block: Optional[int] = None,
+        block_hash: Optional[str] = None
+    ) -> Dict:
+        """Get dividends for a specific subnet and optional hotkey, coalescing concurrent identical queries."""
+
+        request_key = f"{netuid}:{hotkey}@{block}"
         if hotkey is None:
-            return await task
-        else:
-            return { hotkey: (await task).value }
-        
-    async def _query_map(self, netuid: int):
+            async def query_map():
+                dividends = await self._query_map(netuid, block_hash)
+                if settings.DIVIDEND_SNAPSHOTS_ENABLED:
+                    self._schedule_snapshot(netuid, dividends, block)
+                return dividends
+
+            return await self._single_flight.do(request_key, query_map)
+        return await self._single_flight.do(request_key, lambda: self._query_hotkey(netuid, hotkey, block_hash))
+
+    async def _get_hotkey_dividends(
+        self,
+        netuids: List[int],
+        hotkey: str,
+        block: Optional[int] = None,
+        block_hash: Optional[str] = None
+    ) -> Dict[int, int]:
+        """Get one hotkey's dividends across several subnets with a single coalesced storage query."""
+
+        request_key = f"{','.join(map(str, sorted(netuids)))}:{hotkey}@{block}"
+
+        async def query():
+            values = await self._query_hotkeys([(n, hotkey) for n in netuids], block_hash)
+            # String keys keep the result JSON-serializable for distributed single-flight
+            return {str(n): value for (n, _), value in values.items()}
+
+        values = await self._single_flight.do(request_key, query)
+        return {int(n): value for n, value in values.items()}
+
+    async def _query_hotkeys(self, keys: List[Tuple[int, str]], block_hash: Optional[str] = None) -> Dict[Tuple[int, str], int]:
+        """
+        Read TaoDividendsPerSubnet for many (netuid, hotkey) keys with batched state_queryStorageAt
+        calls. Falls back to one query per key when the batched call fails, and keeps using the
+        fallback for a while afterwards if the node does not support it. Transport errors propagate
+        once the pool has failed over.
+        """
+        if not keys:
+            return {}
+
+        loop = asyncio.get_running_loop()
+        if loop.time() >= self._query_multi_disabled_until:
+            try:
+                values = {}
+                chunks = [keys[i:i + self.QUERY_MULTI_CHUNK_SIZE] for i in range(0, len(keys), self.QUERY_MULTI_CHUNK_SIZE)]
+                for chunk_values in await asyncio.gather(*(self._query_multi(chunk, block_hash) for chunk in chunks)):
+                    values.update(chunk_values)
+                return values
+            except TRANSPORT_ERRORS:
+                raise
+            except Exception as e:
+                logger.warning(f"Batched storage query failed, falling back to per-key queries: {str(e)}")
+                if self._query_multi_unsupported(e):
+                    self._query_multi_disabled_until = loop.time() + settings.DIVIDENDS_MULTI_QUERY_RETRY_INTERVAL
+
+        results = await asyncio.gather(*(self._query_hotkey(n, hotkey, block_hash) for n, hotkey in keys))
+        return {(n, hotkey): result[hotkey] for (n, hotkey), result in zip(keys, results)}
+
+    @staticmethod
+    def _query_multi_unsupported(error: Exception) -> bool:
+        """
+        Whether a failed batched query means the node cannot serve it at all, rather than a one-off
+        failure. Only RPC-level rejections count; local encoding errors (e.g. a malformed hotkey)
+        say nothing about the node.
+        """
+        message = str(error).lower()
+        return "method not found" in message or "-32601" in message or "not supported" in message
+
+    @staticmethod
+    def _unknown_block(error: Exception) -> bool:
+        """Whether a node rejected a read because it does not have the requested block (yet)."""
+        message = str(error).lower()
+        return "unknown block" in message or "unknownblock" in message or "header was not found" in message
+
+    async def _read(self, fn: Callable[[Any], Awaitable[T]], operation: str, block_hash: Optional[str] = None) -> T:
+        """
+        Run a read-only call on the pool. Reads pinned to the tracker's finalized head are moved to
+        another endpoint when a lagging node does not know that block yet, and as a last resort run
+        on the connection the block tracker got the hash from.
+        """
+        if block_hash is None:
+            return await self.pool.call(fn, operation)
+        try:
+            return await self.pool.call(fn, operation, retry_on=self._unknown_block)
+        except Exception as e:
+            if not self._unknown_block(e):
+                raise
+            logger.warning(f"No pooled endpoint has block {block_hash} yet, reading from the primary connection")
+            return await fn(self.subtensor)
+
+    async def _query_multi(self, keys: List[Tuple[int, str]], block_hash: Optional[str] = None) -> Dict[Tuple[int, str], int]:
+        return await self._read(lambda s: self._query_multi_on(s.substrate, keys, block_hash), "query_multi", block_hash)
+
+    async def _query_multi_on(self, substrate, keys: List[Tuple[int, str]], block_hash: Optional[str]) -> Dict[Tuple[int, str], int]:
+        storage_keys = await asyncio.gather(*(
+            substrate.create_storage_key("SubtensorModule", "TaoDividendsPerSubnet", [n, hotkey], block_hash=block_hash)
+            for n, hotkey in keys
+        ))
+        # Keys without a stored value hold the storage default of 0
+        values = {key: 0 for key in keys}
+        for storage_key, value in await substrate.query_multi(storage_keys, block_hash=block_hash):
+            netuid, hotkey = storage_key.params
+            values[(netuid, hotkey)] = getattr(value, "value", value) or 0
+        return values
+
+    async def _query_hotkey(self, netuid: int, hotkey: str, block_hash: Optional[str] = None):
+        result = await self._read(lambda s: s.substrate.query(
+            "SubtensorModule", "TaoDividendsPerSubnet", [netuid, hotkey], block_hash=block_hash
+        ), "query", block_hash)
+        return {hotkey: result.value}
+
+    async def _query_map(self, netuid: int, block_hash: Optional[str] = None):
+        # The paged query_map keeps fetching while it is iterated, so all of it runs on one pooled connection
+        return await self._read(lambda s: self._query_map_on(s.substrate, netuid, block_hash), "query_map", block_hash)
+
+    async def _query_map_on(self, substrate, netuid: int, block_hash: Optional[str]):
         dividends = {}
-        result = await self.subtensor.substrate.query_map("SubtensorModule", "TaoDividendsPerSubnet", [netuid])
+        result = await substrate.query_map(
+            "SubtensorModule", "TaoDividendsPerSubnet", [netuid], block_hash=block_hash
+        )
         async for k, v in result:
             dividends[decode_account_id(k)] = v.value
 
         return dividends
 
     async def stake_tao(self, amount: float, netuid: int, hotkey: str) -> Dict:
-        """Stake TAO tokens."""
+        """Stake TAO tokens. With STAKE_BATCHING_ENABLED the stake is netted and batched by the stake engine."""
         try:
+            await self.unlock_coldkey()
+            if settings.STAKE_BATCHING_ENABLED:
+                return await self.stake_engine.submit("stake", amount, netuid, hotkey)
             result = await self.subtensor.add_stake(
                 wallet=self.wallet,
                 netuid=netuid,
@@ -129,8 +528,11 @@ class BittensorService:
             raise Exception(f"Error staking TAO: {str(e)}")
 
     async def unstake_tao(self, amount: float, netuid: int, hotkey: str) -> Dict:
-        """Unstake TAO tokens."""
+        """Unstake TAO tokens. With STAKE_BATCHING_ENABLED the unstake is netted and batched by the stake engine."""
         try:
+            await self.unlock_coldkey()
+            if settings.STAKE_BATCHING_ENABLED:
+                return await self.stake_engine.submit("unstake", amount, netuid, hotkey)
             result = await self.subtensor.unstake(
                 wallet=self.wallet,
                 netuid=netuid,
@@ -141,4 +543,8 @@ class BittensorService:
         except Exception as e:
             raise Exception(f"Error unstaking TAO: {str(e)}")
 
-bittensor_service = BittensorService() 
\ No newline at end of file
+bittensor_service = BittensorService()
+
+def get_bittensor_service() -> BittensorService:
+    """FastAPI dependency for the shared BittensorService."""
+    return bittensor_service 
\ No newline at end of file
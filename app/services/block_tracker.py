@@ -0,0 +1,88 @@
+import asyncio
+import logging
+from typing import Dict, Optional, Tuple
+import bittensor as bt
+from app.core.config import settings
+
+class BlockTracker:
+    """
+    Follows the finalized chain head over an existing AsyncSubtensor connection and knows each
+    subnet's tempo, so cached dividends can be judged by epoch instead of wall-clock age.
+
+    TaoDividendsPerSubnet for a subnet only changes when its epoch runs, i.e. at blocks where
+    (block + netuid + 1) % (tempo + 1) == 0. Data read at block B is still current as long as
+    no epoch for that subnet has run since B.
+    """
+
+    def __init__(self, subtensor: bt.AsyncSubtensor):
+        self.subtensor = subtensor
+        self.block_number: Optional[int] = None
+        self.block_hash: Optional[str] = None
+        self._tempos: Dict[int, int] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._logger = logging.getLogger(__name__)
+
+    @property
+    def head(self) -> Optional[Tuple[int, str]]:
+        """Latest known (block_number, block_hash), or None before the first head was seen."""
+        if self.block_number is None:
+            return None
+        return self.block_number, self.block_hash
+
+    def last_epoch_block(self, netuid: int, block: int) -> Optional[int]:
+        """Block of the most recent epoch for netuid at or before block, or None if its tempo is unknown."""
+        tempo = self._tempos.get(netuid)
+        if tempo is None:
+            return None
+        return block - (block + netuid + 1) % (tempo + 1)
+
+    def is_current(self, netuid: int, block: int) -> Optional[bool]:
+        """Whether dividends read at block are still current at the head, or None when that cannot be decided."""
+        if self.block_number is None:
+            return None
+        last_epoch = self.last_epoch_block(netuid, self.block_number)
+        if last_epoch is None:
+            return None
+        return last_epoch <= block
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        tempos_refreshed_at = None
+        while True:
+            try:
+                if tempos_refreshed_at is None or loop.time() - tempos_refreshed_at >= settings.BLOCK_TEMPO_REFRESH_INTERVAL:
+                    await self._refresh_tempos()
+                    tempos_refreshed_at = loop.time()
+                await self._poll_head()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._logger.error(f"Failed to follow chain head: {str(e)}")
+            await asyncio.sleep(settings.BLOCK_POLL_INTERVAL)
+
+    async def _poll_head(self):
+        block_hash = await self.subtensor.substrate.get_chain_finalised_head()
+        if block_hash == self.block_hash:
+            return
+        self.block_number = await self.subtensor.substrate.get_block_number(block_hash)
+        self.block_hash = block_hash
+
+    async def _refresh_tempos(self):
+        tempos = {}
+        result = await self.subtensor.substrate.query_map("SubtensorModule", "Tempo")
+        async for k, v in result:
+            tempos[int(getattr(k, "value", k))] = int(getattr(v, "value", v))
+        self._tempos = tempos
@@ -0,0 +1,81 @@
+import asyncio
+import logging
+import random
+from typing import Optional
+from app.core.config import settings
+from app.core.redis import get_redis_client
+from app.services.bittensor import BittensorService, bittensor_service
+from app.services.dividend_cache import dividend_cache
+
+class CacheWarmer:
+    """
+    Periodically refreshes every subnet's `tao_dividends:{netuid}` map ahead of expiry so API
+    callers are served from cache instead of waiting on the chain.
+
+    With BLOCK_AWARE_CACHE only subnets whose epoch has run since they were cached are refreshed.
+    Each round is guarded by a Redis lock, so only one API worker warms per interval. Subnet
+    refreshes are spread over a random delay so their expiries don't line up again.
+    """
+
+    LOCK_KEY = "tao_dividends:warmer"
+
+    def __init__(self, service: BittensorService):
+        self._service = service
+        self._task: Optional[asyncio.Task] = None
+        self._logger = logging.getLogger(__name__)
+
+    async def start(self):
+        if settings.CACHE_WARMER_ENABLED and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        interval = settings.CACHE_WARMER_INTERVAL
+        while True:
+            try:
+                await self.warm()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._logger.error(f"Cache warming failed: {str(e)}")
+            jitter = interval * settings.CACHE_WARMER_JITTER
+            await asyncio.sleep(max(1.0, interval + random.uniform(-jitter, jitter)))
+
+    async def warm(self) -> bool:
+        """Refresh all subnets unless another worker already holds this round. Returns whether it ran."""
+        lock_timeout = max(1.0, settings.CACHE_WARMER_INTERVAL * (1 - settings.CACHE_WARMER_JITTER))
+        lock = get_redis_client().lock(self.LOCK_KEY, timeout=lock_timeout, blocking=False)
+        if not await lock.acquire():
+            return False
+        # The lock is left to expire so no other worker starts a round before the next interval
+
+        netuids = await self._service._get_all_subnets(refresh=True)
+        if settings.BLOCK_AWARE_CACHE:
+            # Subnets whose epoch has not run since they were cached are left alone
+            statuses = await dividend_cache.freshness(netuids, is_current=self._service._is_current)
+            netuids = [netuid for netuid in netuids if statuses[netuid] != "hit"]
+
+        semaphore = asyncio.Semaphore(max(1, settings.CACHE_WARMER_CONCURRENCY))
+        spread = settings.CACHE_WARMER_INTERVAL * settings.CACHE_WARMER_JITTER
+
+        async def refresh(netuid: int):
+            await asyncio.sleep(random.uniform(0, spread))
+            async with semaphore:
+                try:
+                    await self._service.refresh_subnet_dividends(netuid)
+                except Exception as e:
+                    self._logger.error(f"Failed to warm dividends for subnet {netuid}: {str(e)}")
+
+        await asyncio.gather(*(refresh(netuid) for netuid in netuids))
+        self._logger.info(f"Warmed dividends cache for {len(netuids)} subnets")
+        return True
+
+cache_warmer = CacheWarmer(bittensor_service)
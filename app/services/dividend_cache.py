@@ -0,0 +1,432 @@
+import asyncio
+import json
+import logging
+import time
+import uuid
+from typing import Callable, Dict, List, Optional, Tuple
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.metrics import CACHE_REQUESTS
+from app.core.redis import get_redis_binary_client, get_redis_client
+from app.services.dividend_codec import LOOKUP_SCRIPT, PackedDividends, address_bytes, decode_value, encode_dividends
+
+INVALIDATION_CHANNEL = "tao_dividends:invalidate"
+CACHE_FORMATS = ("hash", "packed")
+
+# (netuid, block) -> whether data read at block is still current, or None if unknown
+IsCurrent = Callable[[int, int], Optional[bool]]
+# (dividends, block they were read at)
+CachedDividends = Tuple[Dict[str, int], Optional[int]]
+
+class DividendCache:
+    """
+    Redis hash cache for TaoDividendsPerSubnet, one `tao_dividends:{netuid}` hash per subnet.
+    Reads and writes for a whole request are batched into a single pipeline round trip each.
+
+    Full subnet maps carry a `tao_dividends:{netuid}:meta` hash recording when they were fetched.
+    A map older than REDIS_CACHE_EXPIRY is still served as "stale" for DIVIDENDS_STALE_TTL
+    seconds so callers can revalidate it in the background instead of blocking on the chain.
+    With BLOCK_AWARE_CACHE the metadata also records the block the map was read at, and the map
+    stays valid until the subnet's next epoch rather than for a fixed TTL.
+
+    When L1_CACHE_ENABLED is set, an in-process LRU/TTL cache sits in front of Redis. Writes are
+    broadcast on a pub/sub channel so the L1 caches of other workers drop the affected subnets.
+
+    With DIVIDEND_CACHE_FORMAT=packed, full subnet maps are instead stored as one binary blob
+    (see dividend_codec) in a `tao_dividends:{netuid}:packed` string, which cuts Redis memory and
+    the per-entry parsing of HGETALL. Single-hotkey reads binary-search the blob inside Redis
+    (LOOKUP_SCRIPT) and only transfer the 8-byte value; compressed blobs are fetched whole, and
+    only for hotkeys that have no entry of their own. The metadata records the format, so a map
+    written in the other format is never served after DIVIDEND_CACHE_FORMAT changes.
+
+    Single-hotkey entries live apart from the maps, in a `tao_dividends:{netuid}:hotkeys` hash in
+    both formats, so a map is only ever served with the values of the block it was read at.
+    Entries are stored as `dividend:block` when the block is known, classified by that block
+    rather than by the map's metadata, and expire per field. Writing a full map drops its
+    subnet's hotkey entries, so an entry is never older than the map it shadows.
+    """
+
+    def __init__(self):
+        self._logger = logging.getLogger(__name__)
+        if settings.DIVIDEND_CACHE_FORMAT not in CACHE_FORMATS:
+            raise ValueError(f"Unknown dividend cache format: {settings.DIVIDEND_CACHE_FORMAT}")
+        self.format = settings.DIVIDEND_CACHE_FORMAT
+        self.packed = self.format == "packed"
+        self._lookup_script = None
+        self._instance_id = uuid.uuid4().hex
+        self._subscriber: Optional[asyncio.Task] = None
+        self.l1: Optional[TTLCache] = None
+        if settings.L1_CACHE_ENABLED:
+            self.l1 = TTLCache(
+                maxsize=settings.L1_CACHE_MAX_ENTRIES,
+                ttl=min(settings.L1_CACHE_TTL, settings.REDIS_CACHE_EXPIRY)
+            )
+
+    @staticmethod
+    def cache_key(netuid: int) -> str:
+        return f"tao_dividends:{netuid}"
+
+    @staticmethod
+    def meta_key(netuid: int) -> str:
+        return f"tao_dividends:{netuid}:meta"
+
+    @staticmethod
+    def packed_key(netuid: int) -> str:
+        return f"tao_dividends:{netuid}:packed"
+
+    @staticmethod
+    def hotkeys_key(netuid: int) -> str:
+        return f"tao_dividends:{netuid}:hotkeys"
+
+    def _queue_meta(self, pipe, netuid: int):
+        """Queue the read of a subnet's map metadata: (fetched_at, block, format)."""
+        pipe.hmget(self.meta_key(netuid), "fetched_at", "block", "format")
+
+    def _is_map(self, fetched_at, map_format) -> bool:
+        """Whether a subnet's metadata describes a full map in the configured format."""
+        if isinstance(map_format, bytes):
+            map_format = map_format.decode()
+        # Metadata written before the format was recorded always describes a hash map
+        return fetched_at is not None and (map_format or "hash") == self.format
+
+    @staticmethod
+    def _parse_field(value) -> Tuple[int, Optional[int]]:
+        """Split a single-hotkey entry into (dividend, block); entries written without a block carry none."""
+        dividend, _, block = value.partition(b":" if isinstance(value, bytes) else ":")
+        return int(dividend), (int(block) if block else None)
+
+    @staticmethod
+    def _parse_map(values: Dict[str, str]) -> Dict[str, int]:
+        return {k: int(v) for k, v in values.items()}
+
+    def _redis(self):
+        # Blobs are not valid UTF-8, so packed reads skip response decoding; int()/float() accept bytes
+        return get_redis_binary_client() if self.packed else get_redis_client()
+
+    async def _queue_lookup(self, pipe, netuid: int, address: bytes):
+        if self._lookup_script is None:
+            self._lookup_script = self._redis().register_script(LOOKUP_SCRIPT)
+        # On a pipeline this only queues EVALSHA; the pipeline loads the script on NOSCRIPT
+        await self._lookup_script(keys=[self.packed_key(netuid)], args=[address], client=pipe)
+
+    async def _fetch_packed(self, redis, netuids: List[int]) -> Dict[int, PackedDividends]:
+        async with redis.pipeline(transaction=False) as pipe:
+            for netuid in netuids:
+                pipe.get(self.packed_key(netuid))
+            blobs = await pipe.execute()
+        return {netuid: PackedDividends(blob) for netuid, blob in zip(netuids, blobs) if blob is not None}
+
+    def _read_l1(self, netuid: int, hotkey: Optional[str] = None, is_current: Optional[IsCurrent] = None) -> Optional[CachedDividends]:
+        entry = self.l1.get((netuid, hotkey))
+        if entry is None and hotkey:
+            subnet_entry = self.l1.get((netuid, None))
+            if subnet_entry is not None and hotkey in subnet_entry[0]:
+                entry = ({hotkey: subnet_entry[0][hotkey]}, subnet_entry[1])
+
+        if entry is not None and entry[1] is not None and is_current is not None \
+                and is_current(netuid, entry[1]) is False:
+            entry = None
+
+        if entry is None:
+            CACHE_REQUESTS.labels("dividends_l1", "miss").inc()
+        else:
+            CACHE_REQUESTS.labels("dividends_l1", "hit").inc()
+        return entry
+
+    async def read(
+        self,
+        netuids: List[int],
+        hotkey: Optional[str] = None,
+        is_current: Optional[IsCurrent] = None
+    ) -> Dict[int, Tuple[Optional[Dict[str, int]], str, Optional[int]]]:
+        """
+        Read cached dividends for several subnets in one round trip.
+        Returns a mapping of netuid to (dividends, cache_status, block), where cache_status is
+        "l1", "hit", "stale" or "miss", dividends is None on a miss and block is the block the
+        entry was read at, when known.
+
+        is_current(netuid, block) decides block-tagged entries by epoch; when it returns None
+        the entry falls back to wall-clock expiry.
+        """
+        if hotkey:
+            pairs = await self.read_pairs([(netuid, hotkey) for netuid in netuids], is_current)
+            return {
+                netuid: ({hotkey: value} if value is not None else None, status, block)
+                for (netuid, _), (value, status, block) in pairs.items()
+            }
+
+        cached = {}
+        remote = []
+        for netuid in netuids:
+            entry = self._read_l1(netuid, None, is_current) if self.l1 is not None else None
+            if entry is not None:
+                cached[netuid] = (entry[0], "l1", entry[1])
+            else:
+                remote.append(netuid)
+
+        if not remote:
+            return cached
+
+        redis = self._redis()
+        async with redis.pipeline(transaction=False) as pipe:
+            for netuid in remote:
+                if self.packed:
+                    pipe.get(self.packed_key(netuid))
+                else:
+                    pipe.hgetall(self.cache_key(netuid))
+                self._queue_meta(pipe, netuid)
+            values = iter(await pipe.execute())
+
+        now = time.time()
+        for netuid in remote:
+            value = next(values)
+            fetched_at, block, map_format = next(values)
+            block = int(block) if block is not None else None
+            dividends = None
+            # Without metadata in this format there is no map, or only one in the other format
+            if value is not None and self._is_map(fetched_at, map_format):
+                dividends = PackedDividends(value).to_dict() if self.packed else self._parse_map(value)
+
+            if dividends is None:
+                CACHE_REQUESTS.labels("dividends_redis", "miss").inc()
+                cached[netuid] = (None, "miss", None)
+                continue
+
+            status = self._freshness(netuid, fetched_at, block, now, is_current)
+            CACHE_REQUESTS.labels("dividends_redis", status).inc()
+            if status == "hit" and self.l1 is not None:
+                self.l1.set((netuid, None), (dividends, block))
+            cached[netuid] = (dividends, status, block) if status != "miss" else (None, "miss", None)
+        return cached
+
+    async def read_pairs(
+        self,
+        pairs: List[Tuple[int, str]],
+        is_current: Optional[IsCurrent] = None
+    ) -> Dict[Tuple[int, str], Tuple[Optional[int], str, Optional[int]]]:
+        """
+        Read cached dividends for arbitrary (netuid, hotkey) pairs in one round trip.
+        Returns a mapping of pair to (dividend, cache_status, block), with the same statuses as read().
+        """
+        cached = {}
+        remote = []
+        for netuid, hotkey in pairs:
+            entry = self._read_l1(netuid, hotkey, is_current) if self.l1 is not None else None
+            if entry is not None:
+                cached[(netuid, hotkey)] = (entry[0][hotkey], "l1", entry[1])
+            else:
+                remote.append((netuid, hotkey))
+
+        if not remote:
+            return cached
+
+        netuids = sorted({netuid for netuid, _ in remote})
+        addresses = {}
+        if self.packed:
+            addresses = {pair: address for pair in remote if (address := address_bytes(pair[1])) is not None}
+        redis = self._redis()
+        in_map = list(addresses) if self.packed else remote
+        async with redis.pipeline(transaction=False) as pipe:
+            for netuid, hotkey in remote:
+                pipe.hget(self.hotkeys_key(netuid), hotkey)
+            for netuid, hotkey in in_map:
+                if self.packed:
+                    await self._queue_lookup(pipe, netuid, addresses[(netuid, hotkey)])
+                else:
+                    pipe.hget(self.cache_key(netuid), hotkey)
+            for netuid in netuids:
+                self._queue_meta(pipe, netuid)
+            values = iter(await pipe.execute())
+
+        entries = {pair: next(values) for pair in remote}
+        found = {pair: next(values) for pair in in_map}
+        meta = {netuid: next(values) for netuid in netuids}
+
+        # Compressed blobs cannot be searched inside Redis; fetch them only for hotkeys without their own entry
+        compressed = sorted({pair[0] for pair, value in found.items() if self.packed and value == -1 and entries[pair] is None})
+        maps = await self._fetch_packed(redis, compressed) if compressed else {}
+
+        now = time.time()
+        for netuid, hotkey in remote:
+            entry = entries[(netuid, hotkey)]
+            fetched_at, block, map_format = meta[netuid]
+            block = int(block) if block is not None else None
+            value = None
+            if entry is not None:
+                # The entry carries its own block and expires on its own
+                value, block = self._parse_field(entry)
+                fetched_at = None
+            elif self._is_map(fetched_at, map_format):
+                raw = found.get((netuid, hotkey))
+                if netuid in maps:
+                    value = maps[netuid].get(hotkey)
+                elif raw is not None and raw != -1:
+                    value = decode_value(raw) if self.packed else int(raw)
+            status = "miss" if value is None else self._freshness(netuid, fetched_at, block, now, is_current)
+            CACHE_REQUESTS.labels("dividends_redis", status).inc()
+            if status == "miss":
+                cached[(netuid, hotkey)] = (None, "miss", None)
+                continue
+            if status == "hit" and self.l1 is not None:
+                self.l1.set((netuid, hotkey), ({hotkey: value}, block))
+            cached[(netuid, hotkey)] = (value, status, block)
+        return cached
+
+    async def freshness(self, netuids: List[int], is_current: Optional[IsCurrent] = None) -> Dict[int, str]:
+        """
+        Classify each subnet's cached map as "hit", "stale" or "miss" from its metadata alone, in
+        one round trip. Unlike read(), this neither transfers the maps nor touches L1 or the cache
+        metrics, so background refreshes do not skew them.
+        """
+        async with self._redis().pipeline(transaction=False) as pipe:
+            for netuid in netuids:
+                self._queue_meta(pipe, netuid)
+            values = await pipe.execute()
+
+        now = time.time()
+        statuses = {}
+        for netuid, (fetched_at, block, map_format) in zip(netuids, values):
+            if not self._is_map(fetched_at, map_format):
+                statuses[netuid] = "miss"
+                continue
+            block = int(block) if block is not None else None
+            statuses[netuid] = self._freshness(netuid, fetched_at, block, now, is_current)
+        return statuses
+
+    @staticmethod
+    def _freshness(
+        netuid: int,
+        fetched_at: Optional[str],
+        block: Optional[int],
+        now: float,
+        is_current: Optional[IsCurrent] = None
+    ) -> str:
+        """Classify a cached entry as "hit", "stale" or "miss" by epoch when possible, otherwise by age."""
+        current = is_current(netuid, block) if (is_current is not None and block is not None) else None
+        if current is None:
+            expired = fetched_at is not None and now - float(fetched_at) >= settings.REDIS_CACHE_EXPIRY
+        else:
+            expired = not current
+
+        if not expired:
+            return "hit"
+        if settings.DIVIDENDS_STALE_TTL <= 0:
+            return "miss"
+        if current is None and now - float(fetched_at) >= settings.REDIS_CACHE_EXPIRY + settings.DIVIDENDS_STALE_TTL:
+            return "miss"
+        return "stale"
+
+    async def write(self, dividends: Dict[int, Dict[str, int]], hotkey: Optional[str] = None, block: Optional[int] = None):
+        """
+        Write dividends for several subnets and their TTLs in one transactional round trip.
+        With hotkey set, dividends holds single-hotkey entries rather than full subnet maps.
+        """
+        if hotkey:
+            await self.write_batch(hotkeys=dividends, block=block)
+        else:
+            await self.write_batch(maps=dividends, block=block)
+
+    async def write_batch(
+        self,
+        maps: Optional[Dict[int, Dict[str, int]]] = None,
+        hotkeys: Optional[Dict[int, Dict[str, int]]] = None,
+        block: Optional[int] = None
+    ):
+        """
+        Write full subnet maps and individual hotkey entries in one transactional round trip.
+        Full subnet maps replace the whole map, its metadata (tagged with the block they were read
+        at) and the subnet's hotkey entries. Hotkey entries are tagged with the block too and
+        expire per field in their own hash, so they never change or extend a full subnet map.
+        """
+        maps = maps or {}
+        hotkeys = {netuid: values for netuid, values in (hotkeys or {}).items() if values}
+        if not maps and not hotkeys:
+            return
+
+        if settings.BLOCK_AWARE_CACHE:
+            ttl = settings.BLOCK_CACHE_MAX_AGE
+        else:
+            ttl = settings.REDIS_CACHE_EXPIRY + settings.DIVIDENDS_STALE_TTL
+        # Block-tagged hotkey entries are invalidated by epoch like full maps
+        field_ttl = ttl if settings.BLOCK_AWARE_CACHE and block is not None else settings.REDIS_CACHE_EXPIRY
+        meta = {"fetched_at": time.time(), "format": self.format}
+        if block is not None:
+            meta["block"] = block
+
+        redis = get_redis_client()
+        async with redis.pipeline(transaction=True) as pipe:
+            for netuid, values in maps.items():
+                cache_key = self.cache_key(netuid)
+                # Clear both formats so switching DIVIDEND_CACHE_FORMAT never serves an older map
+                # Also drop single-hotkey entries, which are no newer than this map
+                pipe.delete(cache_key, self.meta_key(netuid), self.packed_key(netuid), self.hotkeys_key(netuid))
+                if self.packed:
+                    blob = encode_dividends(values, compress=settings.DIVIDEND_CACHE_COMPRESS)
+                    pipe.set(self.packed_key(netuid), blob, ex=ttl)
+                elif values:
+                    pipe.hset(cache_key, mapping=values)
+                    pipe.expire(cache_key, ttl)
+                pipe.hset(self.meta_key(netuid), mapping=meta)
+                pipe.expire(self.meta_key(netuid), ttl)
+            for netuid, values in hotkeys.items():
+                hotkeys_key = self.hotkeys_key(netuid)
+                if block is not None:
+                    pipe.hset(hotkeys_key, mapping={k: f"{v}:{block}" for k, v in values.items()})
+                else:
+                    pipe.hset(hotkeys_key, mapping=values)
+                pipe.hexpire(hotkeys_key, field_ttl, *values.keys())
+            if self.l1 is not None:
+                pipe.publish(INVALIDATION_CHANNEL, json.dumps({
+                    "origin": self._instance_id,
+                    "netuids": list(set(maps) | set(hotkeys))
+                }))
+            await pipe.execute()
+
+        if self.l1 is not None:
+            for netuid, values in maps.items():
+                self.l1.set((netuid, None), (values, block))
+            for netuid, values in hotkeys.items():
+                for hotkey, dividend in values.items():
+                    self.l1.set((netuid, hotkey), ({hotkey: dividend}, block))
+
+    def invalidate(self, netuids: List[int]):
+        """Drop every L1 entry (full map and single hotkeys) for the given subnets."""
+        if self.l1 is None:
+            return
+        netuids = set(netuids)
+        self.l1.discard_where(lambda key: key[0] in netuids)
+
+    async def start(self):
+        """Start listening for invalidations from other workers."""
+        if self.l1 is not None and self._subscriber is None:
+            self._subscriber = asyncio.create_task(self._listen_for_invalidations())
+
+    async def stop(self):
+        if self._subscriber is not None:
+            self._subscriber.cancel()
+            try:
+                await self._subscriber
+            except asyncio.CancelledError:
+                pass
+            self._subscriber = None
+
+    async def _listen_for_invalidations(self):
+        while True:
+            pubsub = get_redis_client().pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.subscribe(INVALIDATION_CHANNEL)
+                # Anything written while we were not subscribed may be stale
+                self.l1.clear()
+                async for message in pubsub.listen():
+                    payload = json.loads(message["data"])
+                    if payload["origin"] != self._instance_id:
+                        self.invalidate(payload["netuids"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._logger.error(f"L1 invalidation listener failed, resubscribing: {str(e)}")
+                await asyncio.sleep(1)
+            finally:
+                await pubsub.aclose()
+
+dividend_cache = DividendCache()
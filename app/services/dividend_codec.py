@@ -0,0 +1,147 @@
+import re
+import struct
+import sys
+import zlib
+from array import array
+from typing import Dict, Optional
+
+# magic, flags, entry count
+HEADER = struct.Struct("<4sBI")
+MAGIC = b"TDV2"
+FLAG_ZLIB = 1
+# SS58 addresses of 32-byte account ids with a one-byte network prefix are always 48 characters
+ADDRESS_SIZE = 48
+VALUE_SIZE = 8
+_ADDRESSES = re.compile(f".{{{ADDRESS_SIZE}}}", re.DOTALL)
+
+# Binary search for one address inside an uncompressed blob stored as a Redis string, so a
+# single-hotkey read moves 8 bytes instead of the whole map. KEYS[1] is the blob, ARGV[1] the
+# address. Returns the little-endian dividend, nil when absent, or -1 for a compressed blob,
+# which can only be searched after fetching and decompressing it.
+LOOKUP_SCRIPT = f"""
+local header = redis.call("GETRANGE", KEYS[1], 0, {HEADER.size - 1})
+if #header < {HEADER.size} or string.sub(header, 1, 4) ~= "{MAGIC.decode()}" then
+    return false
+end
+if string.byte(header, 5) ~= 0 then
+    return -1
+end
+local b1, b2, b3, b4 = string.byte(header, 6, 9)
+local count = b1 + b2 * 256 + b3 * 65536 + b4 * 16777216
+local target = ARGV[1]
+
+local function address(i)
+    local offset = {HEADER.size} + i * {ADDRESS_SIZE}
+    return redis.call("GETRANGE", KEYS[1], offset, offset + {ADDRESS_SIZE - 1})
+end
+
+-- Byte-wise, since Lua's string < follows the server's collation locale
+local function less(a, b)
+    for i = 1, {ADDRESS_SIZE} do
+        local x, y = string.byte(a, i), string.byte(b, i)
+        if x ~= y then
+            return x < y
+        end
+    end
+    return false
+end
+
+local lo, hi = 0, count
+while lo < hi do
+    local mid = math.floor((lo + hi) / 2)
+    if less(address(mid), target) then
+        lo = mid + 1
+    else
+        hi = mid
+    end
+end
+if lo < count and address(lo) == target then
+    local offset = {HEADER.size} + count * {ADDRESS_SIZE} + lo * {VALUE_SIZE}
+    return redis.call("GETRANGE", KEYS[1], offset, offset + {VALUE_SIZE - 1})
+end
+return false
+"""
+
+def _values_from_bytes(data) -> array:
+    values = array("Q")
+    values.frombytes(data)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
+
+def address_bytes(hotkey: str) -> Optional[bytes]:
+    """The hotkey as stored in a blob, or None if it cannot be one (not a 48-character ASCII address)."""
+    if len(hotkey) != ADDRESS_SIZE or not hotkey.isascii():
+        return None
+    return hotkey.encode("ascii")
+
+def decode_value(raw: bytes) -> int:
+    """Dividend returned by LOOKUP_SCRIPT."""
+    return int.from_bytes(raw, "little")
+
+def encode_dividends(dividends: Dict[str, int], compress: bool = False) -> bytes:
+    """
+    Pack a subnet's {hotkey: dividend} map into one blob: a header, the 48-character SS58
+    addresses sorted ascending, then the dividends as little-endian u64 in the same order, the
+    body optionally zlib-compressed. About 56 bytes per hotkey before compression. Addresses are
+    stored as text rather than as account ids so decoding needs no per-hotkey SS58 encoding.
+    """
+    hotkeys = sorted(dividends)
+    addresses = "".join(hotkeys)
+    if len(addresses) != len(hotkeys) * ADDRESS_SIZE or not addresses.isascii():
+        raise ValueError("Packed dividends need 48-character SS58 addresses")
+    values = array("Q", [dividends[hotkey] for hotkey in hotkeys])
+    if sys.byteorder == "big":
+        values.byteswap()
+    body = addresses.encode("ascii") + values.tobytes()
+    flags = 0
+    if compress:
+        body = zlib.compress(body, 1)
+        flags |= FLAG_ZLIB
+    return HEADER.pack(MAGIC, flags, len(hotkeys)) + body
+
+class PackedDividends:
+    """
+    Read-only view of an encoded subnet map. to_dict() splits the addresses and converts the
+    dividends in C, without a per-hotkey Python loop; single hotkeys are found by binary search
+    over the sorted addresses without building a dict.
+    """
+
+    def __init__(self, blob: bytes):
+        magic, flags, count = HEADER.unpack_from(blob)
+        if magic != MAGIC:
+            raise ValueError("Not a packed dividends blob")
+        body = memoryview(blob)[HEADER.size:]
+        if flags & FLAG_ZLIB:
+            body = memoryview(zlib.decompress(body))
+        if len(body) != count * (ADDRESS_SIZE + VALUE_SIZE):
+            raise ValueError("Truncated packed dividends blob")
+        self._count = count
+        self._addresses = body[:count * ADDRESS_SIZE]
+        self._values = _values_from_bytes(body[count * ADDRESS_SIZE:])
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _address(self, i: int) -> bytes:
+        return self._addresses[i * ADDRESS_SIZE:(i + 1) * ADDRESS_SIZE].tobytes()
+
+    def get(self, hotkey: str) -> Optional[int]:
+        """Dividend of one hotkey, or None if the map does not contain it."""
+        target = address_bytes(hotkey)
+        if target is None:
+            return None
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._address(mid) < target:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self._count and self._address(lo) == target:
+            return self._values[lo]
+        return None
+
+    def to_dict(self) -> Dict[str, int]:
+        hotkeys = _ADDRESSES.findall(str(self._addresses, "ascii"))
+        return dict(zip(hotkeys, self._values.tolist()))
@@ -1,18 +1,43 @@
 from typing import List, Dict, Literal
+import asyncio
+import hashlib
+import json
 import logging
+import re
 import httpx
 from app.core.config import settings
+from app.core.http import ResilientClient
+from app.core.metrics import CACHE_REQUESTS
+from app.core.redis import get_redis_client
+from app.core.singleflight import SingleFlight
+
+SCORE_PATTERN = re.compile(r"[-+]?\d+(?:\.\d+)?")
 
 class SentimentService:
     def __init__(self):
-        self.http_client = httpx.AsyncClient()
+        self.datura_client = ResilientClient(
+            "datura",
+            timeout=httpx.Timeout(connect=5.0, read=settings.DATURA_READ_TIMEOUT, write=5.0, pool=5.0),
+            hedge_delay=settings.DATURA_HEDGE_DELAY
+        )
+        self.chutes_client = ResilientClient(
+            "chutes",
+            timeout=httpx.Timeout(connect=5.0, read=settings.CHUTES_READ_TIMEOUT, write=5.0, pool=5.0)
+        )
         self._logger = logging.getLogger(__name__)
+        self._single_flight = SingleFlight(
+            "sentiment",
+            distributed=settings.SINGLEFLIGHT_DISTRIBUTED,
+            lock_timeout=settings.SINGLEFLIGHT_LOCK_TIMEOUT,
+            result_ttl=settings.SINGLEFLIGHT_RESULT_TTL,
+            poll_interval=settings.SINGLEFLIGHT_POLL_INTERVAL
+        )
 
     async def search_tweets(self, query: str, max_results: int = 10, sort: Literal["Latest", "Top"] = "Latest") -> List[Dict]:
         """
         Search for tweets using Datura.ai API
         """
-        response = await self.http_client.post(
+        response = await self.datura_client.post(
             "https://apis.datura.ai/twitter",
             headers={
                 "Authorization": settings.DATURA_API_KEY,
@@ -22,34 +47,61 @@ class SentimentService:
                 "query": query,
                 "count": max_results,
                 "sort": sort
-            },
-            timeout=httpx.Timeout(connect=5.0, read=60.0, write=5.0, pool=5.0)
+            }
         )
         response.raise_for_status()
         return response.json()
 
     async def get_subnet_sentiment(self, netuid: int) -> Dict:
         """
-        Get sentiment analysis for tweets about a specific subnet
+        Get sentiment analysis for tweets about a specific subnet.
+        Results are cached per netuid, and concurrent requests for the same netuid share one computation.
         """
+        redis = get_redis_client()
+        cached = await redis.get(f"sentiment:{netuid}")
+        CACHE_REQUESTS.labels("sentiment", "hit" if cached else "miss").inc()
+        if cached:
+            return json.loads(cached)
+
+        return await self._single_flight.do(str(netuid), lambda: self._compute_subnet_sentiment(netuid))
+
+    async def _compute_subnet_sentiment(self, netuid: int) -> Dict:
         query = f"Bittensor netuid {netuid}"
         tweets = await self.search_tweets(query)
         
         if not tweets:
-            return {
+            sentiment = {
                 "netuid": netuid,
                 "tweet_count": 0,
                 "sentiment_score": 0
             }
-        
-        tweet_texts = [tweet.get("text", "").replace("\n", " ") for tweet in tweets]
+        else:
+            tweet_texts = [tweet.get("text", "").replace("\n", " ") for tweet in tweets]
+            sentiment = {
+                "netuid": netuid,
+                "tweet_count": len(tweets),
+                "sentiment_score": await self._score_tweets(tweet_texts)
+            }
+
+        redis = get_redis_client()
+        await redis.set(f"sentiment:{netuid}", json.dumps(sentiment), ex=settings.SENTIMENT_CACHE_TTL)
+        return sentiment
+
+    async def _score_tweets(self, tweet_texts: List[str]) -> float:
+        """
+        Score tweets, reusing a previous LLM result when the same set of tweets was already analyzed.
+        """
+        cache_key = f"sentiment:tweets:{self._fingerprint(tweet_texts)}"
+
+        redis = get_redis_client()
+        cached_score = await redis.get(cache_key)
+        CACHE_REQUESTS.labels("sentiment_tweets", "miss" if cached_score is None else "hit").inc()
+        if cached_score is not None:
+            return float(cached_score)
+
         sentiment_score = await self._analyze_sentiment(tweet_texts)
-        
-        return {
-            "netuid": netuid,
-            "tweet_count": len(tweets),
-            "sentiment_score": sentiment_score
-        }
+        await redis.set(cache_key, sentiment_score, ex=settings.SENTIMENT_TWEETS_CACHE_TTL)
+        return sentiment_score
 
     async def _analyze_sentiment(self, tweets: List[str]) -> float:
         """
@@ -64,7 +116,132 @@ class SentimentService:
         {tweets}
         """
         
-        response = await self.http_client.post(
+        return self._parse_score(await self._complete(prompt))
+
+    async def get_subnets_sentiment(self, netuids: List[int]) -> List[Dict]:
+        """
+        Get sentiment analysis for many subnets at once. Cached subnets are served from Redis,
+        tweets for the rest are fetched concurrently, and unscored tweet sets are packed into
+        shared LLM prompts of SENTIMENT_BATCH_SIZE subnets each. A subnet whose tweets or score
+        cannot be fetched is returned as {"netuid", "error"} and not cached; the others still are.
+        """
+        netuids = list(dict.fromkeys(netuids))
+        if not netuids:
+            return []
+
+        redis = get_redis_client()
+        cached = await redis.mget([f"sentiment:{netuid}" for netuid in netuids])
+        results = {netuid: json.loads(value) for netuid, value in zip(netuids, cached) if value}
+
+        misses = [netuid for netuid in netuids if netuid not in results]
+        CACHE_REQUESTS.labels("sentiment", "hit").inc(len(results))
+        CACHE_REQUESTS.labels("sentiment", "miss").inc(len(misses))
+        if misses:
+            key = ",".join(map(str, sorted(misses)))
+            computed = await self._single_flight.do(f"batch:{key}", lambda: self._compute_subnets_sentiment(misses))
+            for sentiment in computed:
+                results[sentiment["netuid"]] = sentiment
+
+        return [results[netuid] for netuid in netuids]
+
+    async def _compute_subnets_sentiment(self, netuids: List[int]) -> List[Dict]:
+        semaphore = asyncio.Semaphore(max(1, settings.SENTIMENT_FETCH_CONCURRENCY))
+
+        async def fetch(netuid: int):
+            async with semaphore:
+                return await self.search_tweets(f"Bittensor netuid {netuid}")
+
+        tweets = {}
+        errors: Dict[int, str] = {}
+        for netuid, result in zip(netuids, await asyncio.gather(*(fetch(netuid) for netuid in netuids), return_exceptions=True)):
+            if isinstance(result, BaseException):
+                self._logger.warning(f"Fetching tweets for subnet {netuid} failed: {str(result)}")
+                errors[netuid] = f"Error fetching tweets: {str(result) or type(result).__name__}"
+            else:
+                tweets[netuid] = result
+        tweet_texts = {
+            netuid: [tweet.get("text", "").replace("\n", " ") for tweet in subnet_tweets]
+            for netuid, subnet_tweets in tweets.items() if subnet_tweets
+        }
+
+        # Reuse scores of tweet sets that were already analyzed
+        redis = get_redis_client()
+        fingerprints = {netuid: self._fingerprint(texts) for netuid, texts in tweet_texts.items()}
+        cached_scores = await redis.mget([f"sentiment:tweets:{fp}" for fp in fingerprints.values()]) if fingerprints else []
+        scores = {netuid: float(score) for netuid, score in zip(fingerprints, cached_scores) if score is not None}
+
+        unscored = [netuid for netuid in tweet_texts if netuid not in scores]
+        CACHE_REQUESTS.labels("sentiment_tweets", "hit").inc(len(scores))
+        CACHE_REQUESTS.labels("sentiment_tweets", "miss").inc(len(unscored))
+        batch_size = max(1, settings.SENTIMENT_BATCH_SIZE)
+        batches = [unscored[i:i + batch_size] for i in range(0, len(unscored), batch_size)]
+        batch_results = await asyncio.gather(
+            *(self._analyze_batch({n: tweet_texts[n] for n in batch}) for batch in batches),
+            return_exceptions=True
+        )
+        for batch, batch_scores in zip(batches, batch_results):
+            if isinstance(batch_scores, BaseException):
+                self._logger.warning(f"Scoring subnets {batch} failed: {str(batch_scores)}")
+            else:
+                scores.update(batch_scores)
+        for netuid in unscored:
+            if netuid not in scores:
+                errors[netuid] = "Error analyzing sentiment"
+
+        sentiments = [
+            {"netuid": netuid, "error": errors[netuid]} if netuid in errors else {
+                "netuid": netuid,
+                "tweet_count": len(tweets[netuid] or []),
+                "sentiment_score": scores.get(netuid, 0)
+            }
+            for netuid in netuids
+        ]
+
+        async with redis.pipeline(transaction=False) as pipe:
+            for netuid in unscored:
+                if netuid in scores:
+                    pipe.set(f"sentiment:tweets:{fingerprints[netuid]}", scores[netuid], ex=settings.SENTIMENT_TWEETS_CACHE_TTL)
+            for sentiment in sentiments:
+                if "error" not in sentiment:
+                    pipe.set(f"sentiment:{sentiment['netuid']}", json.dumps(sentiment), ex=settings.SENTIMENT_CACHE_TTL)
+            await pipe.execute()
+        return sentiments
+
+    async def _analyze_batch(self, tweets: Dict[int, List[str]]) -> Dict[int, float]:
+        """
+        Score several subnets' tweets in one packed prompt. Subnets missing from an unparseable
+        or incomplete response are scored one by one instead; subnets whose individual call
+        fails too are left out of the result.
+        """
+        scores = {}
+        if len(tweets) > 1:
+            sections = "\n\n".join(
+                f"Subnet {netuid} tweets:\n" + "\n".join(texts) for netuid, texts in tweets.items()
+            )
+            prompt = f"""
+        "Analyze the sentiment of the tweets about each of these Bittensor subnets separately. For each subnet return a score between -100 and +100, where -100 is extremely negative and +100 is extremely positive. Return only a JSON object mapping each subnet number to its score, for example {{"1": 35, "7": -20}}, without any other text or explanations."
+
+        {sections}
+        """
+            try:
+                scores = self._parse_batch_scores(await self._complete(prompt), list(tweets))
+            except Exception as e:
+                self._logger.warning(f"Packed sentiment request failed, scoring subnets individually: {str(e)}")
+
+        missing = [netuid for netuid in tweets if netuid not in scores]
+        results = await asyncio.gather(*(self._analyze_sentiment(tweets[n]) for n in missing), return_exceptions=True)
+        for netuid, score in zip(missing, results):
+            if isinstance(score, BaseException):
+                self._logger.warning(f"Sentiment analysis for subnet {netuid} failed: {str(score)}")
+            else:
+                scores[netuid] = score
+        return scores
+
+    async def _complete(self, prompt: str) -> str:
+        """
+        Run a single-message chat completion using Chutes.ai API and return the reply text
+        """
+        response = await self.chutes_client.post(
             "https://llm.chutes.ai/v1/chat/completions",
             headers={
                 "Authorization": f"Bearer {settings.CHUTES_API_KEY}",
@@ -78,14 +255,64 @@ class SentimentService:
                         "content": prompt
                     }
                 ]
-            },
-            timeout=httpx.Timeout(connect=5.0, read=60.0, write=5.0, pool=5.0)
+            }
         )
         response.raise_for_status()
         result = response.json()
-        return float(result["choices"][0]["message"]["content"])
+        return result["choices"][0]["message"]["content"]
+
+    @staticmethod
+    def _fingerprint(tweet_texts: List[str]) -> str:
+        return hashlib.sha256("\n".join(sorted(tweet_texts)).encode()).hexdigest()
+
+    @staticmethod
+    def _clamp_score(score: float) -> float:
+        return max(-100.0, min(100.0, score))
+
+    @classmethod
+    def _parse_score(cls, content: str) -> float:
+        """
+        Extract a single score from an LLM reply, tolerating surrounding text such as "Score: +35."
+        """
+        match = SCORE_PATTERN.search(content)
+        if match is None:
+            raise ValueError(f"No sentiment score in LLM response: {content!r}")
+        return cls._clamp_score(float(match.group()))
+
+    @classmethod
+    def _parse_batch_scores(cls, content: str, netuids: List[int]) -> Dict[int, float]:
+        """
+        Extract per-netuid scores from a packed LLM reply. Accepts a JSON object, optionally
+        wrapped in prose or a code fence; entries for unknown netuids or without a number are dropped.
+        """
+        match = re.search(r"\{.*\}", content, re.DOTALL)
+        if match is None:
+            raise ValueError(f"No JSON object in LLM response: {content!r}")
+        parsed = json.loads(match.group())
+        if not isinstance(parsed, dict):
+            raise ValueError(f"Unexpected LLM response: {content!r}")
+
+        scores = {}
+        for key, value in parsed.items():
+            netuid_match = re.search(r"\d+", str(key))
+            if netuid_match is None or int(netuid_match.group()) not in netuids:
+                continue
+            try:
+                scores[int(netuid_match.group())] = cls._parse_score(str(value))
+            except ValueError:
+                continue
+        return scores
+
+    def upstream_stats(self) -> Dict:
+        """Latency histograms, retry/hedge counts and circuit state per upstream."""
+        return {client.name: client.stats() for client in (self.datura_client, self.chutes_client)}
 
     async def close(self):
-        await self.http_client.aclose()
+        await self.datura_client.aclose()
+        await self.chutes_client.aclose()
+
+sentiment_service = SentimentService()
 
-sentiment_service = SentimentService() 
\ No newline at end of file
+def get_sentiment_service() -> SentimentService:
+    """FastAPI dependency for the shared SentimentService."""
+    return sentiment_service
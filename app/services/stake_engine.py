@@ -0,0 +1,188 @@
+import asyncio
+import logging
+from typing import Dict, List, Optional, Tuple
+import bittensor as bt
+from bittensor.utils.balance import tao
+from app.core.config import settings
+from app.core.redis import get_redis_client
+
+# Stake and unstake amounts are both TAO only on the root subnet; elsewhere unstakes are alpha
+ROOT_NETUID = 0
+
+class StakeIntent:
+    """A queued stake ("stake") or unstake ("unstake") of rao on (netuid, hotkey)."""
+
+    def __init__(self, action: str, rao: int, netuid: int, hotkey: str, future: asyncio.Future):
+        self.action = action
+        self.rao = rao
+        self.netuid = netuid
+        self.hotkey = hotkey
+        self.future = future
+
+class StakeEngine:
+    """
+    Queues stake/unstake intents and submits them together.
+
+    Intents collected during STAKE_BATCH_WINDOW seconds (or until STAKE_BATCH_MAX_CALLS pairs are
+    pending) are merged per (netuid, hotkey, action). On the root subnet, where stake and unstake
+    amounts are both TAO, opposing actions also cancel out; on dTAO subnets unstakes are alpha and
+    are never netted against TAO stakes. The remaining add_stake/remove_stake calls are sent
+    wrapped in a single Utility.batch_all extrinsic. That is one nonce and one inclusion wait per batch instead of per action, and
+    batch_all makes the batch atomic.
+
+    Signing and submission hold a Redis lock per coldkey until the batch is included, and the
+    nonce is read from the chain under that lock, so engines in other workers never reuse a nonce.
+    """
+
+    def __init__(self, subtensor: bt.AsyncSubtensor, wallet):
+        self.subtensor = subtensor
+        self.wallet = wallet
+        self._pending: List[StakeIntent] = []
+        self._queued: Optional[asyncio.Event] = None
+        self._full: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self.batches_submitted = 0
+        self.intents_netted = 0
+        self._logger = logging.getLogger(__name__)
+
+    async def submit(self, action: str, amount: float, netuid: int, hotkey: str) -> Dict:
+        """
+        Queue a stake or unstake of amount TAO and wait until the batch carrying it is included.
+        Returns {"result": bool, "extrinsic_hash": ..., "netted": bool}, where netted means no call
+        for this action was submitted because an opposing intent on the pair absorbed it; result and
+        extrinsic_hash then describe the call that carried the pair's net amount, if any.
+        """
+        if action not in ("stake", "unstake"):
+            raise ValueError(f"Unknown stake action: {action}")
+        self._ensure_started()
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append(StakeIntent(action, tao(amount).rao, netuid, hotkey, future))
+        self._queued.set()
+        if len({(i.netuid, i.hotkey) for i in self._pending}) >= settings.STAKE_BATCH_MAX_CALLS:
+            self._full.set()
+        return await future
+
+    def _ensure_started(self):
+        if self._task is None or self._task.done():
+            self._queued = asyncio.Event()
+            self._full = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Submit whatever is still queued and stop the batching loop."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._pending:
+            await self.flush()
+
+    async def _run(self):
+        while True:
+            # The window opens with the first queued intent and closes early once the batch is full
+            await self._queued.wait()
+            # asyncio.wait rather than wait_for: on 3.9-3.11 wait_for can swallow stop()'s cancellation
+            full = asyncio.ensure_future(self._full.wait())
+            try:
+                await asyncio.wait({full}, timeout=settings.STAKE_BATCH_WINDOW)
+            finally:
+                full.cancel()
+            self._queued.clear()
+            self._full.clear()
+            await self.flush()
+
+    async def flush(self):
+        """Net the queued intents and submit them as one extrinsic, resolving every intent's future."""
+        intents, self._pending = self._pending, []
+        if not intents:
+            return
+        try:
+            net = self.net_intents(intents)
+            self.intents_netted += len(intents) - len(net)
+            batch = None
+            if net:
+                batch = await self._submit_batch(net)
+                self.batches_submitted += 1
+        except asyncio.CancelledError:
+            for intent in intents:
+                intent.future.cancel()
+            raise
+        except Exception as e:
+            self._logger.error(f"Error submitting stake batch: {str(e)}")
+            for intent in intents:
+                if not intent.future.done():
+                    intent.future.set_exception(Exception(f"Error submitting stake batch: {str(e)}"))
+            return
+
+        submitted_pairs = {(netuid, hotkey) for netuid, hotkey, _ in net}
+        for intent in intents:
+            if intent.future.done():
+                continue
+            netted = (intent.netuid, intent.hotkey, intent.action) not in net
+            if (intent.netuid, intent.hotkey) in submitted_pairs:
+                intent.future.set_result({**batch, "netted": netted})
+            else:
+                # Everything on the pair cancelled out; nothing reached the chain
+                intent.future.set_result({"result": True, "extrinsic_hash": None, "netted": True})
+
+    @staticmethod
+    def net_intents(intents: List[StakeIntent]) -> Dict[Tuple[int, str, str], int]:
+        """
+        Rao to submit per (netuid, hotkey, action). Same-action intents are summed; opposing ones
+        are netted only on the root subnet, and a root pair netting to zero is dropped.
+        """
+        totals: Dict[Tuple[int, str, str], int] = {}
+        for intent in intents:
+            key = (intent.netuid, intent.hotkey, intent.action)
+            totals[key] = totals.get(key, 0) + intent.rao
+
+        net: Dict[Tuple[int, str, str], int] = {}
+        for (netuid, hotkey, action), rao in totals.items():
+            if netuid != ROOT_NETUID:
+                net[(netuid, hotkey, action)] = rao
+            elif action == "stake":
+                signed = rao - totals.get((netuid, hotkey, "unstake"), 0)
+                if signed != 0:
+                    net[(netuid, hotkey, "stake" if signed > 0 else "unstake")] = abs(signed)
+            elif (netuid, hotkey, "stake") not in totals:
+                net[(netuid, hotkey, action)] = rao
+        return net
+
+    async def _compose_calls(self, net: Dict[Tuple[int, str, str], int]):
+        substrate = self.subtensor.substrate
+        calls = []
+        for (netuid, hotkey, action), rao in sorted(net.items()):
+            if action == "stake":
+                function, params = "add_stake", {"hotkey": hotkey, "netuid": netuid, "amount_staked": rao}
+            else:
+                function, params = "remove_stake", {"hotkey": hotkey, "netuid": netuid, "amount_unstaked": rao}
+            calls.append(await substrate.compose_call(
+                call_module="SubtensorModule", call_function=function, call_params=params
+            ))
+        if len(calls) == 1:
+            return calls[0]
+        return await substrate.compose_call(
+            call_module="Utility", call_function="batch_all", call_params={"calls": calls}
+        )
+
+    async def _submit_batch(self, net: Dict[Tuple[int, str, str], int]) -> Dict:
+        substrate = self.subtensor.substrate
+        call = await self._compose_calls(net)
+        coldkey = self.wallet.coldkey
+        redis = get_redis_client()
+        lock = redis.lock(f"stake_engine:nonce:{coldkey.ss58_address}", timeout=settings.STAKE_NONCE_LOCK_TIMEOUT)
+        async with lock:
+            nonce = await substrate.get_account_next_index(coldkey.ss58_address)
+            extrinsic = await substrate.create_signed_extrinsic(call=call, keypair=coldkey, nonce=nonce)
+            response = await substrate.submit_extrinsic(
+                extrinsic, wait_for_inclusion=True, wait_for_finalization=False
+            )
+            success = await response.is_success
+            if not success:
+                self._logger.error(f"Stake batch with nonce {nonce} failed: {await response.error_message}")
+            else:
+                self._logger.info(f"Submitted stake batch of {len(net)} calls with nonce {nonce}")
+        return {"result": success, "extrinsic_hash": response.extrinsic_hash}
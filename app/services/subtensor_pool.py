@@ -0,0 +1,169 @@
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, TypeVar
+import bittensor as bt
+from websockets.exceptions import ConnectionClosed
+from app.core.config import settings
+from app.core.metrics import CHAIN_CALL_DURATION
+
+T = TypeVar("T")
+
+# Errors that say something about the connection or node rather than the request itself
+TRANSPORT_ERRORS = (ConnectionError, OSError, asyncio.TimeoutError, ConnectionClosed)
+
+class PooledConnection:
+    """One connection slot of the pool. The underlying client is (re)created on demand."""
+
+    def __init__(self, endpoint: str):
+        self.endpoint = endpoint
+        self.client: Optional[Any] = None
+        self.latency: Optional[float] = None  # EWMA of successful call durations, seconds
+        self.in_flight = 0
+        self.calls = 0
+        self.failures = 0
+        self.down_until = 0.0
+
+    def healthy(self, now: float) -> bool:
+        return now >= self.down_until
+
+    def score(self) -> Tuple[float, int]:
+        # Unmeasured slots score 0 so every endpoint gets probed; busy slots are spread out, and
+        # in_flight breaks ties between slots that have not been measured yet
+        return (self.latency or 0.0) * (1 + self.in_flight), self.in_flight
+
+class SubtensorPool:
+    """
+    Spreads read-only chain calls over several connections to several endpoints.
+
+    Each call goes to the healthy connection with the lowest latency EWMA, weighted by how many
+    calls it already has in flight. A connection that fails with a transport error or exceeds
+    SUBTENSOR_CALL_TIMEOUT is closed, benched for SUBTENSOR_FAILURE_COOLDOWN seconds and the call
+    is retried on another connection, preferring endpoints it has not tried yet, until every
+    connection has been tried; the next call routed to a benched connection after the cooldown
+    reconnects. Callers can also retry other errors elsewhere (e.g. a block hash a lagging
+    node does not know yet) without benching the connection.
+
+    Calls are functions of a client, e.g. `await pool.call(lambda s: s.substrate.query(...))`, so
+    anything that needs several round trips on one connection (like iterating a query_map) runs
+    entirely on the connection it was given.
+    """
+
+    def __init__(
+        self,
+        endpoints: List[str],
+        connections_per_endpoint: int,
+        factory: Callable[[str], Any] = lambda endpoint: bt.AsyncSubtensor(network=endpoint)
+    ):
+        if not endpoints:
+            raise ValueError("SubtensorPool needs at least one endpoint")
+        self.factory = factory
+        self.endpoints = list(dict.fromkeys(endpoints))
+        self.connections = [
+            PooledConnection(endpoint) for endpoint in self.endpoints for _ in range(max(1, connections_per_endpoint))
+        ]
+        self._logger = logging.getLogger(__name__)
+
+    def _pick(self, tried: List[PooledConnection]) -> PooledConnection:
+        now = time.monotonic()
+        tried_endpoints = {c.endpoint for c in tried}
+        candidates = [c for c in self.connections if c not in tried]
+        healthy = [c for c in candidates if c.healthy(now)]
+        # With every node benched, try the one that comes back first rather than failing outright
+        if not healthy:
+            return min(candidates, key=lambda c: c.down_until)
+        return min(healthy, key=lambda c: (c.endpoint in tried_endpoints, c.score()))
+
+    async def call(
+        self,
+        fn: Callable[[Any], Awaitable[T]],
+        operation: str = "call",
+        retry_on: Optional[Callable[[Exception], bool]] = None
+    ) -> T:
+        """
+        Run fn against a pooled client, failing over to other connections on transport errors,
+        and on errors for which retry_on returns True. operation names the call in the
+        chain_call_duration_seconds metric.
+        """
+        tried: List[PooledConnection] = []
+        while True:
+            connection = self._pick(tried)
+            tried.append(connection)
+            if connection.client is None:
+                connection.client = self.factory(connection.endpoint)
+
+            connection.in_flight += 1
+            start = time.perf_counter()
+            outcome = "error"
+            try:
+                result = await asyncio.wait_for(fn(connection.client), timeout=settings.SUBTENSOR_CALL_TIMEOUT)
+                outcome = "ok"
+            except TRANSPORT_ERRORS as e:
+                await self._mark_down(connection, e)
+                if len(tried) == len(self.connections):
+                    raise
+                continue
+            except Exception as e:
+                if retry_on is None or not retry_on(e) or len(tried) == len(self.connections):
+                    raise
+                self._logger.info(f"Chain endpoint {connection.endpoint} could not serve {operation} ({str(e)}), retrying elsewhere")
+                continue
+            finally:
+                connection.in_flight -= 1
+                elapsed = time.perf_counter() - start
+                CHAIN_CALL_DURATION.labels(operation, outcome).observe(elapsed)
+
+            alpha = settings.SUBTENSOR_LATENCY_EWMA_ALPHA
+            connection.latency = elapsed if connection.latency is None else alpha * elapsed + (1 - alpha) * connection.latency
+            connection.calls += 1
+            return result
+
+    async def _mark_down(self, connection: PooledConnection, error: Exception):
+        connection.failures += 1
+        connection.down_until = time.monotonic() + settings.SUBTENSOR_FAILURE_COOLDOWN
+        # Start from a clean slate when it comes back; its old latency says nothing about the new connection
+        connection.latency = None
+        client, connection.client = connection.client, None
+        self._logger.warning(f"Chain endpoint {connection.endpoint} failed ({str(error) or type(error).__name__}), failing over")
+        await self._close_client(client)
+
+    async def _close_client(self, client):
+        close = getattr(client, "close", None)
+        if close is None:
+            return
+        try:
+            await close()
+        except Exception:
+            pass
+
+    async def warm_up(self):
+        """Open every connection ahead of the first call."""
+        async def connect(connection: PooledConnection):
+            try:
+                if connection.client is None:
+                    connection.client = self.factory(connection.endpoint)
+                initialize = getattr(connection.client, "initialize", None)
+                if initialize is not None:
+                    await initialize()
+            except Exception as e:
+                await self._mark_down(connection, e)
+
+        await asyncio.gather(*(connect(c) for c in self.connections))
+
+    def stats(self) -> List[Dict]:
+        now = time.monotonic()
+        return [{
+            "endpoint": c.endpoint,
+            "healthy": c.healthy(now),
+            "connected": c.client is not None,
+            "latency_ms": None if c.latency is None else round(1000 * c.latency, 3),
+            "in_flight": c.in_flight,
+            "calls": c.calls,
+            "failures": c.failures
+        } for c in self.connections]
+
+    async def close(self):
+        for connection in self.connections:
+            client, connection.client = connection.client, None
+            if client is not None:
+                await self._close_client(client)
@@ -0,0 +1,85 @@
+import logging
+import uuid
+from typing import Dict
+from celery import Task
+from app.core.config import settings
+from app.core.redis import get_redis_client
+
+# Delete a key only while it still holds the given value
+RELEASE_SCRIPT = """
+if redis.call("GET", KEYS[1]) == ARGV[1] then
+    return redis.call("DEL", KEYS[1])
+end
+return 0
+"""
+
+class TradeTrigger:
+    """
+    Coalesces sentiment-trading triggers per (netuid, hotkey).
+
+    The first trigger in a TRADE_DEBOUNCE_WINDOW claims `trade_trigger:{netuid}:{hotkey}` with
+    SET NX and enqueues the task under a fresh task id stored in that key; later triggers inside
+    the window are coalesced onto the same task. If enqueueing fails, the key is released again
+    so later triggers are not coalesced onto a task that never existed. Separately, the task claims
+    `stake_action:{netuid}:{hotkey}` before submitting an extrinsic, so at most one stake action
+    per pair happens every STAKE_MIN_INTERVAL seconds no matter how triggers arrive.
+    """
+
+    def __init__(self):
+        self._logger = logging.getLogger(__name__)
+
+    @staticmethod
+    def trigger_key(netuid: int, hotkey: str) -> str:
+        return f"trade_trigger:{netuid}:{hotkey}"
+
+    @staticmethod
+    def stake_key(netuid: int, hotkey: str) -> str:
+        return f"stake_action:{netuid}:{hotkey}"
+
+    async def trigger(self, task: Task, netuid: int, hotkey: str) -> Dict[str, str]:
+        """
+        Enqueue task(netuid, hotkey) unless a trigger for the same pair is already inside the
+        debounce window. Returns the trade status ("enqueued" or "coalesced") and the task id.
+        """
+        try:
+            redis = get_redis_client()
+            key = self.trigger_key(netuid, hotkey)
+            task_id = str(uuid.uuid4())
+            if await redis.set(key, task_id, nx=True, ex=settings.TRADE_DEBOUNCE_WINDOW):
+                try:
+                    task.apply_async((netuid, hotkey), task_id=task_id)
+                except Exception:
+                    await self._release(key, task_id)
+                    raise
+                return {"status": "enqueued", "task_id": task_id}
+
+            existing = await redis.get(key)
+            if existing is None:
+                # The window closed between SET and GET; treat this as a fresh trigger
+                return await self.trigger(task, netuid, hotkey)
+            self._logger.info(f"Coalesced trade trigger for netuid: {netuid} and hotkey: {hotkey} into task {existing}")
+            return {"status": "coalesced", "task_id": existing}
+        except Exception as e:
+            raise Exception(f"Error triggering trade: {str(e)}")
+
+    async def _release(self, key: str, task_id: str):
+        try:
+            await get_redis_client().register_script(RELEASE_SCRIPT)(keys=[key], args=[task_id])
+        except Exception as e:
+            self._logger.error(f"Failed to release trade trigger {key}: {str(e)}")
+
+    async def stake_allowed(self, netuid: int, hotkey: str) -> bool:
+        """Cheap pre-check: False while a stake action for the pair is inside STAKE_MIN_INTERVAL."""
+        if settings.STAKE_MIN_INTERVAL <= 0:
+            return True
+        redis = get_redis_client()
+        return not await redis.exists(self.stake_key(netuid, hotkey))
+
+    async def claim_stake_slot(self, netuid: int, hotkey: str) -> bool:
+        """Atomically reserve the next stake action for the pair; False if one happened too recently."""
+        if settings.STAKE_MIN_INTERVAL <= 0:
+            return True
+        redis = get_redis_client()
+        return bool(await redis.set(self.stake_key(netuid, hotkey), 1, nx=True, ex=settings.STAKE_MIN_INTERVAL))
+
+trade_trigger = TradeTrigger()
@@ -1,11 +1,18 @@
 import asyncio
 import logging
+import os
+import threading
+import time
 import traceback
 from celery import Celery
+from celery.signals import task_postrun, task_prerun, worker_init, worker_process_init, worker_process_shutdown, worker_shutdown
 from app.core.config import settings
+from app.core.metrics import CELERY_TASK_DURATION, mark_process_dead, start_metrics_server
 from app.services.bittensor import bittensor_service
 from app.services.sentiment import sentiment_service
+from app.services.trade_trigger import trade_trigger
 from app.db.mongodb import mongodb
+from app.db.write_buffer import stake_actions_buffer
 import json
 from datetime import datetime, timezone
 
@@ -15,11 +22,100 @@ app = Celery(
     backend=settings.CELERY_RESULT_BACKEND
 )
 
+# Tasks mostly wait on the chain, Datura/Chutes and Mongo, so threads share one event loop
+app.conf.update(
+    worker_pool=settings.CELERY_WORKER_POOL,
+    worker_concurrency=settings.CELERY_WORKER_CONCURRENCY
+)
+
 logger = logging.getLogger(__name__)
 
+class WorkerLoop:
+    """
+    One long-lived asyncio event loop per worker process, running in a background thread.
+
+    Tasks submit their coroutines to it instead of spinning up a loop each, so the subtensor
+    websocket, the httpx pool and the Mongo pool are bound to a single loop and reused across
+    tasks. With the threads pool, many tasks wait on the loop concurrently.
+    """
+
+    def __init__(self):
+        self._loop = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self._loop.run_forever, name="celery-event-loop", daemon=True)
+                self._thread.start()
+
+    def submit(self, coro):
+        """Schedule a coroutine on the worker loop without waiting for it."""
+        self.start()
+        return asyncio.run_coroutine_threadsafe(coro, self._loop)
+
+    def run(self, coro):
+        """Run a coroutine on the worker loop and block the calling thread until it finishes."""
+        return self.submit(coro).result()
+
+    def stop(self):
+        with self._lock:
+            if self._loop is None:
+                return
+            loop, thread = self._loop, self._thread
+            self._loop = self._thread = None
+
+        async def close_clients():
+            await bittensor_service.stop()
+            await sentiment_service.close()
+            await stake_actions_buffer.stop()
+            mongodb.close()
+
+        try:
+            asyncio.run_coroutine_threadsafe(close_clients(), loop).result(timeout=10)
+        except Exception as e:
+            logger.error(f"Error closing worker clients: {str(e)}")
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout=10)
+        loop.close()
+
+worker_loop = WorkerLoop()
+
+@worker_process_init.connect
+def _start_worker_loop(**kwargs):
+    # Prefork children get their own loop after the fork. The chain connection warms up in the
+    # background; the coldkey is only unlocked when the first stake action needs it.
+    worker_loop.submit(bittensor_service.warm_up())
+
+@worker_process_shutdown.connect
+@worker_shutdown.connect
+def _stop_worker_loop(**kwargs):
+    worker_loop.stop()
+    mark_process_dead(os.getpid())
+
+@worker_init.connect
+def _start_metrics_server(**kwargs):
+    # Served from the main worker process; prefork children report through PROMETHEUS_MULTIPROC_DIR
+    if settings.CELERY_METRICS_PORT:
+        start_metrics_server(settings.CELERY_METRICS_PORT)
+
+_task_started = {}
+
+@task_prerun.connect
+def _record_task_start(task_id=None, **kwargs):
+    _task_started[task_id] = time.perf_counter()
+
+@task_postrun.connect
+def _record_task_duration(task_id=None, task=None, state=None, **kwargs):
+    start = _task_started.pop(task_id, None)
+    if start is not None:
+        CELERY_TASK_DURATION.labels(task.name, state or "UNKNOWN").observe(time.perf_counter() - start)
+
 @app.task
 def process_sentiment_and_stake(netuid: int, hotkey: str):
-    return asyncio.get_event_loop().run_until_complete(_process_sentiment_and_stake(netuid, hotkey))
+    return worker_loop.run(_process_sentiment_and_stake(netuid, hotkey))
 
 async def _process_sentiment_and_stake(netuid: int, hotkey: str):
     """
@@ -27,6 +123,15 @@ async def _process_sentiment_and_stake(netuid: int, hotkey: str):
     """
     try:
         logger.info(f"Processing sentiment and stake for netuid: {netuid} and hotkey: {hotkey}")
+        if not await trade_trigger.stake_allowed(netuid, hotkey):
+            logger.info(f"Skipping netuid: {netuid} and hotkey: {hotkey}, last stake action was less than {settings.STAKE_MIN_INTERVAL}s ago")
+            return {
+                "success": True,
+                "action": "skip",
+                "reason": "min_interval",
+                "amount": 0
+            }
+
         sentiment_data = await sentiment_service.get_subnet_sentiment(netuid)
         sentiment_score = sentiment_data["sentiment_score"]
         if sentiment_score == 0:
@@ -39,6 +144,15 @@ async def _process_sentiment_and_stake(netuid: int, hotkey: str):
 
         stake_amount = abs(sentiment_score) * 0.01
 
+        if not await trade_trigger.claim_stake_slot(netuid, hotkey):
+            return {
+                "success": True,
+                "sentiment_data": sentiment_data,
+                "action": "skip",
+                "reason": "min_interval",
+                "amount": 0
+            }
+
         if sentiment_score > 0:
             logger.info(f"Staking {stake_amount} TAO for netuid: {netuid} and hotkey: {hotkey}")
             result = await bittensor_service.stake_tao(stake_amount, netuid, hotkey)
@@ -48,15 +162,15 @@ async def _process_sentiment_and_stake(netuid: int, hotkey: str):
             result = await bittensor_service.unstake_tao(stake_amount, netuid, hotkey)
             action = "unstake"
         
-        # Get MongoDB client only when needed
-        mongodb_client = mongodb.get_db()
-        await mongodb_client.stake_actions.insert_one({
+        await stake_actions_buffer.add({
             "netuid": netuid,
             "hotkey": hotkey,
             "sentiment_score": sentiment_score,
             "action": action,
             "amount": stake_amount,
             "result": result["result"],
+            "netted": result.get("netted", False),
+            "extrinsic_hash": result.get("extrinsic_hash"),
             "timestamp": datetime.now(timezone.utc)
         })
         
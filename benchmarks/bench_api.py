@@ -0,0 +1,379 @@
+"""
+Load test of the API with local stand-ins for everything it talks to: a fake AsyncSubtensor
+(benchmarks/fakes.py), Datura and Chutes stubs on an httpx mock transport, fakeredis (or a local
+Redis with --redis-url) and mongomock-motor (or a local MongoDB with --mongo-url). Requests go
+through the full ASGI app in-process, so the numbers cover routing, caching, coalescing,
+serialization and the Redis/Mongo round trips, but not the HTTP server or real network.
+
+Scenarios:
+    single_subnet_cold     /tao_dividends?netuid=N with that subnet's cache cleared first
+    single_subnet_warm     /tao_dividends?netuid=N with every subnet cached
+    all_subnets            /tao_dividends for all subnets, starting from an empty cache
+    hotkey_across_subnets  /tao_dividends?hotkey=H across all subnets, starting from an empty cache
+    hotkey_across_warm_subnets
+                           /tao_dividends?hotkey=H for hotkeys that exist, with every subnet's map
+                           cached, so each request is answered from the cached maps (run with
+                           --set DIVIDEND_CACHE_FORMAT=packed to compare the formats;
+                           fakeredis interprets the packed lookup script in
+                           Python, so compare them with --redis-url)
+    trade_burst            /tao_dividends?netuid=N&hotkey=H&trade=true over a few pairs; the
+                           triggered tasks run in-process and are drained afterwards
+    stake_history_paging   /stake_history pages at every depth of a seeded history
+
+Prints one JSON document with the configuration and, per scenario, requests, errors, RPS and
+p50/p95/p99 latency in milliseconds, so runs can be diffed to catch regressions. Settings can be
+overridden with --set KEY=VALUE (e.g. --set L1_CACHE_ENABLED=true). --redis-url flushes its
+database between scenarios; point it at a scratch database. --mongo-url uses a throwaway database
+that is dropped afterwards. mongomock scans and copies documents in Python, so absolute
+stake_history_paging numbers mostly reflect the stand-in; use --mongo-url for that scenario.
+
+    python -m benchmarks.bench_api [--scenarios all_subnets,trade_burst] [--requests 500]
+        [--concurrency 32] [--subnets 64] [--hotkeys-per-subnet 256] [--rpc-latency-ms 20]
+        [--datura-latency-ms 200] [--chutes-latency-ms 500] [--tweets 10] [--tweet-bytes 200]
+        [--redis-url redis://localhost:6379/15] [--mongo-url mongodb://localhost:27017]
+        [--output results.json]
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, List, Optional
+
+# Nothing real is contacted, so required settings only need placeholders
+PLACEHOLDER_SETTINGS = {
+    "API_KEY": "bench",
+    "REDIS_CACHE_EXPIRY": "120",
+    "BITTENSOR_NETWORK": "fake",
+    "WALLET_NAME": "bench",
+    "WALLET_HOTKEY": "bench",
+    "WALLET_PATH": "/nonexistent",
+    "WALLET_COLDKEY_PASSWORD": "bench",
+    "DEFAULT_HOTKEY": "5FFApaS75bv5pJHfAp2FVLBj9ZaXuFDjEypsaBNc1wCfe52v",
+    "DEFAULT_NETUID": "1",
+    "DATURA_API_KEY": "bench",
+    "CHUTES_API_KEY": "bench"
+}
+
+def percentile(ordered: List[float], p: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    return ordered[max(0, math.ceil(p * len(ordered)) - 1)]
+
+def summarize(latencies: List[float], errors: int, elapsed: float) -> Dict:
+    ordered = sorted(latencies)
+    return {
+        "requests": len(ordered),
+        "errors": errors,
+        "rps": round(len(ordered) / elapsed, 1),
+        "p50_ms": round(1000 * percentile(ordered, 0.50), 3),
+        "p95_ms": round(1000 * percentile(ordered, 0.95), 3),
+        "p99_ms": round(1000 * percentile(ordered, 0.99), 3),
+        "max_ms": round(1000 * ordered[-1], 3)
+    }
+
+class InlineTask:
+    """Stands in for the Celery task: apply_async runs the task body on the benchmark's event loop."""
+
+    def __init__(self, run: Callable[..., Awaitable]):
+        self.run = run
+        self.pending = set()
+        self.enqueued = 0
+
+    def apply_async(self, args, task_id: Optional[str] = None):
+        self.enqueued += 1
+        task = asyncio.ensure_future(self.run(*args))
+        self.pending.add(task)
+        task.add_done_callback(self.pending.discard)
+
+    async def drain(self):
+        while self.pending:
+            await asyncio.gather(*self.pending, return_exceptions=True)
+
+class Harness:
+    """The app with every external dependency replaced by a local stand-in."""
+
+    def __init__(self, args):
+        self.args = args
+
+    async def start(self):
+        import fakeredis
+        import httpx
+        import redis.asyncio as redis
+        from app import main
+        from app.core import redis as redis_module
+        from app.core.config import settings
+        from app.core.providers import Provider
+        from app.db.mongodb import mongodb
+        from app.db.write_buffer import stake_actions_buffer
+        from app.services.bittensor import bittensor_service
+        from app.services.sentiment import sentiment_service
+        from app.services.subtensor_pool import SubtensorPool
+        from app.tasks import celery
+        from benchmarks.fakes import FakeSubstrate, FakeSubtensor, fake_wallet, upstream_transport
+
+        args = self.args
+        self.main = main
+        self.settings = settings
+
+        if args.redis_url:
+            redis_module._redis_pool = redis.ConnectionPool.from_url(args.redis_url, decode_responses=True, max_connections=100)
+            redis_module._redis_binary_pool = redis.ConnectionPool.from_url(args.redis_url, decode_responses=False, max_connections=100)
+        else:
+            server = fakeredis.FakeServer()
+            redis_module._redis_pool = fakeredis.FakeAsyncRedis(server=server, decode_responses=True).connection_pool
+            redis_module._redis_binary_pool = fakeredis.FakeAsyncRedis(server=server, decode_responses=False).connection_pool
+        self.redis = redis_module.get_redis_client()
+
+        if args.mongo_url:
+            from motor.motor_asyncio import AsyncIOMotorClient
+            mongodb.client = AsyncIOMotorClient(args.mongo_url)
+            mongodb.db = mongodb.client[f"bench_api_{os.getpid()}"]
+        else:
+            from mongomock_motor import AsyncMongoMockClient
+            mongodb.client = AsyncMongoMockClient()
+            mongodb.db = mongodb.client[settings.MONGODB_DB]
+            # mongomock-motor's with_options returns a synchronous collection, and mongomock cannot
+            # run the rollup upserts newer pymongo versions build; neither matters for the API's numbers
+            stake_actions_buffer._collection = mongodb.db[stake_actions_buffer.collection_name]
+            stake_actions_buffer._on_flush = None
+        self.db = mongodb.db
+
+        self.substrate = FakeSubstrate(
+            args.subnets, args.hotkeys_per_subnet, args.rpc_latency_ms / 1000,
+            page_size=args.query_map_page_size, inclusion_latency=args.inclusion_latency_ms / 1000
+        )
+        subtensor = FakeSubtensor(self.substrate)
+        bittensor_service._subtensor = Provider(lambda: subtensor)
+        bittensor_service._pool = Provider(lambda: SubtensorPool(
+            ["fake"], settings.SUBTENSOR_CONNECTIONS_PER_ENDPOINT, factory=lambda endpoint: FakeSubtensor(self.substrate)
+        ))
+        bittensor_service._wallet = Provider(fake_wallet)
+        bittensor_service._coldkey_unlocked = True
+
+        transport = upstream_transport(args.datura_latency_ms / 1000, args.chutes_latency_ms / 1000, args.tweets, args.tweet_bytes)
+        for client in (sentiment_service.datura_client, sentiment_service.chutes_client):
+            timeout = client._client.timeout
+            await client._client.aclose()
+            client._client = httpx.AsyncClient(transport=transport, timeout=timeout)
+
+        self.trade_task = InlineTask(celery._process_sentiment_and_stake)
+        main.process_sentiment_and_stake = self.trade_task
+
+        self._lifespan = main.lifespan(main.app)
+        await self._lifespan.__aenter__()
+        self.client = httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=main.app),
+            base_url="http://bench",
+            headers={"Authorization": f"Bearer {settings.API_KEY}"},
+            timeout=None
+        )
+
+    async def stop(self):
+        await self.client.aclose()
+        if self.args.mongo_url:
+            await self.db.client.drop_database(self.db.name)
+        await self._lifespan.__aexit__(None, None, None)
+
+    async def reset(self):
+        """Start a scenario from empty caches."""
+        from app.services.dividend_cache import dividend_cache
+        await self.redis.flushdb()
+        if dividend_cache.l1 is not None:
+            dividend_cache.l1.clear()
+
+    async def get(self, path: str, **params):
+        return await self.client.get(f"{self.settings.API_V1_PREFIX}{path}", params=params)
+
+    async def measure(
+        self,
+        request: Callable[[int], Awaitable],
+        before: Optional[Callable[[int], Awaitable]] = None
+    ) -> Dict:
+        """
+        Send args.requests requests from args.concurrency concurrent clients, each sending its next
+        request as soon as the previous one finished. before(i) runs untimed ahead of request i.
+        """
+        latencies, errors = [], 0
+        counter = iter(range(self.args.requests))
+
+        async def client():
+            nonlocal errors
+            for i in counter:
+                if before is not None:
+                    await before(i)
+                start = time.perf_counter()
+                try:
+                    response = await request(i)
+                    ok = response.status_code < 400
+                except Exception:
+                    ok = False
+                latencies.append(time.perf_counter() - start)
+                errors += not ok
+
+        start = time.perf_counter()
+        await asyncio.gather(*(client() for _ in range(self.args.concurrency)))
+        return summarize(latencies, errors, time.perf_counter() - start)
+
+def hotkeys(count: int) -> List[str]:
+    from app.core.ss58 import ss58_encode
+    # Valid addresses that are not in any subnet, since the API rejects malformed hotkeys
+    return [ss58_encode(hashlib.blake2b(f"bench:{i}".encode(), digest_size=32).digest()) for i in range(count)]
+
+async def single_subnet_cold(h: Harness) -> Dict:
+    from app.services.dividend_cache import dividend_cache
+
+    async def clear(i: int):
+        netuid = i % h.args.subnets
+        await h.redis.delete(dividend_cache.cache_key(netuid), dividend_cache.meta_key(netuid), dividend_cache.packed_key(netuid), dividend_cache.hotkeys_key(netuid))
+        dividend_cache.invalidate([netuid])
+
+    return await h.measure(lambda i: h.get("/tao_dividends", netuid=i % h.args.subnets), before=clear)
+
+async def single_subnet_warm(h: Harness) -> Dict:
+    await h.get("/tao_dividends")
+    return await h.measure(lambda i: h.get("/tao_dividends", netuid=i % h.args.subnets))
+
+async def all_subnets(h: Harness) -> Dict:
+    return await h.measure(lambda i: h.get("/tao_dividends"))
+
+async def hotkey_across_subnets(h: Harness) -> Dict:
+    keys = hotkeys(h.args.trade_pairs)
+    return await h.measure(lambda i: h.get("/tao_dividends", hotkey=keys[i % len(keys)]))
+
+async def hotkey_across_warm_subnets(h: Harness) -> Dict:
+    from app.core.ss58 import ss58_encode
+    from benchmarks.fakes import account_id
+    keys = [ss58_encode(bytes(account_id(i % h.args.subnets, i % h.args.hotkeys_per_subnet)[0])) for i in range(h.args.trade_pairs)]
+    await h.get("/tao_dividends")
+    return await h.measure(lambda i: h.get("/tao_dividends", hotkey=keys[i % len(keys)]))
+
+async def trade_burst(h: Harness) -> Dict:
+    from app.db.write_buffer import stake_actions_buffer
+    pairs = [(i % h.args.subnets, hotkey) for i, hotkey in enumerate(hotkeys(h.args.trade_pairs))]
+    h.trade_task.enqueued = 0
+
+    def trade(i: int):
+        netuid, hotkey = pairs[i % len(pairs)]
+        return h.get("/tao_dividends", netuid=netuid, hotkey=hotkey, trade="true")
+
+    result = await h.measure(trade)
+    start = time.perf_counter()
+    await h.trade_task.drain()
+    await stake_actions_buffer.stop()
+    result["tasks_enqueued"] = h.trade_task.enqueued
+    result["stake_actions_written"] = await h.db.stake_actions.count_documents({})
+    result["drain_ms"] = round(1000 * (time.perf_counter() - start), 3)
+    return result
+
+async def stake_history_paging(h: Harness) -> Dict:
+    collection = h.db.stake_actions
+    await collection.delete_many({})
+    now = datetime.now(timezone.utc)
+    await collection.insert_many([{
+        "netuid": i % h.args.subnets,
+        "hotkey": f"hotkey-{i % 256}",
+        "sentiment_score": 42.0,
+        "action": "stake" if i % 3 else "unstake",
+        "amount": 0.42,
+        "result": True,
+        "timestamp": now - timedelta(seconds=i)
+    } for i in range(h.args.history_records)])
+
+    # Walk the history once to collect the cursor of every page
+    cursors, cursor = [None], None
+    while True:
+        params = {"limit": h.args.history_page_size}
+        if cursor:
+            params["cursor"] = cursor
+        cursor = (await h.get("/stake_history", **params)).headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+        cursors.append(cursor)
+
+    def page(i: int):
+        params = {"limit": h.args.history_page_size}
+        if cursors[i % len(cursors)]:
+            params["cursor"] = cursors[i % len(cursors)]
+        return h.get("/stake_history", **params)
+
+    result = await h.measure(page)
+    result["pages"] = len(cursors)
+    return result
+
+SCENARIOS = {
+    "single_subnet_cold": single_subnet_cold,
+    "single_subnet_warm": single_subnet_warm,
+    "all_subnets": all_subnets,
+    "hotkey_across_subnets": hotkey_across_subnets,
+    "hotkey_across_warm_subnets": hotkey_across_warm_subnets,
+    "trade_burst": trade_burst,
+    "stake_history_paging": stake_history_paging
+}
+
+async def main_async(args) -> Dict:
+    harness = Harness(args)
+    await harness.start()
+    results = {}
+    try:
+        for name in args.scenarios:
+            await harness.reset()
+            calls = harness.substrate.calls
+            results[name] = await SCENARIOS[name](harness)
+            results[name]["chain_calls"] = harness.substrate.calls - calls
+    finally:
+        await harness.stop()
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="Comma-separated scenario names")
+    parser.add_argument("--requests", type=int, default=500, help="Requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--subnets", type=int, default=64)
+    parser.add_argument("--hotkeys-per-subnet", type=int, default=256)
+    parser.add_argument("--query-map-page-size", type=int, default=100)
+    parser.add_argument("--rpc-latency-ms", type=float, default=20)
+    parser.add_argument("--inclusion-latency-ms", type=float, default=100)
+    parser.add_argument("--datura-latency-ms", type=float, default=200)
+    parser.add_argument("--chutes-latency-ms", type=float, default=500)
+    parser.add_argument("--tweets", type=int, default=10, help="Tweets per Datura search")
+    parser.add_argument("--tweet-bytes", type=int, default=200)
+    parser.add_argument("--trade-pairs", type=int, default=8, help="Distinct (netuid, hotkey) pairs for trade and hotkey scenarios")
+    parser.add_argument("--history-records", type=int, default=2000)
+    parser.add_argument("--history-page-size", type=int, default=100)
+    parser.add_argument("--redis-url", help="Use this Redis instead of fakeredis; its database is flushed")
+    parser.add_argument("--mongo-url", help="Use this MongoDB instead of mongomock-motor")
+    parser.add_argument("--set", action="append", default=[], metavar="KEY=VALUE", help="Override an app setting")
+    parser.add_argument("--output", help="Also write the results to this file")
+    args = parser.parse_args()
+    args.scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = [name for name in args.scenarios if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(unknown)}")
+
+    # Settings are read when the app is imported, so they have to be in place before that
+    for key, value in PLACEHOLDER_SETTINGS.items():
+        os.environ.setdefault(key, value)
+    for override in args.set:
+        key, _, value = override.partition("=")
+        os.environ[key] = value
+
+    report = {
+        "config": {
+            **{k: v for k, v in vars(args).items() if k not in ("output", "redis_url", "mongo_url")},
+            "redis": "local" if args.redis_url else "fakeredis",
+            "mongo": "local" if args.mongo_url else "mongomock"
+        },
+        "scenarios": asyncio.run(main_async(args))
+    }
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Memory and decode cost of one cached subnet map in the "hash" format (one field per hotkey)
+versus the "packed" format (one blob of SS58 addresses and u64 dividends, optionally zlib).
+
+Decode times cover turning what Redis returns into what the API serves: HGETALL's string pairs
+into {hotkey: int} versus PackedDividends(blob).to_dict(), and a single-hotkey lookup (hash field
+versus binary search in the blob). Payload bytes are the field and value bytes Redis stores and
+sends. With --redis-url, Redis' own MEMORY
+USAGE is reported for both formats too (keys are written under bench:* and deleted afterwards).
+
+    python -m benchmarks.bench_dividend_cache_format [--hotkeys 256,1024,4096] [--iterations 200]
+        [--redis-url redis://localhost:6379/15]
+"""
+import argparse
+import hashlib
+import json
+import random
+import time
+from app.core.ss58 import ss58_encode
+from app.services.dividend_codec import PackedDividends, encode_dividends
+
+def subnet_map(hotkeys: int) -> dict:
+    rng = random.Random(hotkeys)
+    return {
+        ss58_encode(hashlib.blake2b(f"{hotkeys}:{i}".encode(), digest_size=32).digest()): rng.randrange(0, 2**63)
+        for i in range(hotkeys)
+    }
+
+def measure_us(fn, iterations: int) -> float:
+    """Mean microseconds per call."""
+    total = 0.0
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        total += time.perf_counter() - start
+    return round(1e6 * total / iterations, 2)
+
+def redis_memory(url: str, dividends: dict, blobs: dict) -> dict:
+    import redis
+    client = redis.Redis.from_url(url)
+    try:
+        client.hset("bench:hash", mapping=dividends)
+        usage = {"hash": client.memory_usage("bench:hash", samples=0)}
+        for name, blob in blobs.items():
+            client.set(f"bench:{name}", blob)
+            usage[name] = client.memory_usage(f"bench:{name}", samples=0)
+        return usage
+    finally:
+        client.delete("bench:hash", *(f"bench:{name}" for name in blobs))
+
+def compare(hotkeys: int, iterations: int, redis_url: str = None) -> dict:
+    dividends = subnet_map(hotkeys)
+    # What HGETALL hands back with decode_responses=True
+    hash_fields = {hotkey: str(value) for hotkey, value in dividends.items()}
+    blobs = {"packed": encode_dividends(dividends), "packed_zlib": encode_dividends(dividends, compress=True)}
+    for blob in blobs.values():
+        assert PackedDividends(blob).to_dict() == dividends
+    probe = random.Random(0).choice(list(dividends))
+
+    result = {
+        "payload_bytes": {"hash": sum(len(k) + len(v) for k, v in hash_fields.items())},
+        "decode_us": {"hash": measure_us(lambda: {k: int(v) for k, v in hash_fields.items()}, iterations)},
+        "lookup_us": {"hash": measure_us(lambda: int(hash_fields[probe]), iterations)}
+    }
+    for name, blob in blobs.items():
+        result["payload_bytes"][name] = len(blob)
+        result["decode_us"][name] = measure_us(lambda: PackedDividends(blob).to_dict(), iterations)
+        result["lookup_us"][name] = measure_us(lambda: PackedDividends(blob).get(probe), iterations)
+    if redis_url:
+        result["redis_memory_bytes"] = redis_memory(redis_url, hash_fields, blobs)
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--hotkeys", default="256,1024,4096", help="Comma-separated subnet sizes")
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--redis-url")
+    args = parser.parse_args()
+
+    print(json.dumps({
+        size: compare(int(size), args.iterations, args.redis_url)
+        for size in args.hotkeys.split(",")
+    }, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Per-request CPU cost of serializing an all-subnets /api/v1/tao_dividends response.
+
+Compares FastAPI's default path (validate the dict against TaoDividendsResponse, dump it in
+JSON mode, then json.dumps) with the orjson fast path used by the endpoint.
+
+    python -m benchmarks.bench_dividends_serialization [--subnets 64] [--hotkeys 256] [--iterations 50]
+"""
+import argparse
+import json
+import random
+import string
+import time
+import orjson
+from pydantic import TypeAdapter
+from app.models.responses import TaoDividendsResponse
+
+SS58_ALPHABET = "".join(c for c in string.ascii_letters + string.digits if c not in "0OIl")
+
+def synthetic_payload(subnets: int, hotkeys: int) -> dict:
+    rng = random.Random(0)
+    data = {}
+    for netuid in range(subnets):
+        data[str(netuid)] = {
+            "5" + "".join(rng.choices(SS58_ALPHABET, k=47)): rng.randrange(0, 2**63)
+            for _ in range(hotkeys)
+        }
+    return {
+        "netuid": None,
+        "hotkey": None,
+        "cache_status": "hit",
+        "block": 4_200_000,
+        "subnet_cache_status": {netuid: "hit" for netuid in data},
+        "data": data
+    }
+
+def pydantic_path(adapter: TypeAdapter, payload: dict) -> bytes:
+    model = adapter.validate_python(payload)
+    content = adapter.dump_python(model, mode="json", exclude_none=True)
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode()
+
+def orjson_path(payload: dict) -> bytes:
+    return orjson.dumps({k: v for k, v in payload.items() if v is not None})
+
+def measure(fn, iterations: int) -> dict:
+    fn()  # warm up
+    cpu, wall = [], []
+    for _ in range(iterations):
+        cpu_start, wall_start = time.process_time(), time.perf_counter()
+        fn()
+        cpu.append(time.process_time() - cpu_start)
+        wall.append(time.perf_counter() - wall_start)
+    return {
+        "cpu_ms_mean": round(1000 * sum(cpu) / iterations, 3),
+        "wall_ms_mean": round(1000 * sum(wall) / iterations, 3)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--subnets", type=int, default=64)
+    parser.add_argument("--hotkeys", type=int, default=256)
+    parser.add_argument("--iterations", type=int, default=50)
+    args = parser.parse_args()
+
+    payload = synthetic_payload(args.subnets, args.hotkeys)
+    adapter = TypeAdapter(TaoDividendsResponse)
+    assert json.loads(pydantic_path(adapter, payload)) == json.loads(orjson_path(payload))
+
+    before = measure(lambda: pydantic_path(adapter, payload), args.iterations)
+    after = measure(lambda: orjson_path(payload), args.iterations)
+    print(json.dumps({
+        "payload": {"subnets": args.subnets, "hotkeys_per_subnet": args.hotkeys, "bytes": len(orjson_path(payload))},
+        "pydantic": before,
+        "orjson": after,
+        "cpu_speedup": round(before["cpu_ms_mean"] / max(after["cpu_ms_mean"], 1e-6), 1)
+    }, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+Throughput of persisting stake actions: one insert_one per action versus the write-behind
+WriteBuffer flushing with insert_many(ordered=False).
+
+Runs against a real MongoDB by default (a throwaway collection is dropped afterwards). With
+--simulated-rtt-ms it uses an in-process collection that only sleeps for one round trip per
+call, with at most --simulated-pool-size calls in flight like Motor's connection pool, which
+isolates the effect of batching round trips.
+
+"acknowledged" adds up to --flush-interval to each caller's latency in exchange for fewer round
+trips; "buffered" takes the write off the caller's path entirely.
+
+    python -m benchmarks.bench_stake_persistence [--url mongodb://localhost:27017] [--actions 2000]
+        [--concurrency 256] [--flush-size 100] [--durability acknowledged] [--simulated-rtt-ms 1]
+"""
+import argparse
+import asyncio
+import json
+import time
+from datetime import datetime, timezone
+from motor.motor_asyncio import AsyncIOMotorClient
+from app.db.write_buffer import DURABILITY_MODES, WriteBuffer
+
+COLLECTION = "bench_stake_actions"
+
+class SimulatedCollection:
+    """Stands in for a Motor collection; every call costs one round trip on a pooled connection."""
+
+    def __init__(self, rtt: float, pool_size: int):
+        self.rtt = rtt
+        self.pool = asyncio.Semaphore(pool_size)
+        self.documents = 0
+
+    def with_options(self, **kwargs):
+        return self
+
+    async def insert_one(self, document):
+        async with self.pool:
+            await asyncio.sleep(self.rtt)
+        self.documents += 1
+
+    async def insert_many(self, documents, ordered=True):
+        async with self.pool:
+            await asyncio.sleep(self.rtt)
+        self.documents += len(documents)
+
+def stake_action(i: int) -> dict:
+    return {
+        "netuid": i % 64,
+        "hotkey": f"hotkey-{i % 256}",
+        "sentiment_score": 42.0,
+        "action": "stake",
+        "amount": 0.42,
+        "result": True,
+        "timestamp": datetime.now(timezone.utc)
+    }
+
+async def run(write, actions: int, concurrency: int) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(i: int):
+        async with semaphore:
+            start = time.perf_counter()
+            await write(stake_action(i))
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(actions)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "actions_per_second": round(actions / elapsed),
+        "p50_ms": round(1000 * latencies[len(latencies) // 2], 3),
+        "p99_ms": round(1000 * latencies[int(len(latencies) * 0.99) - 1], 3)
+    }
+
+async def main_async(args):
+    if args.simulated_rtt_ms is not None:
+        collection = SimulatedCollection(args.simulated_rtt_ms / 1000, args.simulated_pool_size)
+        db = {COLLECTION: collection}
+        client = None
+    else:
+        client = AsyncIOMotorClient(args.url)
+        db = client[args.database]
+        collection = db[COLLECTION]
+
+    try:
+        per_action = await run(collection.insert_one, args.actions, args.concurrency)
+        buffer = WriteBuffer(COLLECTION, args.flush_size, args.flush_interval, args.durability, db_provider=lambda: db)
+        buffered = await run(buffer.add, args.actions, args.concurrency)
+        await buffer.stop()
+    finally:
+        if client is not None:
+            await db.drop_collection(COLLECTION)
+            client.close()
+
+    print(json.dumps({
+        "backend": "simulated" if client is None else args.url,
+        "actions": args.actions,
+        "concurrency": args.concurrency,
+        "durability": args.durability,
+        "insert_one": {**per_action, "round_trips": args.actions},
+        "write_buffer": {**buffered, "round_trips": buffer.flushes},
+        "throughput_speedup": round(buffered["actions_per_second"] / max(per_action["actions_per_second"], 1), 1)
+    }, indent=2))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="mongodb://localhost:27017")
+    parser.add_argument("--database", default="bittensor_api_bench")
+    parser.add_argument("--actions", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=256)
+    parser.add_argument("--flush-size", type=int, default=100)
+    parser.add_argument("--flush-interval", type=float, default=0.005)
+    parser.add_argument("--durability", choices=DURABILITY_MODES, default="acknowledged")
+    parser.add_argument("--simulated-rtt-ms", type=float, default=None)
+    parser.add_argument("--simulated-pool-size", type=int, default=100)
+    asyncio.run(main_async(parser.parse_args()))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Time until the API is ready to serve: importing app.main and running the lifespan startup.
+
+"lazy" is the current startup, where the subtensor, the wallet and the coldkey are created on
+first use. "eager" additionally does what importing app.services.bittensor used to do up front:
+build the AsyncSubtensor, load the wallet and unlock the coldkey (a KDF-heavy decrypt). Each run
+is a fresh interpreter, so import costs are included. Needs the same environment as the API
+(.env and wallet).
+
+    python -m benchmarks.bench_startup [--runs 5]
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+PROBE = """
+import asyncio, json, sys, time
+start = time.perf_counter()
+import app.main as main
+imported = time.perf_counter()
+if sys.argv[1] == "eager":
+    main.bittensor_service.subtensor
+    main.bittensor_service._unlock_coldkey()
+initialized = time.perf_counter()
+
+async def boot():
+    async with main.lifespan(main.app):
+        return time.perf_counter()
+
+ready = asyncio.run(boot())
+print(json.dumps({
+    "import_ms": 1000 * (imported - start),
+    "init_ms": 1000 * (initialized - imported),
+    "ready_ms": 1000 * (ready - start)
+}))
+"""
+
+def probe(mode: str) -> dict:
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE, mode], check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def summarize(samples: list) -> dict:
+    return {key: round(statistics.median(s[key] for s in samples), 1) for key in samples[0]}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    results = {}
+    for mode in ("eager", "lazy"):
+        results[mode] = summarize([probe(mode) for _ in range(args.runs)])
+    results["ready_fraction"] = round(results["lazy"]["ready_ms"] / results["eager"]["ready_ms"], 2)
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
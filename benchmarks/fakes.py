@@ -0,0 +1,167 @@
+"""
+In-process stand-ins for the services the API talks to, for benchmarks that should measure the
+API itself rather than the network: a fake AsyncSubtensor with a fake substrate, and httpx
+transports playing Datura and Chutes. Every stand-in sleeps for a configurable latency per round
+trip and returns payloads of a configurable size.
+"""
+import asyncio
+import hashlib
+import json
+import re
+from types import SimpleNamespace
+from typing import Dict, List, Optional
+import httpx
+
+def account_id(netuid: int, index: int) -> tuple:
+    """Deterministic 32-byte account id, in the (bytes,) shape substrate returns for map keys."""
+    return (tuple(hashlib.blake2b(f"{netuid}:{index}".encode(), digest_size=32).digest()),)
+
+def dividend(*key) -> int:
+    return int.from_bytes(hashlib.blake2b(repr(key).encode(), digest_size=6).digest(), "little")
+
+class FakeQueryMapResult:
+    """Paged query_map result: the first page is fetched by query_map, every further page costs one more round trip."""
+
+    def __init__(self, substrate: "FakeSubstrate", netuid: Optional[int]):
+        self.substrate = substrate
+        self.netuid = netuid
+
+    async def __aiter__(self):
+        if self.netuid is None:
+            # SubtensorModule.Tempo, keyed by netuid
+            for netuid in range(self.substrate.subnets):
+                yield netuid, SimpleNamespace(value=self.substrate.tempo)
+            return
+
+        page_size = self.substrate.page_size
+        for index in range(self.substrate.hotkeys_per_subnet):
+            if index and index % page_size == 0:
+                await self.substrate.round_trip()
+            yield account_id(self.netuid, index), SimpleNamespace(value=dividend(self.netuid, index))
+
+class FakeReceipt:
+    def __init__(self, extrinsic_hash: str):
+        self.extrinsic_hash = extrinsic_hash
+
+    @property
+    async def is_success(self) -> bool:
+        return True
+
+    @property
+    async def error_message(self) -> Optional[str]:
+        return None
+
+class FakeSubstrate:
+    """The subset of AsyncSubstrateInterface the API uses, backed by generated storage."""
+
+    def __init__(self, subnets: int, hotkeys_per_subnet: int, latency: float, page_size: int = 100, inclusion_latency: float = 0):
+        self.subnets = subnets
+        self.hotkeys_per_subnet = hotkeys_per_subnet
+        self.latency = latency
+        self.page_size = page_size
+        self.inclusion_latency = inclusion_latency
+        self.tempo = 360
+        self.block = 1000
+        self.calls = 0
+        self._nonce = 0
+
+    async def round_trip(self):
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+
+    async def query(self, module: str, storage_function: str, params: List, block_hash: Optional[str] = None):
+        await self.round_trip()
+        return SimpleNamespace(value=dividend(*params))
+
+    async def query_map(self, module: str, storage_function: str, params: Optional[List] = None, block_hash: Optional[str] = None):
+        await self.round_trip()
+        return FakeQueryMapResult(self, params[0] if params else None)
+
+    async def create_storage_key(self, pallet: str, storage_function: str, params: List, block_hash: Optional[str] = None):
+        return SimpleNamespace(params=params)
+
+    async def query_multi(self, storage_keys: List, block_hash: Optional[str] = None):
+        await self.round_trip()
+        return [(key, SimpleNamespace(value=dividend(*key.params))) for key in storage_keys]
+
+    async def get_chain_finalised_head(self) -> str:
+        await self.round_trip()
+        return f"0x{self.block:064x}"
+
+    async def get_block_number(self, block_hash: str) -> int:
+        await self.round_trip()
+        return int(block_hash, 16)
+
+    async def compose_call(self, call_module: str, call_function: str, call_params: Dict):
+        return SimpleNamespace(call_module=call_module, call_function=call_function, call_params=call_params)
+
+    async def get_account_next_index(self, ss58_address: str) -> int:
+        await self.round_trip()
+        return self._nonce
+
+    async def create_signed_extrinsic(self, call, keypair, nonce: int):
+        return SimpleNamespace(call=call, nonce=nonce)
+
+    async def submit_extrinsic(self, extrinsic, wait_for_inclusion: bool = False, wait_for_finalization: bool = False):
+        await self.round_trip()
+        if wait_for_inclusion:
+            await asyncio.sleep(self.inclusion_latency)
+        self._nonce += 1
+        return FakeReceipt(f"0x{extrinsic.nonce:064x}")
+
+class FakeSubtensor:
+    """The subset of AsyncSubtensor the API uses."""
+
+    def __init__(self, substrate: FakeSubstrate):
+        self.substrate = substrate
+        self.stakes = 0
+
+    async def initialize(self):
+        await self.substrate.round_trip()
+        return self
+
+    async def close(self):
+        pass
+
+    async def get_subnets(self) -> List[int]:
+        await self.substrate.round_trip()
+        return list(range(self.substrate.subnets))
+
+    async def get_current_block(self) -> int:
+        await self.substrate.round_trip()
+        return self.substrate.block
+
+    async def add_stake(self, **kwargs) -> bool:
+        await self.substrate.submit_extrinsic(SimpleNamespace(nonce=self.substrate._nonce), wait_for_inclusion=True)
+        self.stakes += 1
+        return True
+
+    async def unstake(self, **kwargs) -> bool:
+        return await self.add_stake(**kwargs)
+
+def fake_wallet():
+    return SimpleNamespace(coldkey=SimpleNamespace(ss58_address="5" + "F" * 47))
+
+BATCH_SUBNETS = re.compile(r"Subnet (\d+) tweets:")
+
+def upstream_transport(datura_latency: float, chutes_latency: float, tweets: int, tweet_bytes: int) -> httpx.MockTransport:
+    """
+    One transport answering both upstreams: Datura searches return `tweets` tweets of about
+    `tweet_bytes` bytes each, Chutes completions return a score (or a JSON object of scores for
+    packed prompts).
+    """
+    text = ("bittensor " * (tweet_bytes // 10 + 1))[:tweet_bytes]
+
+    async def handle(request: httpx.Request) -> httpx.Response:
+        if request.url.host == "apis.datura.ai":
+            await asyncio.sleep(datura_latency)
+            query = json.loads(request.content)["query"]
+            return httpx.Response(200, json=[{"id": f"{query}:{i}", "text": f"{query} {text} {i}"} for i in range(tweets)])
+
+        await asyncio.sleep(chutes_latency)
+        prompt = json.loads(request.content)["messages"][0]["content"]
+        netuids = BATCH_SUBNETS.findall(prompt)
+        content = json.dumps({netuid: 42 for netuid in netuids}) if netuids else "42"
+        return httpx.Response(200, json={"choices": [{"message": {"content": content}}]})
+
+    return httpx.MockTransport(handle)
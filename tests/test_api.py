@@ -1,9 +1,12 @@
+import json
 import pytest
 from fastapi.testclient import TestClient
 from app.main import app
 from app.core.config import settings
-from unittest.mock import AsyncMock, patch
+from app.db.mongodb import get_db
+from unittest.mock import AsyncMock, MagicMock, patch
 from bson import ObjectId
+from datetime import datetime, timedelta
 
 @pytest.fixture
 def client():
@@ -20,6 +23,21 @@ def auth_headers():
 def invalid_auth_headers():
     return {"Authorization": f"Bearer {INVALID_API_KEY}"}
 
+def test_malformed_hotkey_is_rejected(client, auth_headers):
+    """Test malformed hotkeys are rejected with 400 before any chain query"""
+    response = client.get(
+        f"{settings.API_V1_PREFIX}/tao_dividends?netuid={TEST_NETUID}&hotkey=not-an-address",
+        headers=auth_headers
+    )
+    assert response.status_code == 400
+
+    response = client.post(
+        f"{settings.API_V1_PREFIX}/tao_dividends/batch",
+        json={"pairs": [{"netuid": TEST_NETUID, "hotkey": "not-an-address"}]},
+        headers=auth_headers
+    )
+    assert response.status_code == 400
+
 def test_get_tao_dividends_success(client, auth_headers):
     """Test successful retrieval of Tao dividends"""
     response = client.get(
@@ -32,6 +50,72 @@ def test_get_tao_dividends_success(client, auth_headers):
     assert "data" in data
     assert isinstance(data["data"], dict)
 
+def test_get_tao_dividends_all_subnets(client, auth_headers):
+    """Test retrieval of Tao dividends across all subnets reports per-subnet cache status"""
+    response = client.get(
+        f"{settings.API_V1_PREFIX}/tao_dividends",
+        headers=auth_headers
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert isinstance(data["data"], dict)
+    assert set(data["subnet_cache_status"]) == set(data["data"])
+    assert all(status in ("l1", "hit", "stale", "miss") for status in data["subnet_cache_status"].values())
+
+def test_get_tao_dividends_paginated(client, auth_headers):
+    """Test cursor pagination over subnets returns disjoint pages"""
+    first = client.get(
+        f"{settings.API_V1_PREFIX}/tao_dividends?limit=2",
+        headers=auth_headers
+    ).json()
+    assert len(first["data"]) <= 2
+    if "next_cursor" in first:
+        second = client.get(
+            f"{settings.API_V1_PREFIX}/tao_dividends?limit=2&cursor={first['next_cursor']}",
+            headers=auth_headers
+        ).json()
+        assert not set(first["data"]) & set(second["data"])
+
+def test_get_tao_dividends_invalid_cursor(client, auth_headers):
+    """Test a malformed pagination cursor is rejected"""
+    response = client.get(
+        f"{settings.API_V1_PREFIX}/tao_dividends?cursor=not-a-cursor",
+        headers=auth_headers
+    )
+    assert response.status_code == 400
+
+def test_stream_tao_dividends(client, auth_headers):
+    """Test streaming Tao dividends emits one JSON line per subnet"""
+    response = client.get(
+        f"{settings.API_V1_PREFIX}/tao_dividends/stream?limit=3",
+        headers=auth_headers
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert 0 < len(lines) <= 3
+    assert all("netuid" in line and "data" in line for line in lines)
+
+def test_get_tao_dividends_batch(client, auth_headers):
+    """Test batch retrieval returns one result per distinct (netuid, hotkey) pair, in order"""
+    pairs = [
+        {"netuid": TEST_NETUID, "hotkey": settings.DEFAULT_HOTKEY},
+        {"netuid": settings.DEFAULT_NETUID, "hotkey": settings.DEFAULT_HOTKEY},
+        {"netuid": TEST_NETUID, "hotkey": settings.DEFAULT_HOTKEY}
+    ]
+    response = client.post(
+        f"{settings.API_V1_PREFIX}/tao_dividends/batch",
+        headers=auth_headers,
+        json={"pairs": pairs}
+    )
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [(r["netuid"], r["hotkey"]) for r in results] == [
+        (TEST_NETUID, settings.DEFAULT_HOTKEY),
+        (settings.DEFAULT_NETUID, settings.DEFAULT_HOTKEY)
+    ]
+    assert all(isinstance(r["dividend"], int) for r in results)
+
 def test_get_tao_dividends_unauthorized(client, invalid_auth_headers):
     """Test unauthorized access to Tao dividends"""
     response = client.get(
@@ -52,6 +136,60 @@ def test_get_subnet_sentiment_success(client, auth_headers):
     assert "sentiment_score" in data
     assert -100 <= data["sentiment_score"] <= 100
 
+def make_stake_actions(count):
+    return [{
+        "_id": ObjectId(),
+        "netuid": TEST_NETUID,
+        "hotkey": settings.DEFAULT_HOTKEY,
+        "sentiment_score": 10.0,
+        "action": "stake",
+        "amount": 0.1,
+        "result": True,
+        "timestamp": datetime(2025, 1, 1, 12, 0, 0) - timedelta(minutes=i)
+    } for i in range(count)]
+
+def test_get_stake_history_paginated(client, auth_headers):
+    """Test stake history pages by (timestamp, _id) and hands out a cursor for the next page"""
+    records = make_stake_actions(3)
+    db = MagicMock()
+    db.stake_actions.find.return_value.sort.return_value.limit.return_value.to_list = AsyncMock(return_value=records)
+    app.dependency_overrides[get_db] = lambda: db
+    try:
+        response = client.get(
+            f"{settings.API_V1_PREFIX}/stake_history?netuid={TEST_NETUID}&limit=2",
+            headers=auth_headers
+        )
+        assert response.status_code == 200
+        assert len(response.json()) == 2
+        next_cursor = response.headers["X-Next-Cursor"]
+
+        client.get(
+            f"{settings.API_V1_PREFIX}/stake_history?netuid={TEST_NETUID}&limit=2&cursor={next_cursor}",
+            headers=auth_headers
+        )
+        query = db.stake_actions.find.call_args.args[0]
+        assert query["$and"][0] == {"netuid": TEST_NETUID}
+        assert query["$and"][1]["$or"][1] == {"timestamp": records[1]["timestamp"], "_id": {"$lt": records[1]["_id"]}}
+        db.stake_actions.find.return_value.sort.assert_called_with([("timestamp", -1), ("_id", -1)])
+    finally:
+        app.dependency_overrides.clear()
+
+def test_get_stake_history_limit_is_bounded(client, auth_headers):
+    """Test page sizes above STAKE_HISTORY_MAX_PAGE are rejected"""
+    response = client.get(
+        f"{settings.API_V1_PREFIX}/stake_history?limit={settings.STAKE_HISTORY_MAX_PAGE + 1}",
+        headers=auth_headers
+    )
+    assert response.status_code == 422
+
+def test_get_stake_history_invalid_cursor(client, auth_headers):
+    """Test a malformed stake history cursor is rejected"""
+    response = client.get(
+        f"{settings.API_V1_PREFIX}/stake_history?cursor=bm90LWEtbGlzdA",
+        headers=auth_headers
+    )
+    assert response.status_code == 400
+
 def test_invalid_api_key(client, invalid_auth_headers):
     """Test invalid API key handling"""
     response = client.get(
@@ -0,0 +1,110 @@
+import pytest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+from app.core.providers import Provider
+from app.services.bittensor import BittensorService
+from app.services.subtensor_pool import SubtensorPool
+
+HOTKEY_A = "5FFApaS75bv5pJHfAp2FVLBj9ZaXuFDjEypsaBNc1wCfe52v"
+HOTKEY_B = "5GrwvaEF5zXb26Fz9rcQpDWS57CtERHpNehXCPcNoHGKutQY"
+
+def make_service(substrate):
+    service = BittensorService.__new__(BittensorService)
+    subtensor = MagicMock(substrate=substrate)
+    service._subtensor = Provider(lambda: subtensor)
+    service._pool = Provider(lambda: SubtensorPool(["mock"], 1, factory=lambda endpoint: subtensor))
+    service._query_multi_disabled_until = 0.0
+    return service
+
+@pytest.mark.asyncio
+async def test_query_hotkeys_uses_one_batched_storage_query():
+    """Test cross-subnet hotkey lookups are served by a single query_multi call"""
+    substrate = MagicMock()
+    substrate.create_storage_key = AsyncMock(side_effect=lambda pallet, storage, params, block_hash=None: SimpleNamespace(params=params))
+    substrate.query_multi = AsyncMock(side_effect=lambda storage_keys, block_hash=None: [
+        (storage_keys[0], SimpleNamespace(value=10)),
+        (storage_keys[1], None)
+    ])
+    service = make_service(substrate)
+
+    values = await service._query_hotkeys([(1, HOTKEY_A), (2, HOTKEY_A), (2, HOTKEY_B)])
+    assert values == {(1, HOTKEY_A): 10, (2, HOTKEY_A): 0, (2, HOTKEY_B): 0}
+    substrate.query_multi.assert_awaited_once()
+
+@pytest.mark.asyncio
+async def test_query_hotkeys_falls_back_to_single_queries():
+    """Test a node without state_queryStorageAt support is queried key by key"""
+    substrate = MagicMock()
+    substrate.create_storage_key = AsyncMock(return_value=SimpleNamespace(params=[]))
+    substrate.query_multi = AsyncMock(side_effect=Exception("Method not found"))
+    substrate.query = AsyncMock(return_value=SimpleNamespace(value=5))
+    service = make_service(substrate)
+
+    values = await service._query_hotkeys([(1, HOTKEY_A), (2, HOTKEY_A)])
+    assert values == {(1, HOTKEY_A): 5, (2, HOTKEY_A): 5}
+    assert substrate.query.await_count == 2
+
+    await service._query_hotkeys([(3, HOTKEY_A)])
+    substrate.query_multi.assert_awaited_once()
+
+@pytest.mark.asyncio
+async def test_query_hotkeys_keeps_batching_after_transient_errors():
+    """Test transport errors propagate and one-off failures fall back without disabling query_multi"""
+    substrate = MagicMock()
+    substrate.create_storage_key = AsyncMock(return_value=SimpleNamespace(params=[]))
+    substrate.query_multi = AsyncMock(side_effect=ConnectionError("connection dropped"))
+    substrate.query = AsyncMock(return_value=SimpleNamespace(value=5))
+    service = make_service(substrate)
+
+    with pytest.raises(ConnectionError):
+        await service._query_hotkeys([(1, HOTKEY_A)])
+    assert service._query_multi_disabled_until == 0.0
+
+    substrate.query_multi.side_effect = Exception("Internal error")
+    assert await service._query_hotkeys([(1, HOTKEY_A)]) == {(1, HOTKEY_A): 5}
+    assert service._query_multi_disabled_until == 0.0
+
+    # Local encoding errors, e.g. a malformed address, say nothing about the node either
+    substrate.query_multi.side_effect = ValueError("Invalid SS58 address")
+    assert await service._query_hotkeys([(1, HOTKEY_A)]) == {(1, HOTKEY_A): 5}
+    assert service._query_multi_disabled_until == 0.0
+
+@pytest.mark.asyncio
+async def test_pinned_read_falls_back_to_primary_when_pool_lags():
+    """Test a read pinned to a block the pooled endpoint does not know yet runs on the primary connection"""
+    lagging = MagicMock()
+    lagging.query = AsyncMock(side_effect=Exception("Client error: UnknownBlock: Header was not found"))
+    primary = MagicMock()
+    primary.query = AsyncMock(return_value=SimpleNamespace(value=5))
+    service = make_service(primary)
+    service._pool = Provider(lambda: SubtensorPool(["mock"], 1, factory=lambda endpoint: MagicMock(substrate=lagging)))
+
+    assert await service._query_hotkey(1, HOTKEY_A, block_hash="0xhead") == {HOTKEY_A: 5}
+    lagging.query.assert_awaited_once()
+    with pytest.raises(Exception, match="UnknownBlock"):
+        await service._query_hotkey(1, HOTKEY_A)
+
+def test_construction_does_not_touch_chain_or_wallet():
+    """Test creating the service defers the subtensor, the wallet and the coldkey until first use"""
+    with patch("app.services.bittensor.bt") as bt:
+        service = BittensorService()
+        bt.AsyncSubtensor.assert_not_called()
+        bt.wallet.assert_not_called()
+
+        service.subtensor
+        bt.AsyncSubtensor.assert_called_once()
+        bt.wallet.assert_not_called()
+
+@pytest.mark.asyncio
+async def test_coldkey_is_unlocked_once_on_first_stake():
+    """Test the first stake unlocks the coldkey off the event loop and later stakes reuse it"""
+    with patch("app.services.bittensor.bt") as bt:
+        bt.wallet.return_value.coldkey_file.env_var_name.return_value = "BT_PW_TEST"
+        bt.AsyncSubtensor.return_value.add_stake = AsyncMock(return_value=True)
+        service = BittensorService()
+
+        await service.stake_tao(0.1, 1, HOTKEY_A)
+        await service.stake_tao(0.1, 1, HOTKEY_A)
+
+        bt.wallet.return_value.unlock_coldkey.assert_called_once()
+        assert bt.AsyncSubtensor.return_value.add_stake.await_count == 2
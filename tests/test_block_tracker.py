@@ -0,0 +1,28 @@
+from unittest.mock import MagicMock
+from app.services.block_tracker import BlockTracker
+
+def make_tracker(block_number, tempos):
+    tracker = BlockTracker(MagicMock())
+    tracker.block_number = block_number
+    tracker.block_hash = "0x00"
+    tracker._tempos = tempos
+    return tracker
+
+def test_last_epoch_block():
+    """Test epochs run where (block + netuid + 1) % (tempo + 1) == 0"""
+    tracker = make_tracker(1000, {1: 99})
+    last_epoch = tracker.last_epoch_block(1, 1000)
+    assert (last_epoch + 1 + 1) % 100 == 0
+    assert 1000 - 100 < last_epoch <= 1000
+
+def test_is_current_until_next_epoch():
+    """Test cached dividends stay current until the subnet's next epoch runs"""
+    tracker = make_tracker(1000, {1: 99})
+    last_epoch = tracker.last_epoch_block(1, 1000)
+    assert tracker.is_current(1, last_epoch) is True
+    assert tracker.is_current(1, last_epoch - 1) is False
+
+def test_is_current_unknown_without_head_or_tempo():
+    """Test freshness is undecided before the first head or for unknown tempos"""
+    assert make_tracker(None, {1: 99}).is_current(1, 900) is None
+    assert make_tracker(1000, {}).is_current(1, 900) is None
@@ -0,0 +1,37 @@
+from unittest.mock import patch
+from app.core.cache import TTLCache
+
+def test_entries_expire_after_ttl():
+    """Test entries are served until their TTL passes and dropped afterwards"""
+    cache = TTLCache(maxsize=10, ttl=5)
+    with patch("app.core.cache.time.monotonic", return_value=100.0):
+        cache.set("a", 1)
+    with patch("app.core.cache.time.monotonic", return_value=104.9):
+        assert cache.get("a") == 1
+    with patch("app.core.cache.time.monotonic", return_value=105.0):
+        assert cache.get("a", "expired") == "expired"
+    assert len(cache) == 0
+
+def test_least_recently_used_entry_is_evicted_at_max_size():
+    """Test the cache holds at most maxsize entries and evicts the least recently read one"""
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+
+    assert len(cache) == 2
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+
+def test_disabled_cache_stores_nothing_and_discard_where_filters_keys():
+    """Test a zero size or TTL disables the cache, and discard_where drops only matching keys"""
+    disabled = TTLCache(maxsize=0, ttl=60)
+    disabled.set("a", 1)
+    assert len(disabled) == 0
+
+    cache = TTLCache(maxsize=10, ttl=60)
+    for key in [(1, None), (1, "hotkey"), (2, None)]:
+        cache.set(key, key)
+    cache.discard_where(lambda key: key[0] == 1)
+    assert len(cache) == 1 and cache.get((2, None)) == (2, None)
@@ -0,0 +1,88 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+import fakeredis
+import pytest
+from app.core.config import settings
+from app.core.metrics import CACHE_REQUESTS
+from app.services.cache_warmer import CacheWarmer
+from app.services.dividend_cache import DividendCache
+
+HOTKEY = "5GrwvaEF5zXb26Fz9rcQpDWS57CtERHpNehXCPcNoHGKutQY"
+
+@pytest.fixture
+def redis():
+    redis = fakeredis.FakeAsyncRedis(decode_responses=True)
+    with patch("app.services.cache_warmer.get_redis_client", return_value=redis), \
+            patch("app.services.dividend_cache.get_redis_client", return_value=redis):
+        yield redis
+
+@pytest.fixture
+def cache(redis):
+    with patch.object(settings, "L1_CACHE_ENABLED", True):
+        cache = DividendCache()
+    with patch("app.services.cache_warmer.dividend_cache", cache):
+        yield cache
+
+def make_service(netuids):
+    service = MagicMock()
+    service._get_all_subnets = AsyncMock(return_value=netuids)
+    service.refresh_subnet_dividends = AsyncMock()
+    # Subnets cached at block 10 or later have not had an epoch since
+    service._is_current = lambda netuid, block: block >= 10
+    return service
+
+@pytest.mark.asyncio
+async def test_only_one_worker_warms_per_interval(cache):
+    """Test a second worker skips the round while the first one's lock is held"""
+    first, second = make_service([1, 2]), make_service([1, 2])
+    with patch.object(settings, "CACHE_WARMER_JITTER", 0):
+        assert await CacheWarmer(first).warm() is True
+        assert await CacheWarmer(second).warm() is False
+
+    assert first.refresh_subnet_dividends.await_count == 2
+    second._get_all_subnets.assert_not_awaited()
+    second.refresh_subnet_dividends.assert_not_awaited()
+
+@pytest.mark.asyncio
+async def test_block_aware_warming_refreshes_only_outdated_subnets(cache):
+    """Test only subnets whose epoch has run are refreshed, without counting as cache reads"""
+    await cache.write({1: {HOTKEY: 5}}, block=12)
+    await cache.write({2: {HOTKEY: 6}}, block=8)
+    cache.l1.clear()
+    service = make_service([1, 2, 3])
+    hits = CACHE_REQUESTS.labels("dividends_redis", "hit")._value.get()
+
+    with patch.object(settings, "BLOCK_AWARE_CACHE", True), \
+            patch.object(settings, "CACHE_WARMER_JITTER", 0):
+        assert await CacheWarmer(service).warm() is True
+
+    assert sorted(call.args[0] for call in service.refresh_subnet_dividends.await_args_list) == [2, 3]
+    assert CACHE_REQUESTS.labels("dividends_redis", "hit")._value.get() == hits
+    assert len(cache.l1) == 0
+
+@pytest.mark.asyncio
+async def test_refreshes_and_rounds_are_jittered(cache):
+    """Test subnet refreshes are spread over the jitter window and rounds repeat around the interval"""
+    service = make_service([1, 2, 3])
+    delays = []
+    with patch.object(settings, "CACHE_WARMER_INTERVAL", 60), \
+            patch.object(settings, "CACHE_WARMER_JITTER", 0.1), \
+            patch("app.services.cache_warmer.random.uniform", side_effect=lambda a, b: delays.append((a, b)) or 0):
+        await CacheWarmer(service).warm()
+    assert delays == [(0, 6.0)] * 3
+
+    warmer = CacheWarmer(service)
+    warmer.warm = AsyncMock(side_effect=RuntimeError("chain unavailable"))
+    sleeps = []
+
+    async def sleep(seconds):
+        sleeps.append(seconds)
+        raise asyncio.CancelledError
+
+    with patch.object(settings, "CACHE_WARMER_INTERVAL", 60), \
+            patch.object(settings, "CACHE_WARMER_JITTER", 0.1), \
+            patch("app.services.cache_warmer.asyncio.sleep", side_effect=sleep):
+        with pytest.raises(asyncio.CancelledError):
+            await warmer._run()
+    # A failed round still waits for the next one
+    assert len(sleeps) == 1 and 54 <= sleeps[0] <= 66
@@ -0,0 +1,93 @@
+import asyncio
+from unittest.mock import patch
+import fakeredis
+import pytest
+from app.core.config import settings
+from app.services.dividend_cache import INVALIDATION_CHANNEL, DividendCache
+
+HOTKEY = "5GrwvaEF5zXb26Fz9rcQpDWS57CtERHpNehXCPcNoHGKutQY"
+
+@pytest.fixture
+def cache():
+    redis = fakeredis.FakeAsyncRedis(decode_responses=True)
+    with patch.object(settings, "L1_CACHE_ENABLED", False), \
+            patch("app.services.dividend_cache.get_redis_client", return_value=redis):
+        yield DividendCache()
+
+@pytest.mark.asyncio
+async def test_expired_map_is_a_miss_without_stale_window(cache):
+    """Test an expired map is only served as stale while DIVIDENDS_STALE_TTL allows it"""
+    now = 1_000_000.0
+    with patch("app.services.dividend_cache.time.time", return_value=now), \
+            patch.object(settings, "DIVIDENDS_STALE_TTL", 10):
+        await cache.write({1: {HOTKEY: 5}})
+    with patch("app.services.dividend_cache.time.time", return_value=now + settings.REDIS_CACHE_EXPIRY + 5):
+        with patch.object(settings, "DIVIDENDS_STALE_TTL", 0):
+            assert await cache.read([1]) == {1: (None, "miss", None)}
+        with patch.object(settings, "DIVIDENDS_STALE_TTL", 10):
+            assert await cache.read([1]) == {1: ({HOTKEY: 5}, "stale", None)}
+        with patch.object(settings, "DIVIDENDS_STALE_TTL", 2):
+            assert await cache.read([1]) == {1: (None, "miss", None)}
+
+@pytest.mark.asyncio
+async def test_hotkey_entries_are_classified_by_their_own_block(cache):
+    """Test a hotkey read after an epoch boundary stays fresh while its subnet map is outdated"""
+    other = "5FHneW46xGXgs5mUiveU4sbTyGBzmstUspZC92UhjJM694ty"
+    await cache.write({1: {HOTKEY: 5, other: 6}}, block=10)
+    await cache.write({1: {HOTKEY: 7}}, hotkey=HOTKEY, block=20)
+
+    def is_current(netuid, block):
+        return block >= 20
+
+    assert await cache.read([1], HOTKEY, is_current=is_current) == {1: ({HOTKEY: 7}, "hit", 20)}
+    assert await cache.read_pairs([(1, HOTKEY), (1, other)], is_current=is_current) == {
+        (1, HOTKEY): (7, "hit", 20),
+        (1, other): (None, "miss", None)
+    }
+    assert await cache.read([1], is_current=is_current) == {1: (None, "miss", None)}
+    # The map is served as read at block 10, without the newer hotkey entry mixed in
+    assert await cache.read([1]) == {1: ({HOTKEY: 5, other: 6}, "hit", 10)}
+
+@pytest.mark.asyncio
+async def test_map_write_replaces_hotkey_entries(cache):
+    """Test a newer full map supersedes single-hotkey entries, and expiring entries leave the map intact"""
+    other = "5FHneW46xGXgs5mUiveU4sbTyGBzmstUspZC92UhjJM694ty"
+    await cache.write({1: {HOTKEY: 7}}, hotkey=HOTKEY, block=20)
+    await cache.write({1: {HOTKEY: 8, other: 6}}, block=30)
+    assert await cache.read([1], HOTKEY) == {1: ({HOTKEY: 8}, "hit", 30)}
+
+    await cache.write({1: {HOTKEY: 9}}, hotkey=HOTKEY, block=31)
+    # As if the entry's field TTL ran out
+    await cache._redis().delete(cache.hotkeys_key(1))
+    assert await cache.read([1]) == {1: ({HOTKEY: 8, other: 6}, "hit", 30)}
+    assert await cache.read([1], HOTKEY) == {1: ({HOTKEY: 8}, "hit", 30)}
+
+@pytest.mark.asyncio
+async def test_write_evicts_other_instances_l1_entries():
+    """Test a write on one worker drops the affected subnets from another worker's L1 cache"""
+    redis = fakeredis.FakeAsyncRedis(decode_responses=True)
+    with patch.object(settings, "L1_CACHE_ENABLED", True), \
+            patch("app.services.dividend_cache.get_redis_client", return_value=redis):
+        writer, reader = DividendCache(), DividendCache()
+        await reader.start()
+        try:
+            # The listener clears L1 once subscribed, so let it subscribe before filling L1
+            for _ in range(100):
+                if (await redis.pubsub_numsub(INVALIDATION_CHANNEL))[0][1]:
+                    break
+                await asyncio.sleep(0.01)
+            await writer.write({1: {HOTKEY: 5}, 2: {HOTKEY: 6}})
+            assert (await reader.read([1, 2]))[1] == ({HOTKEY: 5}, "hit", None)
+            assert len(reader.l1) == 2
+
+            await writer.write({1: {HOTKEY: 7}})
+            for _ in range(100):
+                if reader.l1.get((1, None)) is None:
+                    break
+                await asyncio.sleep(0.01)
+
+            assert reader.l1.get((1, None)) is None
+            assert reader.l1.get((2, None)) == ({HOTKEY: 6}, None)
+            assert (await reader.read([1]))[1] == ({HOTKEY: 7}, "hit", None)
+        finally:
+            await reader.stop()
@@ -0,0 +1,102 @@
+import hashlib
+from unittest.mock import patch
+import fakeredis
+import pytest
+from app.core.config import settings
+from app.core.ss58 import ss58_decode, ss58_encode
+from app.services.dividend_cache import DividendCache
+from app.services.dividend_codec import PackedDividends, encode_dividends
+
+ALICE = "5GrwvaEF5zXb26Fz9rcQpDWS57CtERHpNehXCPcNoHGKutQY"
+ALICE_ID = bytes.fromhex("d43593c715fdd31c61141abd04a99fd6822c8558854ccde39a5684e7a56da27d")
+
+def subnet_map(size: int) -> dict:
+    return {
+        ss58_encode(hashlib.blake2b(str(i).encode(), digest_size=32).digest()): i * 1_000_003 % 2**64
+        for i in range(size)
+    }
+
+def test_ss58_round_trip():
+    """Test addresses decode to their account id and encode back"""
+    assert ss58_decode(ALICE) == ALICE_ID
+    assert ss58_encode(ALICE_ID) == ALICE
+    with pytest.raises(ValueError):
+        ss58_decode(ALICE[:-1] + ("Z" if ALICE[-1] != "Z" else "Y"))
+
+@pytest.mark.parametrize("compress", [False, True])
+def test_packed_map_round_trip_and_lookup(compress):
+    """Test a packed map decodes to the original dict and finds single hotkeys by binary search"""
+    dividends = subnet_map(500)
+    dividends[ALICE] = 2**64 - 1
+    packed = PackedDividends(encode_dividends(dividends, compress=compress))
+
+    assert len(packed) == 501
+    assert packed.to_dict() == dividends
+    for hotkey, value in list(dividends.items())[::50]:
+        assert packed.get(hotkey) == value
+    assert packed.get(ALICE) == 2**64 - 1
+    assert packed.get("5FFApaS75bv5pJHfAp2FVLBj9ZaXuFDjEypsaBNc1wCfe52v") is None
+    assert packed.get("not-an-address") is None
+
+def test_packed_blob_size_and_invalid_hotkeys():
+    """Test the blob needs 56 bytes per hotkey and only accepts 48-character addresses"""
+    dividends = subnet_map(256)
+    blob = encode_dividends(dividends)
+    assert len(blob) == 9 + 56 * len(dividends)
+    assert PackedDividends(encode_dividends({})).to_dict() == {}
+    with pytest.raises(ValueError):
+        encode_dividends({"not-an-address": 1})
+
+@pytest.fixture
+def packed_cache():
+    server = fakeredis.FakeServer()
+    text = fakeredis.FakeAsyncRedis(server=server, decode_responses=True)
+    binary = fakeredis.FakeAsyncRedis(server=server, decode_responses=False)
+    with patch.object(settings, "DIVIDEND_CACHE_FORMAT", "packed"), \
+            patch.object(settings, "L1_CACHE_ENABLED", False), \
+            patch("app.services.dividend_cache.get_redis_client", return_value=text), \
+            patch("app.services.dividend_cache.get_redis_binary_client", return_value=binary):
+        yield DividendCache(), binary
+
+@pytest.mark.asyncio
+async def test_packed_cache_serves_maps_hotkeys_and_pairs(packed_cache):
+    """Test the packed format answers full-map, single-hotkey and pair reads from one blob per subnet"""
+    cache, redis = packed_cache
+    dividends = subnet_map(100)
+    hotkey = next(iter(dividends))
+    await cache.write({1: dividends}, block=42)
+
+    assert await redis.exists(cache.cache_key(1)) == 0
+    assert await redis.type(cache.packed_key(1)) == b"string"
+    assert await cache.read([1, 2]) == {1: (dividends, "hit", 42), 2: (None, "miss", None)}
+    assert await cache.read([1], hotkey) == {1: ({hotkey: dividends[hotkey]}, "hit", 42)}
+    assert await cache.read([1], ALICE) == {1: (None, "miss", None)}
+    assert await cache.read_pairs([(1, hotkey), (1, ALICE)]) == {
+        (1, hotkey): (dividends[hotkey], "hit", 42),
+        (1, ALICE): (None, "miss", None)
+    }
+
+    # Single-hotkey entries are still stored per field and take precedence
+    await cache.write({2: {ALICE: 7}}, hotkey=ALICE)
+    assert await cache.read([2], ALICE) == {2: ({ALICE: 7}, "hit", None)}
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("compress", [False, True])
+async def test_packed_hotkey_reads_do_not_fetch_the_blob(packed_cache, compress):
+    """Test uncompressed blobs are searched inside Redis, and compressed ones still answer hotkey reads"""
+    cache, _ = packed_cache
+    dividends = subnet_map(300)
+    hotkeys = list(dividends)[::37]
+    with patch.object(settings, "DIVIDEND_CACHE_COMPRESS", compress):
+        await cache.write({1: dividends, 2: dividends}, block=42)
+
+    decoded = []
+    with patch("app.services.dividend_cache.PackedDividends", side_effect=lambda blob: decoded.append(blob) or PackedDividends(blob)):
+        pairs = await cache.read_pairs([(netuid, hotkey) for netuid in (1, 2) for hotkey in hotkeys + [ALICE]])
+
+    assert pairs == {
+        **{(netuid, hotkey): (dividends[hotkey], "hit", 42) for netuid in (1, 2) for hotkey in hotkeys},
+        (1, ALICE): (None, "miss", None),
+        (2, ALICE): (None, "miss", None)
+    }
+    assert len(decoded) == (2 if compress else 0)
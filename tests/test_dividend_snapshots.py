@@ -0,0 +1,84 @@
+import pytest
+from datetime import datetime, timezone
+from unittest.mock import AsyncMock, MagicMock, patch
+from redis.exceptions import LockError
+from app.db.dividend_snapshots import DividendSnapshots
+
+@pytest.fixture
+def stores():
+    redis_store, hashes, written = {}, {}, []
+
+    pipeline = MagicMock()
+    pipeline.__aenter__ = AsyncMock(return_value=pipeline)
+    pipeline.__aexit__ = AsyncMock(return_value=False)
+    pipeline.hset = MagicMock(side_effect=lambda key, mapping: hashes.setdefault(key, {}).update({k: str(v) for k, v in mapping.items()}))
+    pipeline.hdel = MagicMock(side_effect=lambda key, *fields: [hashes.get(key, {}).pop(f, None) for f in fields])
+    pipeline.set = MagicMock(side_effect=lambda key, value: redis_store.__setitem__(key, str(value)))
+    pipeline.execute = AsyncMock()
+
+    lock = MagicMock()
+    lock.acquire = AsyncMock(return_value=True)
+    lock.release = AsyncMock()
+
+    redis = MagicMock()
+    redis.get = AsyncMock(side_effect=lambda key: redis_store.get(key))
+    redis.hgetall = AsyncMock(side_effect=lambda key: dict(hashes.get(key, {})))
+    redis.pipeline = MagicMock(return_value=pipeline)
+    redis.lock = MagicMock(return_value=lock)
+
+    db = MagicMock()
+    db.__getitem__.return_value.insert_many = AsyncMock(side_effect=lambda docs, ordered: written.extend(docs))
+    with patch("app.db.dividend_snapshots.get_redis_client", return_value=redis), \
+            patch("app.db.dividend_snapshots.mongodb.get_db", return_value=db):
+        yield redis, written
+
+def test_diff_treats_missing_hotkeys_as_zero():
+    """Test only changed values are reported, with removed hotkeys dropping to 0"""
+    assert DividendSnapshots.diff({"a": 1, "b": 2, "c": 3}, {"a": 1, "b": 5, "d": 0}) == {"b": 5, "c": 0}
+
+@pytest.mark.asyncio
+async def test_record_stores_only_changed_values(stores):
+    """Test successive snapshots write only the hotkeys whose dividends changed"""
+    redis, written = stores
+    snapshots = DividendSnapshots()
+
+    assert await snapshots.record(1, {"a": 10, "b": 20}, block=100) == 2
+    assert await snapshots.record(1, {"a": 10, "b": 25}, block=110) == 1
+    assert await snapshots.record(1, {"a": 10}, block=120) == 1
+
+    assert sorted((d["block"], d["meta"]["hotkey"], d["dividend"]) for d in written) == [
+        (100, "a", 10), (100, "b", 20), (110, "b", 25), (120, "b", 0)
+    ]
+    assert all(d["meta"]["netuid"] == 1 for d in written)
+
+@pytest.mark.asyncio
+async def test_record_skips_blocks_already_snapshotted(stores):
+    """Test a map read at or before the last snapshot's block is not recorded again"""
+    redis, written = stores
+    snapshots = DividendSnapshots()
+
+    await snapshots.record(1, {"a": 10}, block=100)
+    assert await snapshots.record(1, {"a": 11}, block=100) == 0
+    assert await snapshots.record(1, {"a": 12}, block=90) == 0
+    assert len(written) == 1
+
+@pytest.mark.asyncio
+async def test_record_skips_subnet_locked_by_another_worker(stores):
+    """Test a subnet being recorded elsewhere is skipped instead of waited on"""
+    redis, written = stores
+    redis.lock.return_value.acquire.return_value = False
+
+    assert await DividendSnapshots().record(1, {"a": 10}, block=100) == 0
+    assert written == []
+
+
+@pytest.mark.asyncio
+async def test_record_uses_block_time_and_tolerates_expired_lock(stores):
+    """Test measurements carry the block's on-chain time and an expired lock does not fail the write"""
+    redis, written = stores
+    redis.lock.return_value.release.side_effect = LockError("Cannot release a lock that's no longer owned")
+    block_time = AsyncMock(return_value=datetime(2025, 1, 1, 12, tzinfo=timezone.utc))
+
+    assert await DividendSnapshots().record(1, {"a": 10}, block=100, block_time=block_time) == 1
+    block_time.assert_awaited_once_with(100)
+    assert written[0]["timestamp"] == datetime(2025, 1, 1, 12, tzinfo=timezone.utc)
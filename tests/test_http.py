@@ -0,0 +1,122 @@
+import asyncio
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import httpx
+import pytest
+from app.core.http import CircuitOpenError, ResilientClient
+
+class StubUpstream:
+    """Local HTTP server replaying a scripted list of (status, delay) responses, then 200s."""
+
+    def __init__(self):
+        self.script = []
+        self.requests = 0
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                with stub._lock:
+                    stub.requests += 1
+                    status, delay = stub.script.pop(0) if stub.script else (200, 0)
+                time.sleep(delay)
+                body = b'{"ok": true}'
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self._server.server_address[1]}/"
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+@pytest.fixture
+def upstream():
+    server = StubUpstream()
+    yield server
+    server.close()
+
+def make_client(**kwargs):
+    client = ResilientClient("stub", timeout=httpx.Timeout(5.0), **kwargs)
+    client._backoff = lambda attempt: 0
+    return client
+
+@pytest.mark.asyncio
+async def test_retries_retryable_statuses(upstream):
+    """Test 429/5xx responses are retried until the upstream succeeds"""
+    upstream.script = [(503, 0), (429, 0)]
+    client = make_client(max_retries=2)
+    response = await client.post(upstream.url, json={})
+    assert response.status_code == 200
+    assert upstream.requests == 3
+    assert client.retries == 2
+    await client.aclose()
+
+@pytest.mark.asyncio
+async def test_client_errors_are_not_retried(upstream):
+    """Test non-retryable statuses are returned to the caller immediately"""
+    upstream.script = [(401, 0)]
+    client = make_client(max_retries=2)
+    response = await client.post(upstream.url, json={})
+    assert response.status_code == 401
+    assert upstream.requests == 1
+    await client.aclose()
+
+@pytest.mark.asyncio
+async def test_circuit_opens_after_consecutive_failures(upstream):
+    """Test an upstream that keeps failing is short-circuited without further requests"""
+    upstream.script = [(500, 0)] * 10
+    client = make_client(max_retries=0)
+    client.breaker.failure_threshold = 3
+    for _ in range(3):
+        assert (await client.post(upstream.url, json={})).status_code == 500
+    with pytest.raises(CircuitOpenError):
+        await client.post(upstream.url, json={})
+    assert upstream.requests == 3
+    assert client.stats()["circuit"] == "open"
+    await client.aclose()
+
+@pytest.mark.asyncio
+async def test_hedged_request_beats_slow_attempt(upstream):
+    """Test a hedged second request answers when the first one is slow"""
+    upstream.script = [(200, 1.0)]
+    client = make_client(hedge_delay=0.05)
+    start = time.perf_counter()
+    response = await client.post(upstream.url, json={})
+    assert response.status_code == 200
+    assert time.perf_counter() - start < 0.8
+    assert client.hedges == 1
+    assert client.stats()["latency_seconds"]["count"] >= 1
+    await client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_cancelled_half_open_trial_does_not_keep_circuit_open(upstream):
+    """Test a trial call cancelled while the circuit is half-open lets the next call through"""
+    upstream.script = [(500, 0), (200, 1.0)]
+    client = make_client(max_retries=0)
+    client.breaker.failure_threshold = 1
+    client.breaker.reset_timeout = 0.05
+    assert (await client.post(upstream.url, json={})).status_code == 500
+    await asyncio.sleep(0.06)
+
+    trial = asyncio.create_task(client.post(upstream.url, json={}))
+    await asyncio.sleep(0.1)
+    trial.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await trial
+
+    assert (await client.post(upstream.url, json={})).status_code == 200
+    assert client.stats()["circuit"] == "closed"
+    await client.aclose()
@@ -0,0 +1,83 @@
+import asyncio
+from types import SimpleNamespace
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+from app.core.metrics import MetricsMiddleware, MongoCommandMetrics, render_metrics
+from app.core.singleflight import SingleFlight
+from app.services.subtensor_pool import SubtensorPool
+
+def sample(name: str, labels: dict) -> float:
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware)
+
+    @app.get("/items/{item_id}")
+    async def get_item(item_id: int):
+        return {"item_id": item_id}
+
+    @app.get("/broken")
+    async def broken():
+        raise RuntimeError("boom")
+
+    return TestClient(app, raise_server_exceptions=False)
+
+def test_requests_are_labelled_by_route_template(client):
+    """Test path parameters and unknown paths do not create a series per URL"""
+    labels = {"method": "GET", "route": "/items/{item_id}", "status": "200"}
+    unmatched = {"method": "GET", "route": "unmatched", "status": "404"}
+    before, before_unmatched = sample("http_request_duration_seconds_count", labels), sample("http_request_duration_seconds_count", unmatched)
+
+    client.get("/items/1")
+    client.get("/items/2")
+    client.get("/no/such/path")
+
+    assert sample("http_request_duration_seconds_count", labels) == before + 2
+    assert sample("http_request_duration_seconds_count", unmatched) == before_unmatched + 1
+
+def test_unhandled_exceptions_are_recorded_as_500(client):
+    """Test a request that raises is still timed, with status 500"""
+    labels = {"method": "GET", "route": "/broken", "status": "500"}
+    before = sample("http_request_duration_seconds_count", labels)
+
+    assert client.get("/broken").status_code == 500
+    assert sample("http_request_duration_seconds_count", labels) == before + 1
+
+def test_mongo_commands_are_timed():
+    """Test the pymongo command listener records durations by command and outcome"""
+    listener = MongoCommandMetrics()
+    before = sample("mongo_command_duration_seconds_sum", {"command": "insert", "outcome": "ok"})
+
+    listener.succeeded(SimpleNamespace(command_name="insert", duration_micros=2500))
+    listener.failed(SimpleNamespace(command_name="insert", duration_micros=100))
+
+    assert sample("mongo_command_duration_seconds_sum", {"command": "insert", "outcome": "ok"}) == pytest.approx(before + 0.0025)
+    assert sample("mongo_command_duration_seconds_count", {"command": "insert", "outcome": "error"}) >= 1
+
+@pytest.mark.asyncio
+async def test_chain_calls_and_coalescing_are_counted():
+    """Test pooled chain calls are timed per operation and single-flight joins are counted"""
+    pool = SubtensorPool(["mock"], 1, factory=lambda endpoint: SimpleNamespace())
+    single_flight = SingleFlight("metrics_test")
+    chain_labels = {"operation": "query_map", "outcome": "ok"}
+    before = sample("chain_call_duration_seconds_count", chain_labels)
+
+    async def query_map():
+        return await pool.call(lambda s: asyncio.sleep(0.01, result={}), "query_map")
+
+    await asyncio.gather(*(single_flight.do("1", query_map) for _ in range(5)))
+
+    assert sample("chain_call_duration_seconds_count", chain_labels) == before + 1
+    assert sample("singleflight_calls_total", {"namespace": "metrics_test", "outcome": "executed"}) == 1
+    assert sample("singleflight_calls_total", {"namespace": "metrics_test", "outcome": "coalesced"}) == 4
+
+def test_render_metrics_uses_prometheus_text_format():
+    """Test the exposition contains the hot-path metric families"""
+    content, content_type = render_metrics()
+    assert content_type.startswith("text/plain")
+    for name in ("http_request_duration_seconds", "redis_command_duration_seconds", "cache_requests_total", "celery_task_duration_seconds"):
+        assert f"# TYPE {name}".encode() in content
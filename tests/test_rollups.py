@@ -0,0 +1,98 @@
+import pytest
+from datetime import datetime, timezone
+from unittest.mock import AsyncMock, MagicMock, patch
+from app.db.rollups import StakeRollups
+
+HOTKEY = "5FFApaS75bv5pJHfAp2FVLBj9ZaXuFDjEypsaBNc1wCfe52v"
+
+def action(kind, amount, score, minute, result=True, netuid=1):
+    return {
+        "netuid": netuid,
+        "hotkey": HOTKEY,
+        "sentiment_score": score,
+        "action": kind,
+        "amount": amount,
+        "result": result,
+        "timestamp": datetime(2025, 1, 1, 10, minute, tzinfo=timezone.utc)
+    }
+
+def test_increments_merge_actions_per_bucket():
+    """Test actions in the same hour and day are folded into one $inc per bucket"""
+    increments = StakeRollups().increments([
+        action("stake", 0.5, 50, 5),
+        action("unstake", 0.2, -20, 40),
+        action("stake", 0.3, 30, 50, result=False)
+    ])
+
+    hour = increments[("hour", 1, HOTKEY, datetime(2025, 1, 1, 10, tzinfo=timezone.utc))]
+    day = increments[("day", 1, HOTKEY, datetime(2025, 1, 1, tzinfo=timezone.utc))]
+    assert len(increments) == 2
+    assert hour == day
+    assert hour["actions"] == 3 and hour["stakes"] == 2 and hour["unstakes"] == 1 and hour["failed"] == 1
+    assert hour["staked"] == 0.5 and hour["unstaked"] == 0.2
+    assert hour["sentiment_sum"] == 60
+
+@pytest.mark.asyncio
+async def test_record_sends_one_bulk_write():
+    """Test a flush of actions is written as a single ordered bulk_write of bucket upserts and guarded $incs"""
+    db = MagicMock()
+    db.stake_rollups.bulk_write = AsyncMock()
+    with patch("app.db.rollups.mongodb.get_db", return_value=db):
+        await StakeRollups().record([action("stake", 0.5, 50, 5), action("stake", 0.5, 50, 6, netuid=2)])
+
+    db.stake_rollups.bulk_write.assert_awaited_once()
+    updates = db.stake_rollups.bulk_write.call_args.args[0]
+    assert len(updates) == 8
+    assert all(update._upsert for update in updates[:4])
+    assert not any(update._upsert for update in updates[4:])
+    assert len({update._filter["flushes"]["$ne"] for update in updates[4:]}) == 1
+    assert db.stake_rollups.bulk_write.call_args.kwargs == {"ordered": True}
+
+@pytest.mark.asyncio
+async def test_failed_rollup_update_is_retried_idempotently():
+    """Test a failed flush is resent under its own flush id, so a write that did apply is not counted twice"""
+    db = MagicMock()
+    db.stake_rollups.bulk_write = AsyncMock(side_effect=[Exception("timed out"), None])
+    rollups = StakeRollups()
+    with patch("app.db.rollups.mongodb.get_db", return_value=db):
+        await rollups.record([action("stake", 0.5, 50, 5)])
+        await rollups.record([action("stake", 0.25, 10, 6)])
+
+    first = db.stake_rollups.bulk_write.call_args_list[0].args[0][2:]
+    retried = db.stake_rollups.bulk_write.call_args_list[1].args[0][2:]
+    assert len(retried) == 4
+    assert [update._filter for update in retried[:2]] == [update._filter for update in first]
+    assert [update._doc for update in retried[:2]] == [update._doc for update in first]
+    assert all(update._doc["$inc"]["staked"] == 0.25 for update in retried[2:])
+    assert rollups._pending == {}
+
+@pytest.mark.asyncio
+async def test_pending_rollup_updates_are_capped():
+    """Test the oldest unwritten flushes are dropped once too many bucket updates are pending"""
+    db = MagicMock()
+    db.stake_rollups.bulk_write = AsyncMock(side_effect=Exception("not primary"))
+    rollups = StakeRollups()
+    with patch("app.db.rollups.mongodb.get_db", return_value=db), \
+            patch("app.db.rollups.settings.STAKE_ROLLUPS_MAX_PENDING", 4):
+        for minute in range(3):
+            await rollups.record([action("stake", 0.5, 50, minute)])
+
+    assert len(rollups._pending) == 2
+    assert sum(len(increments) for increments in rollups._pending.values()) == 4
+
+@pytest.mark.asyncio
+async def test_get_stats_derives_net_staked_and_average_sentiment():
+    """Test rollups are returned with net staked TAO and average sentiment"""
+    db = MagicMock()
+    db.stake_rollups.find.return_value.sort.return_value.limit.return_value.to_list = AsyncMock(return_value=[{
+        "granularity": "day", "netuid": 1, "hotkey": HOTKEY, "bucket": datetime(2025, 1, 1),
+        "actions": 4, "stakes": 3, "unstakes": 1, "failed": 0,
+        "staked": 1.5, "unstaked": 0.5, "sentiment_sum": 100
+    }])
+    with patch("app.db.rollups.mongodb.get_db", return_value=db):
+        stats = await StakeRollups().get_stats("day", netuid=1)
+
+    assert stats[0]["net_staked"] == 1.0
+    assert stats[0]["avg_sentiment"] == 25
+    assert "sentiment_sum" not in stats[0]
+    assert db.stake_rollups.find.call_args.args[0] == {"granularity": "day", "netuid": 1}
@@ -0,0 +1,98 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from app.services.sentiment import SentimentService
+
+@pytest.fixture
+def redis_store():
+    store = {}
+    redis = MagicMock()
+    redis.get = AsyncMock(side_effect=lambda key: store.get(key))
+    redis.mget = AsyncMock(side_effect=lambda keys: [store.get(key) for key in keys])
+    redis.set = AsyncMock(side_effect=lambda key, value, ex=None: store.__setitem__(key, str(value)))
+    pipeline = MagicMock()
+    pipeline.__aenter__ = AsyncMock(return_value=pipeline)
+    pipeline.__aexit__ = AsyncMock(return_value=False)
+    pipeline.set = MagicMock(side_effect=lambda key, value, ex=None: store.__setitem__(key, str(value)))
+    pipeline.execute = AsyncMock()
+    redis.pipeline = MagicMock(return_value=pipeline)
+    with patch("app.services.sentiment.get_redis_client", return_value=redis):
+        yield store
+
+@pytest.mark.asyncio
+async def test_unchanged_tweet_set_skips_llm_call(redis_store):
+    """Test the LLM is not called again when the fetched tweets have not changed"""
+    service = SentimentService()
+    service.search_tweets = AsyncMock(return_value=[{"text": "bullish"}, {"text": "shipping"}])
+    service._analyze_sentiment = AsyncMock(return_value=42.0)
+
+    first = await service.get_subnet_sentiment(1)
+    del redis_store["sentiment:1"]
+    service.search_tweets.return_value = [{"text": "shipping"}, {"text": "bullish"}]
+    second = await service.get_subnet_sentiment(1)
+
+    assert first["sentiment_score"] == second["sentiment_score"] == 42.0
+    assert service.search_tweets.await_count == 2
+    service._analyze_sentiment.assert_awaited_once()
+
+@pytest.mark.asyncio
+async def test_concurrent_requests_share_one_computation(redis_store):
+    """Test concurrent requests for the same netuid share a single Datura and LLM call"""
+    service = SentimentService()
+
+    async def search_tweets(query):
+        await asyncio.sleep(0.01)
+        return [{"text": "bullish"}]
+
+    service.search_tweets = AsyncMock(side_effect=search_tweets)
+    service._analyze_sentiment = AsyncMock(return_value=10.0)
+
+    results = await asyncio.gather(*(service.get_subnet_sentiment(2) for _ in range(5)))
+    assert all(result["sentiment_score"] == 10.0 for result in results)
+    service.search_tweets.assert_awaited_once()
+    service._analyze_sentiment.assert_awaited_once()
+
+def test_parse_score_tolerates_surrounding_text():
+    """Test single scores are extracted from chatty replies and clamped to [-100, 100]"""
+    assert SentimentService._parse_score("35") == 35.0
+    assert SentimentService._parse_score("Score: -12.5.") == -12.5
+    assert SentimentService._parse_score("+250") == 100.0
+    with pytest.raises(ValueError):
+        SentimentService._parse_score("I cannot determine the sentiment")
+
+def test_parse_batch_scores():
+    """Test packed replies are parsed per netuid, ignoring unknown netuids and bad values"""
+    content = 'Here you go:\n```json\n{"1": 35, "subnet 7": "-20", "9": 50, "3": "n/a"}\n```'
+    assert SentimentService._parse_batch_scores(content, [1, 3, 7]) == {1: 35.0, 7: -20.0}
+
+@pytest.mark.asyncio
+async def test_batch_sentiment_falls_back_for_unparsed_subnets(redis_store):
+    """Test subnets missing from a packed reply are scored with individual LLM calls"""
+    service = SentimentService()
+    service.search_tweets = AsyncMock(side_effect=lambda query, **kwargs: [{"text": query}])
+    service._complete = AsyncMock(side_effect=['{"1": 10}', "-5"])
+
+    results = await service.get_subnets_sentiment([1, 2])
+    assert [result["sentiment_score"] for result in results] == [10.0, -5.0]
+    assert service._complete.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_batch_sentiment_isolates_failed_subnets(redis_store):
+    """Test one subnet's Datura or LLM failure does not fail or uncache the other subnets"""
+    service = SentimentService()
+
+    async def search_tweets(query, **kwargs):
+        if query.endswith(" 3"):
+            raise RuntimeError("Datura unavailable")
+        return [{"text": query}]
+
+    service.search_tweets = AsyncMock(side_effect=search_tweets)
+    service._complete = AsyncMock(side_effect=["not json", "10", "no score here"])
+
+    results = await service.get_subnets_sentiment([1, 2, 3])
+    assert results[0] == {"netuid": 1, "tweet_count": 1, "sentiment_score": 10.0}
+    assert results[1]["netuid"] == 2 and "error" in results[1]
+    assert results[2] == {"netuid": 3, "error": "Error fetching tweets: Datura unavailable"}
+    assert "sentiment:1" in redis_store
+    assert "sentiment:2" not in redis_store and "sentiment:3" not in redis_store
@@ -0,0 +1,91 @@
+import asyncio
+from unittest.mock import patch
+import fakeredis
+import pytest
+from app.core.singleflight import SingleFlight
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_are_coalesced():
+    """Test concurrent callers for the same key share a single execution"""
+    single_flight = SingleFlight("test")
+    calls = 0
+
+    async def query():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return {"hotkey": 1}
+
+    results = await asyncio.gather(*(single_flight.do("1:None", query) for _ in range(10)))
+    assert all(result == {"hotkey": 1} for result in results)
+    assert calls == 1
+    assert single_flight.stats() == {"in_flight": 0, "executed": 1, "coalesced": 9, "remote_coalesced": 0}
+
+@pytest.mark.asyncio
+async def test_flight_is_forgotten_after_exception():
+    """Test a failed flight is cleaned up so the next caller runs again"""
+    single_flight = SingleFlight("test")
+
+    async def failing_query():
+        raise RuntimeError("chain unavailable")
+
+    async def query():
+        return 42
+
+    with pytest.raises(RuntimeError):
+        await single_flight.do("1:None", failing_query)
+    assert await single_flight.do("1:None", query) == 42
+    assert single_flight.stats()["in_flight"] == 0
+
+@pytest.mark.asyncio
+async def test_cancelled_caller_does_not_cancel_flight():
+    """Test cancelling one waiting caller leaves the shared flight running for the others"""
+    single_flight = SingleFlight("test")
+
+    async def query():
+        await asyncio.sleep(0.02)
+        return 7
+
+    first = asyncio.create_task(single_flight.do("1:None", query))
+    second = asyncio.create_task(single_flight.do("1:None", query))
+    await asyncio.sleep(0)
+    first.cancel()
+    assert await second == 7
+
+@pytest.fixture
+def redis():
+    redis = fakeredis.FakeAsyncRedis(decode_responses=True)
+    with patch("app.core.singleflight.get_redis_client", return_value=redis):
+        yield redis
+
+@pytest.mark.asyncio
+async def test_leader_renews_lock_while_its_call_runs(redis):
+    """Test a call outliving lock_timeout keeps its lock, so another replica waits for its result"""
+    leader = SingleFlight("test", distributed=True, lock_timeout=0.3, poll_interval=0.01)
+    follower = SingleFlight("test", distributed=True, lock_timeout=0.3, poll_interval=0.01)
+    calls = 0
+
+    async def query():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.8)
+        return 42
+
+    first = asyncio.create_task(leader.do("1", query))
+    await asyncio.sleep(0.05)
+    assert await follower.do("1", query) == 42
+    assert await first == 42
+    assert calls == 1
+    assert follower.stats()["remote_coalesced"] == 1
+
+@pytest.mark.asyncio
+async def test_waiter_takes_over_from_dead_leader(redis):
+    """Test waiters run the call themselves once a crashed leader's lock lapses"""
+    await redis.set("singleflight:test:1:lock", "dead-leader", px=200)
+    single_flight = SingleFlight("test", distributed=True, lock_timeout=0.2, poll_interval=0.01)
+
+    async def query():
+        return 7
+
+    assert await asyncio.wait_for(single_flight.do("1", query), timeout=1) == 7
+    assert single_flight.stats()["executed"] == 1
@@ -0,0 +1,134 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from app.core.config import settings
+from app.services import stake_engine
+from app.services.stake_engine import StakeEngine
+
+HOTKEY_A = "5FFApaS75bv5pJHfAp2FVLBj9ZaXuFDjEypsaBNc1wCfe52v"
+HOTKEY_B = "5GrwvaEF5zXb26Fz9rcQpDWS57CtERHpNehXCPcNoHGKutQY"
+
+class Receipt:
+    """Mimics AsyncExtrinsicReceipt, whose status properties are awaitables."""
+
+    def __init__(self, success: bool):
+        self.success = success
+        self.extrinsic_hash = "0xabc"
+
+    @property
+    async def is_success(self):
+        return self.success
+
+    @property
+    async def error_message(self):
+        return "StakeTooLow"
+
+def make_substrate(success: bool = True):
+    substrate = MagicMock()
+    substrate.compose_call = AsyncMock(side_effect=lambda call_module, call_function, call_params: {
+        "module": call_module, "function": call_function, "params": call_params
+    })
+    substrate.get_account_next_index = AsyncMock(return_value=7)
+    substrate.create_signed_extrinsic = AsyncMock(side_effect=lambda call, keypair, nonce: {"call": call, "nonce": nonce})
+    substrate.submit_extrinsic = AsyncMock(side_effect=lambda extrinsic, **kwargs: Receipt(success))
+    return substrate
+
+@pytest.fixture
+def engine():
+    substrate = make_substrate()
+    wallet = MagicMock()
+    wallet.coldkey.ss58_address = "5Coldkey"
+    redis = MagicMock()
+    lock = MagicMock()
+    lock.__aenter__ = AsyncMock(return_value=lock)
+    lock.__aexit__ = AsyncMock(return_value=False)
+    redis.lock = MagicMock(return_value=lock)
+    with patch("app.services.stake_engine.get_redis_client", return_value=redis), \
+            patch.object(settings, "STAKE_BATCH_WINDOW", 0.05):
+        yield StakeEngine(MagicMock(substrate=substrate), wallet)
+
+@pytest.mark.asyncio
+async def test_concurrent_intents_are_netted_into_one_batch_all(engine):
+    """Test opposing root actions cancel out and the rest go out as one batch_all extrinsic"""
+    substrate = engine.subtensor.substrate
+    results = await asyncio.gather(
+        engine.submit("stake", 1.0, 0, HOTKEY_A),
+        engine.submit("unstake", 0.25, 0, HOTKEY_A),
+        engine.submit("unstake", 0.5, 2, HOTKEY_B),
+        engine.submit("stake", 0.5, 0, HOTKEY_B),
+        engine.submit("unstake", 0.5, 0, HOTKEY_B)
+    )
+    await engine.stop()
+
+    submitted = {"result": True, "extrinsic_hash": "0xabc", "netted": False}
+    assert results == [
+        submitted,
+        {**submitted, "netted": True},
+        submitted,
+        {"result": True, "extrinsic_hash": None, "netted": True},
+        {"result": True, "extrinsic_hash": None, "netted": True}
+    ]
+    substrate.submit_extrinsic.assert_awaited_once()
+    extrinsic = substrate.submit_extrinsic.call_args.args[0]
+    assert extrinsic["nonce"] == 7
+    batch = extrinsic["call"]
+    assert (batch["module"], batch["function"]) == ("Utility", "batch_all")
+    assert [(c["function"], c["params"]) for c in batch["params"]["calls"]] == [
+        ("add_stake", {"hotkey": HOTKEY_A, "netuid": 0, "amount_staked": 750_000_000}),
+        ("remove_stake", {"hotkey": HOTKEY_B, "netuid": 2, "amount_unstaked": 500_000_000})
+    ]
+    assert engine.intents_netted == 3
+
+@pytest.mark.asyncio
+async def test_alpha_unstakes_are_not_netted_against_tao_stakes(engine):
+    """Test opposing actions on a dTAO subnet are submitted separately since their units differ"""
+    results = await asyncio.gather(
+        engine.submit("stake", 0.5, 3, HOTKEY_B),
+        engine.submit("stake", 0.25, 3, HOTKEY_B),
+        engine.submit("unstake", 0.5, 3, HOTKEY_B)
+    )
+    await engine.stop()
+
+    assert all(r == {"result": True, "extrinsic_hash": "0xabc", "netted": False} for r in results)
+    batch = engine.subtensor.substrate.submit_extrinsic.call_args.args[0]["call"]
+    assert [(c["function"], c["params"]) for c in batch["params"]["calls"]] == [
+        ("add_stake", {"hotkey": HOTKEY_B, "netuid": 3, "amount_staked": 750_000_000}),
+        ("remove_stake", {"hotkey": HOTKEY_B, "netuid": 3, "amount_unstaked": 500_000_000})
+    ]
+
+@pytest.mark.asyncio
+async def test_fully_netted_intents_submit_nothing(engine):
+    """Test a root stake and an equal unstake on the same pair never reach the chain"""
+    results = await asyncio.gather(
+        engine.submit("stake", 0.3, 0, HOTKEY_A),
+        engine.submit("unstake", 0.3, 0, HOTKEY_A)
+    )
+    await engine.stop()
+
+    assert all(r["netted"] and r["result"] for r in results)
+    engine.subtensor.substrate.submit_extrinsic.assert_not_awaited()
+
+@pytest.mark.asyncio
+async def test_single_call_is_not_wrapped_and_failure_is_reported(engine):
+    """Test a lone action is submitted directly and a failed dispatch resolves to result False"""
+    substrate = make_substrate(success=False)
+    engine.subtensor.substrate = substrate
+
+    result = await engine.submit("stake", 0.1, 4, HOTKEY_A)
+    await engine.stop()
+
+    assert result["result"] is False
+    call = substrate.submit_extrinsic.call_args.args[0]["call"]
+    assert (call["module"], call["function"]) == ("SubtensorModule", "add_stake")
+
+@pytest.mark.asyncio
+async def test_nonce_is_read_under_coldkey_lock(engine):
+    """Test each batch takes the coldkey's Redis lock around nonce read and submission"""
+    await engine.submit("stake", 0.1, 1, HOTKEY_A)
+    await engine.submit("stake", 0.1, 1, HOTKEY_A)
+    await engine.stop()
+
+    redis = stake_engine.get_redis_client()
+    redis.lock.assert_called_with("stake_engine:nonce:5Coldkey", timeout=settings.STAKE_NONCE_LOCK_TIMEOUT)
+    assert redis.lock.return_value.__aenter__.await_count == 2
+    assert engine.subtensor.substrate.get_account_next_index.await_count == 2
@@ -0,0 +1,198 @@
+import asyncio
+import json
+from unittest.mock import patch
+import pytest
+import pytest_asyncio
+from websockets.asyncio.client import connect
+from websockets.asyncio.server import serve
+from app.core.config import settings
+from app.services.subtensor_pool import SubtensorPool
+
+class MockSubstrateNode:
+    """Local websocket JSON-RPC server answering chain_getHeader after a configurable delay."""
+
+    def __init__(self, delay: float = 0):
+        self.delay = delay
+        self.drop = False
+        self.requests = 0
+        self.connections = 0
+        self._server = None
+
+    async def start(self):
+        self._server = await serve(self._handle, "127.0.0.1", 0)
+        self.url = f"ws://127.0.0.1:{self._server.sockets[0].getsockname()[1]}"
+
+    async def _handle(self, websocket):
+        self.connections += 1
+        async for message in websocket:
+            request = json.loads(message)
+            self.requests += 1
+            if self.drop:
+                await websocket.close()
+                return
+            await asyncio.sleep(self.delay)
+            await websocket.send(json.dumps({"jsonrpc": "2.0", "id": request["id"], "result": {"number": "0x2a"}}))
+
+    async def stop(self):
+        self._server.close()
+        await self._server.wait_closed()
+
+class RpcClient:
+    """Minimal substrate client speaking to one endpoint, standing in for AsyncSubtensor."""
+
+    def __init__(self, url: str):
+        self.url = url
+        self._websocket = None
+        self._lock = asyncio.Lock()
+        self._id = 0
+
+    async def get_current_block(self) -> int:
+        async with self._lock:
+            if self._websocket is None:
+                self._websocket = await connect(self.url)
+            self._id += 1
+            await self._websocket.send(json.dumps({"jsonrpc": "2.0", "id": self._id, "method": "chain_getHeader", "params": []}))
+            return int(json.loads(await self._websocket.recv())["result"]["number"], 16)
+
+    async def close(self):
+        if self._websocket is not None:
+            await self._websocket.close()
+
+@pytest_asyncio.fixture
+async def nodes():
+    started = []
+
+    async def start(delay: float = 0):
+        node = MockSubstrateNode(delay)
+        await node.start()
+        started.append(node)
+        return node
+
+    yield start
+    for node in started:
+        await node.stop()
+
+async def current_block(pool: SubtensorPool) -> int:
+    return await pool.call(lambda s: s.get_current_block())
+
+@pytest.mark.asyncio
+async def test_routes_calls_to_the_fastest_endpoint(nodes):
+    """Test calls settle on the endpoint with the lowest measured latency"""
+    fast, slow = await nodes(0), await nodes(0.05)
+    pool = SubtensorPool([slow.url, fast.url], 1, factory=RpcClient)
+
+    for _ in range(20):
+        assert await current_block(pool) == 42
+
+    assert slow.requests == 1
+    assert fast.requests == 19
+    await pool.close()
+
+@pytest.mark.asyncio
+async def test_spreads_concurrent_calls_over_connections(nodes):
+    """Test concurrent calls are not all queued behind one busy connection"""
+    node = await nodes(0.05)
+    pool = SubtensorPool([node.url], 4, factory=RpcClient)
+
+    await asyncio.gather(*(current_block(pool) for _ in range(4)))
+
+    assert node.connections == 4
+    await pool.close()
+
+@pytest.mark.asyncio
+async def test_fails_over_when_an_endpoint_dies(nodes):
+    """Test a call on a dead endpoint is retried on another one and the dead one is benched"""
+    primary, backup = await nodes(0), await nodes(0.01)
+    pool = SubtensorPool([primary.url, backup.url], 1, factory=RpcClient)
+    # Measure both endpoints; the primary is the faster one from here on
+    assert await current_block(pool) == 42
+    assert await current_block(pool) == 42
+
+    primary.drop = True
+    assert await current_block(pool) == 42
+    assert await current_block(pool) == 42
+
+    assert primary.requests == 2
+    assert backup.requests == 3
+    stats = {s["endpoint"]: s for s in pool.stats()}
+    assert stats[primary.url]["healthy"] is False
+    assert stats[primary.url]["failures"] == 1
+    await pool.close()
+
+@pytest.mark.asyncio
+async def test_fails_over_on_timeout(nodes):
+    """Test an endpoint that stops answering is treated like a dead one"""
+    stuck, backup = await nodes(1), await nodes(0)
+    pool = SubtensorPool([stuck.url, backup.url], 1, factory=RpcClient)
+    with patch.object(settings, "SUBTENSOR_CALL_TIMEOUT", 0.1):
+        assert await current_block(pool) == 42
+        assert await current_block(pool) == 42
+    assert stuck.requests == 1
+    assert backup.requests == 2
+    await pool.close()
+
+@pytest.mark.asyncio
+async def test_reconnects_after_cooldown(nodes):
+    """Test a benched endpoint gets a fresh connection once its cooldown has passed"""
+    flaky, backup = await nodes(0), await nodes(0.01)
+    pool = SubtensorPool([flaky.url, backup.url], 1, factory=RpcClient)
+    with patch.object(settings, "SUBTENSOR_FAILURE_COOLDOWN", 0.1):
+        assert await current_block(pool) == 42
+        assert await current_block(pool) == 42
+        flaky.drop = True
+        assert await current_block(pool) == 42
+
+        flaky.drop = False
+        await asyncio.sleep(0.15)
+        flaky.requests = 0
+        assert await current_block(pool) == 42
+
+    assert flaky.requests == 1
+    assert flaky.connections == 2
+    await pool.close()
+
+@pytest.mark.asyncio
+async def test_raises_when_every_endpoint_fails(nodes):
+    """Test the transport error surfaces once every connection has been tried"""
+    first, second = await nodes(0), await nodes(0)
+    first.drop = second.drop = True
+    pool = SubtensorPool([first.url, second.url], 2, factory=RpcClient)
+
+    with pytest.raises(Exception):
+        await current_block(pool)
+    assert first.requests == 2
+    assert second.requests == 2
+    await pool.close()
+
+@pytest.mark.asyncio
+async def test_retries_on_another_connection_of_a_single_endpoint(nodes):
+    """Test a transport error on one connection is retried on the endpoint's other healthy connection"""
+    node = await nodes(0)
+    pool = SubtensorPool([node.url], 2, factory=RpcClient)
+    await asyncio.gather(current_block(pool), current_block(pool))
+    broken, healthy = pool.connections
+    # Route the next call to the broken connection first
+    healthy.latency = 10.0
+    await broken.client.close()
+
+    assert await pool.call(lambda s: s.get_current_block()) == 42
+    assert (broken.failures, healthy.failures) == (1, 0)
+    await pool.close()
+
+@pytest.mark.asyncio
+async def test_retry_on_moves_call_without_benching(nodes):
+    """Test errors matched by retry_on are retried on the other endpoint and do not bench the first"""
+    first, second = await nodes(0), await nodes(0)
+    pool = SubtensorPool([first.url, second.url], 1, factory=RpcClient)
+    seen = []
+
+    async def read(client):
+        seen.append(client.url)
+        if client.url == first.url:
+            raise ValueError("Unknown block")
+        return await client.get_current_block()
+
+    assert await pool.call(read, retry_on=lambda e: "unknown block" in str(e).lower()) == 42
+    assert set(seen) == {first.url, second.url}
+    assert all(c.failures == 0 for c in pool.connections)
+    await pool.close()
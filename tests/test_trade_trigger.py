@@ -0,0 +1,80 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from app.services.trade_trigger import TradeTrigger
+
+@pytest.fixture
+def redis_store():
+    store = {}
+
+    async def set_(key, value, nx=False, ex=None):
+        if nx and key in store:
+            return None
+        store[key] = str(value)
+        return True
+
+    redis = MagicMock()
+    redis.set = AsyncMock(side_effect=set_)
+    redis.get = AsyncMock(side_effect=lambda key: store.get(key))
+    redis.exists = AsyncMock(side_effect=lambda key: int(key in store))
+
+    async def release(keys, args):
+        if store.get(keys[0]) == args[0]:
+            del store[keys[0]]
+            return 1
+        return 0
+
+    redis.register_script = MagicMock(return_value=AsyncMock(side_effect=release))
+    with patch("app.services.trade_trigger.get_redis_client", return_value=redis):
+        yield store
+
+@pytest.mark.asyncio
+async def test_burst_of_triggers_enqueues_one_task(redis_store):
+    """Test concurrent triggers for the same pair are coalesced onto a single task id"""
+    trigger = TradeTrigger()
+    task = MagicMock()
+
+    results = await asyncio.gather(*(trigger.trigger(task, 1, "hk") for _ in range(100)))
+
+    task.apply_async.assert_called_once()
+    task_id = task.apply_async.call_args.kwargs["task_id"]
+    assert [r["status"] for r in results].count("enqueued") == 1
+    assert all(r["task_id"] == task_id for r in results)
+
+@pytest.mark.asyncio
+async def test_triggers_for_different_pairs_are_independent(redis_store):
+    """Test the debounce window is scoped per (netuid, hotkey)"""
+    trigger = TradeTrigger()
+    task = MagicMock()
+
+    assert (await trigger.trigger(task, 1, "hk"))["status"] == "enqueued"
+    assert (await trigger.trigger(task, 2, "hk"))["status"] == "enqueued"
+    assert (await trigger.trigger(task, 1, "other"))["status"] == "enqueued"
+    assert task.apply_async.call_count == 3
+
+@pytest.mark.asyncio
+async def test_failed_enqueue_releases_debounce_window(redis_store):
+    """Test a trigger whose broker publish fails does not leave later triggers coalesced onto it"""
+    trigger = TradeTrigger()
+    task = MagicMock()
+    task.apply_async.side_effect = ConnectionError("broker unavailable")
+
+    with pytest.raises(Exception, match="broker unavailable"):
+        await trigger.trigger(task, 1, "hk")
+    assert trigger.trigger_key(1, "hk") not in redis_store
+
+    task.apply_async.side_effect = None
+    result = await trigger.trigger(task, 1, "hk")
+    assert result["status"] == "enqueued"
+    assert redis_store[trigger.trigger_key(1, "hk")] == result["task_id"]
+
+@pytest.mark.asyncio
+async def test_stake_slot_enforces_min_interval(redis_store):
+    """Test only one stake action per pair is allowed inside STAKE_MIN_INTERVAL"""
+    trigger = TradeTrigger()
+
+    assert await trigger.stake_allowed(1, "hk")
+    assert await trigger.claim_stake_slot(1, "hk")
+    assert not await trigger.stake_allowed(1, "hk")
+    assert not await trigger.claim_stake_slot(1, "hk")
+    assert await trigger.claim_stake_slot(1, "other")
@@ -0,0 +1,94 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from pymongo.errors import AutoReconnect, BulkWriteError
+from app.db.write_buffer import WriteBuffer
+
+def make_buffer(durability: str = "acknowledged", max_size: int = 10, flush_interval: float = 0.05):
+    collection = MagicMock()
+    collection.insert_many = AsyncMock()
+    db = MagicMock()
+    db.__getitem__.return_value.with_options.return_value = collection
+    buffer = WriteBuffer("stake_actions", max_size, flush_interval, durability, db_provider=lambda: db)
+    return buffer, collection
+
+@pytest.mark.asyncio
+async def test_concurrent_adds_are_written_in_one_bulk_insert():
+    """Test documents added together are flushed with a single unordered insert_many"""
+    buffer, collection = make_buffer()
+
+    await asyncio.gather(*(buffer.add({"n": i}) for i in range(5)))
+
+    collection.insert_many.assert_awaited_once()
+    documents = collection.insert_many.call_args.args[0]
+    assert [d["n"] for d in documents] == list(range(5))
+    assert collection.insert_many.call_args.kwargs == {"ordered": False}
+    await buffer.stop()
+
+@pytest.mark.asyncio
+async def test_flushes_when_size_threshold_is_reached():
+    """Test a full buffer is flushed without waiting for the interval"""
+    buffer, collection = make_buffer(max_size=3, flush_interval=60)
+
+    await asyncio.wait_for(asyncio.gather(*(buffer.add({"n": i}) for i in range(6))), timeout=1)
+
+    assert collection.insert_many.await_count == 2
+    await buffer.stop()
+
+@pytest.mark.asyncio
+async def test_buffered_mode_does_not_wait_and_stop_flushes():
+    """Test buffered adds return immediately and pending documents are written on stop"""
+    buffer, collection = make_buffer(durability="buffered", flush_interval=60)
+
+    for i in range(3):
+        await buffer.add({"n": i})
+    collection.insert_many.assert_not_awaited()
+
+    await buffer.stop()
+    collection.insert_many.assert_awaited_once()
+    assert buffer.written == 3
+
+@pytest.mark.asyncio
+async def test_buffered_mode_retries_transient_failures():
+    """Test a flush that fails with a connection error is retried with the next flush"""
+    buffer, collection = make_buffer(durability="buffered", flush_interval=60)
+    collection.insert_many.side_effect = [AutoReconnect("primary stepped down"), None]
+
+    await buffer.add({"n": 1})
+    assert not await buffer.flush()
+    assert await buffer.flush()
+    assert collection.insert_many.call_args.args[0] == [{"n": 1}]
+    assert buffer.written == 1
+
+@pytest.mark.asyncio
+async def test_write_errors_fail_only_the_affected_documents():
+    """Test documents rejected by an unordered bulk insert raise while the rest succeed"""
+    buffer, collection = make_buffer()
+    collection.insert_many.side_effect = BulkWriteError({
+        "writeErrors": [{"index": 1, "code": 11000, "errmsg": "duplicate key"}]
+    })
+
+    results = await asyncio.gather(*(buffer.add({"n": i}) for i in range(3)), return_exceptions=True)
+
+    assert results[0] is None and results[2] is None
+    assert "duplicate key" in str(results[1])
+    assert (buffer.written, buffer.failed) == (2, 1)
+    await buffer.stop()
+
+@pytest.mark.asyncio
+async def test_on_flush_receives_written_documents():
+    """Test the flush hook sees only the documents the insert actually wrote"""
+    buffer, collection = make_buffer()
+    buffer._on_flush = AsyncMock()
+    collection.insert_many.side_effect = BulkWriteError({
+        "writeErrors": [{"index": 0, "code": 11000, "errmsg": "duplicate key"}]
+    })
+
+    await asyncio.gather(*(buffer.add({"n": i}) for i in range(3)), return_exceptions=True)
+
+    buffer._on_flush.assert_awaited_once_with([{"n": 1}, {"n": 2}])
+    await buffer.stop()
+
+def test_unknown_durability_mode_is_rejected():
+    with pytest.raises(ValueError):
+        WriteBuffer("stake_actions", 10, 1, "eventually")